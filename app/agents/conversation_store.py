@@ -0,0 +1,366 @@
+"""
+Bounded conversation state store
+Keeps active conversations in memory with LRU + idle TTL eviction,
+persisting every evicted conversation before it is dropped
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from app.models import ConversationState
+from app.config import Config
+from app.logger import logger
+from app.agents.state_backends import StateBackend, StateConflict
+
+
+def conversation_record_data(state: ConversationState) -> dict:
+    """Map a conversation state onto ConversationRecord columns"""
+    intel = state.extracted_intel
+    return {
+        "scam_type": state.scam_type.value if state.scam_type else None,
+        "engagement_level": state.engagement_level,
+        "persona_used": state.scammer_persona,
+        "bank_accounts": intel.bank_accounts,
+        "upi_ids": intel.upi_ids,
+        "phishing_links": intel.phishing_links,
+        "phone_numbers": intel.phone_numbers,
+        "email_addresses": intel.email_addresses,
+        "suspicious_patterns": intel.suspicious_patterns,
+        "total_messages": len(state.messages),
+        "conversation_text": "\n".join(f"{role}: {content}" for role, content in state.messages.pairs()),
+    }
+
+
+def persist_conversation(state: ConversationState):
+    """Write a conversation to the ConversationRecord table"""
+    # Imported here so the database is only created once something is persisted
+    from app.database import save_conversation
+    save_conversation(state.conversation_id, conversation_record_data(state))
+
+
+class ConversationStore:
+    """
+    Dict-like store of active conversations
+    
+    Entries are kept in access order. Conversations idle for longer than
+    `ttl` seconds are expired, and the least recently used conversation is
+    evicted once `max_size` is exceeded. Every conversation leaving the
+    store goes through `on_evict` first so nothing is lost.
+    
+    With a shared `backend` the entries are only a local cache: every read
+    checks the backend version and reloads stale states, `save` writes
+    through (and reloads instead if another worker saved first), and LRU
+    or idle eviction just drops the cached copy. Idle
+    conversations are then expired from the backend itself, and
+    termination removes them there.
+    
+    The `*_async` methods do the same with the backend's calls run in a
+    thread, so request handlers never block the event loop on them; the
+    local bookkeeping stays on the loop.
+    
+    `on_enter` and `on_leave` are called whenever a state enters or leaves
+    this worker's entries (for any reason), so running totals can be kept
+    in step without scanning the store.
+    """
+    
+    # Reasons that end a conversation rather than just dropping a cached copy
+    CLOSING_REASONS = ("max_length", "terminated")
+    
+    def __init__(
+        self,
+        max_size: int = Config.MAX_ACTIVE_CONVERSATIONS,
+        ttl: float = Config.CONVERSATION_IDLE_TTL,
+        on_evict: Optional[Callable[[ConversationState], None]] = persist_conversation,
+        clock: Callable[[], float] = time.monotonic,
+        backend: Optional[StateBackend] = None,
+        sweep_interval: float = 60.0
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.clock = clock
+        self.backend = backend
+        self.sweep_interval = sweep_interval
+        self._last_sweep = clock()
+        # conversation_id -> (state, last access time, backend version), least recently used first
+        self._entries: "OrderedDict[str, Tuple[ConversationState, float, Hashable]]" = OrderedDict()
+        self.on_enter: Optional[Callable[[ConversationState], None]] = None
+        self.on_leave: Optional[Callable[[ConversationState], None]] = None
+        self.evictions: Dict[str, int] = {"expired": 0, "capacity": 0, "max_length": 0, "terminated": 0}
+    
+    def __len__(self) -> int:
+        """Conversations held by this worker (the backend is not queried)"""
+        return len(self._entries)
+    
+    def __contains__(self, conversation_id: str) -> bool:
+        return self.get(conversation_id) is not None
+    
+    def __getitem__(self, conversation_id: str) -> ConversationState:
+        state = self.get(conversation_id)
+        if state is None:
+            raise KeyError(conversation_id)
+        return state
+    
+    def __setitem__(self, conversation_id: str, state: ConversationState):
+        if self.backend is None:
+            self._cache(conversation_id, state, None)
+            return
+        entry = self._entries.get(conversation_id)
+        try:
+            version = self.backend.save(state, entry[2] if entry is not None else None)
+        except StateConflict:
+            self._reload(conversation_id)
+            return
+        self._cache(conversation_id, state, version)
+    
+    def _cache(self, conversation_id: str, state: ConversationState, version: Hashable):
+        previous = self._entries.get(conversation_id)
+        self._entries[conversation_id] = (state, self.clock(), version)
+        if previous is None or previous[0] is not state:
+            if previous is not None and self.on_leave is not None:
+                self.on_leave(previous[0])
+            if self.on_enter is not None:
+                self.on_enter(state)
+        self._entries.move_to_end(conversation_id)
+        self._expire_local()
+        while len(self._entries) > self.max_size:
+            oldest_id = next(iter(self._entries))
+            self.evict(oldest_id, "capacity")
+    
+    def get(self, conversation_id: str) -> Optional[ConversationState]:
+        """Look up a conversation and mark it as recently used"""
+        self.expire()
+        entry = self._entries.get(conversation_id)
+        if self.backend is not None:
+            return self._get_shared(conversation_id, entry)
+        if entry is None:
+            return None
+        self._entries[conversation_id] = (entry[0], self.clock(), entry[2])
+        self._entries.move_to_end(conversation_id)
+        return entry[0]
+    
+    def _get_shared(self, conversation_id: str, entry) -> Optional[ConversationState]:
+        """Serve from the local cache while its version is current, else reload"""
+        if entry is not None:
+            version = self.backend.version(conversation_id)
+            if version is None:
+                # Closed by another worker
+                self._drop(conversation_id)
+                return None
+            if version == entry[2]:
+                self._entries[conversation_id] = (entry[0], self.clock(), version)
+                self._entries.move_to_end(conversation_id)
+                return entry[0]
+        
+        loaded = self.backend.load(conversation_id)
+        if loaded is None:
+            return None
+        version, state = loaded
+        self._cache(conversation_id, state, version)
+        return state
+    
+    def save(self, conversation_id: str) -> bool:
+        """
+        Write a cached conversation through to the shared backend
+        
+        Returns:
+            False if another worker saved it first; its newer state is then
+            cached instead and the local changes are dropped
+        """
+        if self.backend is None:
+            return True
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return True
+        try:
+            version = self.backend.save(entry[0], entry[2])
+        except StateConflict:
+            self._reload(conversation_id)
+            return False
+        self._entries[conversation_id] = (entry[0], self.clock(), version)
+        return True
+    
+    def _reload(self, conversation_id: str):
+        """Replace a stale cached copy with the backend's current state"""
+        logger.warning(f"Conversation {conversation_id} was saved by another worker; reloading")
+        loaded = self.backend.load(conversation_id)
+        if loaded is None:
+            self._drop(conversation_id)
+        else:
+            self._cache(conversation_id, loaded[1], loaded[0])
+    
+    def values(self) -> Iterator[ConversationState]:
+        """Conversations cached in this worker, without touching their recency"""
+        return (entry[0] for entry in self._entries.values())
+    
+    def items(self) -> Iterator[Tuple[str, ConversationState]]:
+        """(conversation_id, state) pairs cached in this worker, without touching their recency"""
+        return ((conversation_id, entry[0]) for conversation_id, entry in self._entries.items())
+    
+    def expire(self) -> int:
+        """
+        Evict conversations idle for longer than the TTL
+        
+        Returns:
+            Number of conversations expired
+        """
+        expired = self._expire_local()
+        if self._sweep_due():
+            expired += self._expired_in_backend(self.backend.expire(self.ttl))
+        return expired
+    
+    def _expire_local(self) -> int:
+        """Evict this worker's idle entries"""
+        deadline = self.clock() - self.ttl
+        expired = 0
+        # Access order means the idle conversations are all at the front
+        while self._entries:
+            oldest_id, (_, last_access, _) = next(iter(self._entries.items()))
+            if last_access > deadline:
+                break
+            self.evict(oldest_id, "expired")
+            expired += 1
+        return expired
+    
+    def _sweep_due(self) -> bool:
+        """Whether the backend is due for an idle sweep (and mark it swept)"""
+        now = self.clock()
+        if self.backend is None or now - self._last_sweep < self.sweep_interval:
+            return False
+        self._last_sweep = now
+        return True
+    
+    def _expired_in_backend(self, states: List[ConversationState]) -> int:
+        """Close the conversations the backend sweep removed"""
+        for state in states:
+            self._drop(state.conversation_id)
+            self._close(state, "expired")
+        return len(states)
+    
+    def evict(self, conversation_id: str, reason: str = "terminated") -> Optional[ConversationState]:
+        """
+        Persist a conversation and remove it from the store
+        
+        Args:
+            conversation_id: Conversation to remove
+            reason: Why it is leaving ('expired', 'capacity', 'max_length' or 'terminated')
+        
+        Returns:
+            The removed state, or None if the conversation was not active
+        """
+        entry = self._drop(conversation_id)
+        if self.backend is not None:
+            if reason not in self.CLOSING_REASONS:
+                # Only the cached copy goes; the conversation lives on in the backend
+                return entry[0] if entry else None
+            if entry is None:
+                loaded = self.backend.load(conversation_id)
+                entry = (loaded[1],) if loaded else None
+            if entry is not None:
+                self.backend.delete(conversation_id)
+        if entry is None:
+            return None
+        self._close(entry[0], reason)
+        return entry[0]
+    
+    async def get_async(self, conversation_id: str) -> Optional[ConversationState]:
+        """get() without blocking the event loop on the backend"""
+        if self.backend is None:
+            return self.get(conversation_id)
+        await self.expire_async()
+        if conversation_id in self._entries:
+            version = await asyncio.to_thread(self.backend.version, conversation_id)
+            # Re-read: another request may have changed the entry meanwhile
+            entry = self._entries.get(conversation_id)
+            if version is None:
+                self._drop(conversation_id)
+                return None
+            if entry is not None and version == entry[2]:
+                self._entries[conversation_id] = (entry[0], self.clock(), version)
+                self._entries.move_to_end(conversation_id)
+                return entry[0]
+        
+        loaded = await asyncio.to_thread(self.backend.load, conversation_id)
+        if loaded is None:
+            return None
+        version, state = loaded
+        self._cache(conversation_id, state, version)
+        return state
+    
+    async def put_async(self, conversation_id: str, state: ConversationState):
+        """store[conversation_id] = state without blocking the event loop on the backend"""
+        if self.backend is None:
+            self[conversation_id] = state
+            return
+        entry = self._entries.get(conversation_id)
+        try:
+            version = await asyncio.to_thread(self.backend.save, state, entry[2] if entry is not None else None)
+        except StateConflict:
+            await self._reload_async(conversation_id)
+            return
+        self._cache(conversation_id, state, version)
+    
+    async def save_async(self, conversation_id: str) -> bool:
+        """save() without blocking the event loop on the backend"""
+        if self.backend is None:
+            return True
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return True
+        try:
+            version = await asyncio.to_thread(self.backend.save, entry[0], entry[2])
+        except StateConflict:
+            await self._reload_async(conversation_id)
+            return False
+        entry = self._entries.get(conversation_id)
+        if entry is not None:
+            self._entries[conversation_id] = (entry[0], self.clock(), version)
+        return True
+    
+    async def evict_async(self, conversation_id: str, reason: str = "terminated") -> Optional[ConversationState]:
+        """evict() without blocking the event loop on the backend"""
+        if self.backend is None or reason not in self.CLOSING_REASONS:
+            return self.evict(conversation_id, reason)
+        entry = self._drop(conversation_id)
+        if entry is None:
+            loaded = await asyncio.to_thread(self.backend.load, conversation_id)
+            entry = (loaded[1],) if loaded else None
+        if entry is None:
+            return None
+        await asyncio.to_thread(self.backend.delete, conversation_id)
+        self._close(entry[0], reason)
+        return entry[0]
+    
+    async def expire_async(self) -> int:
+        """expire() with the backend sweep run in a thread"""
+        expired = self._expire_local()
+        if self._sweep_due():
+            expired += self._expired_in_backend(await asyncio.to_thread(self.backend.expire, self.ttl))
+        return expired
+    
+    async def _reload_async(self, conversation_id: str):
+        """_reload() without blocking the event loop on the backend"""
+        logger.warning(f"Conversation {conversation_id} was saved by another worker; reloading")
+        loaded = await asyncio.to_thread(self.backend.load, conversation_id)
+        if loaded is None:
+            self._drop(conversation_id)
+        else:
+            self._cache(conversation_id, loaded[1], loaded[0])
+    
+    def _drop(self, conversation_id: str):
+        """Remove a conversation's entry, if any, and return it"""
+        entry = self._entries.pop(conversation_id, None)
+        if entry is not None and self.on_leave is not None:
+            self.on_leave(entry[0])
+        return entry
+    
+    def _close(self, state: ConversationState, reason: str):
+        """Count and persist a conversation that is leaving for good"""
+        self.evictions[reason] = self.evictions.get(reason, 0) + 1
+        if self.on_evict is not None:
+            try:
+                self.on_evict(state)
+            except Exception as e:
+                logger.warning(f"Could not persist conversation {state.conversation_id}: {str(e)}")
+        logger.debug(f"Conversation {state.conversation_id} evicted ({reason})")
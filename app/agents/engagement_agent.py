@@ -1,8 +1,71 @@
 import json
 import asyncio
-from typing import List, Dict, Optional
-from app.models import ConversationState, ScamType
+from collections import Counter
+from typing import Any, List, Dict, Optional
+from app.models import ConversationState, ExtractedIntelligence, ScamType
 from app.config import Config
+from app.agents.conversation_store import ConversationStore
+from app.agents.state_backends import create_state_backend
+
+
+class EngagementCounters:
+    """
+    Running totals over the conversations held by this worker
+    
+    Updated as messages are appended and as conversations enter or leave
+    the store (new, reloaded, terminated, expired or evicted), so reading
+    them never scans the conversations.
+    """
+    
+    def __init__(self):
+        self.active = 0
+        self.messages = 0
+        self.messages_by_role: Counter = Counter()
+        self.engagement_levels: Counter = Counter()
+        self.scam_types: Counter = Counter()
+        self.personas: Counter = Counter()
+    
+    @staticmethod
+    def _scam_type(state: ConversationState) -> str:
+        return state.scam_type.value if state.scam_type else "unknown"
+    
+    def add(self, state: ConversationState, sign: int = 1):
+        """Count a conversation entering the store (sign=-1: leaving it)"""
+        self.active += sign
+        self.messages += sign * len(state.messages)
+        self.messages_by_role.update({role: sign * count for role, count in state.messages.role_counts().items()})
+        self.engagement_levels[state.engagement_level] += sign
+        self.scam_types[self._scam_type(state)] += sign
+        self.personas[state.scammer_persona] += sign
+    
+    def remove(self, state: ConversationState):
+        self.add(state, -1)
+    
+    def message(self, role: str):
+        self.messages += 1
+        self.messages_by_role[role] += 1
+    
+    def engagement_changed(self, old_level: int, new_level: int):
+        self.engagement_levels[old_level] -= 1
+        self.engagement_levels[new_level] += 1
+    
+    def scam_type_changed(self, old: str, new: str):
+        self.scam_types[old] -= 1
+        self.scam_types[new] += 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current totals, leaving out empty breakdown entries"""
+        def nonzero(counter: Counter) -> Dict[Any, int]:
+            return {key: count for key, count in sorted(counter.items()) if count}
+        
+        return {
+            "active": self.active,
+            "total_messages": self.messages,
+            "messages_by_role": nonzero(self.messages_by_role),
+            "engagement_levels": nonzero(self.engagement_levels),
+            "scam_types": nonzero(self.scam_types),
+            "personas": nonzero(self.personas),
+        }
 
 
 class EngagementAgent:
@@ -31,15 +94,25 @@ class EngagementAgent:
         'romance': "Express emotional attachment and ask how they want you to send money.",
     }
     
-    def __init__(self):
-        self.conversation_states: Dict[str, ConversationState] = {}
+    def __init__(self, conversation_states: Optional[ConversationStore] = None):
+        # Bounded store: idle and least recently used conversations are
+        # persisted and dropped instead of accumulating forever
+        if conversation_states is None:
+            conversation_states = ConversationStore(backend=create_state_backend())
+        self.conversation_states = conversation_states
+        self.counters = EngagementCounters()
+        for state in conversation_states.values():
+            self.counters.add(state)
+        conversation_states.on_enter = self.counters.add
+        conversation_states.on_leave = self.counters.remove
     
     async def engage_with_scammer(
         self,
         conversation_id: str,
         scammer_message: str,
         scam_type: Optional[ScamType],
-        persona: str = "elderly_person"
+        persona: str = "elderly_person",
+        intelligence: Optional[ExtractedIntelligence] = None
     ) -> str:
         """
         Generate an engagement response based on detected scam type
@@ -49,22 +122,28 @@ class EngagementAgent:
             scammer_message: Message from the scammer
             scam_type: Type of scam detected
             persona: Persona to use for engagement
-            
+            intelligence: Intelligence extracted from the conversation so far
+        
         Returns:
             Response string to engage the scammer
         """
         
         # Initialize or retrieve conversation state
-        if conversation_id not in self.conversation_states:
-            self.conversation_states[conversation_id] = ConversationState(
+        state = await self.conversation_states.get_async(conversation_id)
+        if state is None:
+            state = ConversationState(
                 conversation_id=conversation_id,
                 scammer_persona=persona
             )
-        
-        state = self.conversation_states[conversation_id]
+            await self.conversation_states.put_async(conversation_id, state)
+        if scam_type and scam_type != state.scam_type:
+            self.counters.scam_type_changed(EngagementCounters._scam_type(state), scam_type.value)
+            state.scam_type = scam_type
+        if intelligence is not None:
+            state.extracted_intel = intelligence
         
         # Add scammer message to history
-        state.messages.append({"role": "scammer", "content": scammer_message})
+        self._add_message(state, "scammer", scammer_message)
         
         # Build engagement prompt
         engagement_instruction = self._get_engagement_instruction(scam_type)
@@ -79,13 +158,26 @@ class EngagementAgent:
         )
         
         # Add our response to history
-        state.messages.append({"role": "honeypot", "content": response})
+        self._add_message(state, "honeypot", response)
         
         # Update engagement level
-        state.engagement_level = min(state.engagement_level + 10, 100)
+        level = min(state.engagement_level + 10, 100)
+        self.counters.engagement_changed(state.engagement_level, level)
+        state.engagement_level = level
+        
+        # Auto-terminate once the conversation reaches its maximum length
+        if len(state.messages) >= Config.MAX_CONVERSATION_LENGTH:
+            state.is_active = False
+            await self.conversation_states.evict_async(conversation_id, "max_length")
+        else:
+            await self.conversation_states.save_async(conversation_id)
         
         return response
     
+    def _add_message(self, state: ConversationState, role: str, content: str):
+        state.messages.add(role, content)
+        self.counters.message(role)
+    
     def _get_engagement_instruction(self, scam_type: Optional[ScamType]) -> str:
         """Get specific engagement instruction for scam type"""
         if scam_type and scam_type.value in self.ENGAGEMENT_PROMPTS:
@@ -177,9 +269,22 @@ class EngagementAgent:
         """Retrieve conversation state"""
         return self.conversation_states.get(conversation_id)
     
+    async def get_conversation_state_async(self, conversation_id: str) -> Optional[ConversationState]:
+        """Retrieve conversation state without blocking the event loop"""
+        return await self.conversation_states.get_async(conversation_id)
+    
     def terminate_conversation(self, conversation_id: str) -> bool:
-        """Terminate a conversation"""
-        if conversation_id in self.conversation_states:
-            del self.conversation_states[conversation_id]
-            return True
-        return False
+        """Terminate a conversation, persisting it first"""
+        state = self.conversation_states.evict(conversation_id, "terminated")
+        if state is None:
+            return False
+        state.is_active = False
+        return True
+    
+    async def terminate_conversation_async(self, conversation_id: str) -> bool:
+        """Terminate a conversation without blocking the event loop"""
+        state = await self.conversation_states.evict_async(conversation_id, "terminated")
+        if state is None:
+            return False
+        state.is_active = False
+        return True
@@ -0,0 +1,266 @@
+"""
+Shared conversation state backends
+Let several workers serve the same conversation by keeping its state
+outside the process; each worker caches states locally (see ConversationStore)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Hashable, List, Optional, Tuple
+from app.models import ConversationState
+from app.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class StateConflict(Exception):
+    """Another worker saved the conversation since the expected version was read"""
+
+
+class StateBackend:
+    """
+    Interface for shared conversation state
+    
+    Every save produces a new version. Workers compare the cheap `version`
+    lookup against the version they cached and only reload on a mismatch,
+    and pass that version to `save` so a stale copy never overwrites a
+    newer one. States are stored as their Pydantic JSON.
+    """
+    
+    def version(self, conversation_id: str) -> Optional[Hashable]:
+        """Current version of a conversation, or None if it does not exist"""
+        raise NotImplementedError
+    
+    def load(self, conversation_id: str) -> Optional[Tuple[Hashable, ConversationState]]:
+        """(version, state) of a conversation, or None if it does not exist"""
+        raise NotImplementedError
+    
+    def save(self, state: ConversationState, expected: Optional[Hashable] = None) -> Hashable:
+        """
+        Store a conversation and return its new version
+        
+        Args:
+            state: Conversation to store
+            expected: Version the caller last read; the save raises
+                StateConflict if the stored version differs (None writes
+                unconditionally)
+        
+        Returns:
+            The new version
+        """
+        raise NotImplementedError
+    
+    def delete(self, conversation_id: str):
+        """Remove a conversation"""
+        raise NotImplementedError
+    
+    def expire(self, idle_seconds: float) -> List[ConversationState]:
+        """Remove and return conversations not saved for `idle_seconds`"""
+        raise NotImplementedError
+    
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class SQLStateBackend(StateBackend):
+    """State backend on the honeypot database (the `conversation_states` table)"""
+    
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from app.database import SessionLocal as session_factory
+        from app.database import ConversationStateRecord
+        self.session_factory = session_factory
+        self.record = ConversationStateRecord
+    
+    def version(self, conversation_id: str) -> Optional[int]:
+        with self.session_factory() as db:
+            return db.query(self.record.version).filter(
+                self.record.conversation_id == conversation_id
+            ).scalar()
+    
+    def load(self, conversation_id: str) -> Optional[Tuple[int, ConversationState]]:
+        with self.session_factory() as db:
+            row = db.query(self.record.version, self.record.state_json).filter(
+                self.record.conversation_id == conversation_id
+            ).first()
+        if row is None:
+            return None
+        return row.version, ConversationState.model_validate_json(row.state_json)
+    
+    def save(self, state: ConversationState, expected: Optional[int] = None) -> int:
+        data = state.model_dump_json()
+        conversation_id = state.conversation_id
+        with self.session_factory() as db:
+            while True:
+                current = expected
+                if current is None:
+                    current = db.query(self.record.version).filter(
+                        self.record.conversation_id == conversation_id
+                    ).scalar()
+                    if current is None:
+                        if self._insert(db, conversation_id, data):
+                            return 1
+                        continue  # another worker created it first; update theirs
+                # Compare-and-set: only the writer that read `current` wins
+                updated = db.query(self.record).filter(
+                    self.record.conversation_id == conversation_id,
+                    self.record.version == current
+                ).update(
+                    {
+                        self.record.version: current + 1,
+                        self.record.state_json: data,
+                        self.record.updated_at: time.time(),
+                    },
+                    synchronize_session=False
+                )
+                db.commit()
+                if updated:
+                    return current + 1
+                if expected is not None:
+                    raise StateConflict(f"Conversation {conversation_id} changed since version {expected}")
+    
+    def _insert(self, db, conversation_id: str, data: str) -> bool:
+        """Insert version 1 unless the conversation already exists; True if inserted"""
+        from sqlalchemy.exc import IntegrityError
+        from app.database import _dialect_insert
+        row = {"conversation_id": conversation_id, "version": 1, "state_json": data, "updated_at": time.time()}
+        insert = _dialect_insert(db, self.record)
+        if insert is not None:
+            inserted = db.execute(insert.values(**row).on_conflict_do_nothing(index_elements=["conversation_id"])).rowcount
+            db.commit()
+            return inserted == 1
+        try:
+            db.add(self.record(**row))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+    
+    def delete(self, conversation_id: str):
+        with self.session_factory() as db:
+            db.query(self.record).filter(self.record.conversation_id == conversation_id).delete()
+            db.commit()
+    
+    def expire(self, idle_seconds: float) -> List[ConversationState]:
+        deadline = time.time() - idle_seconds
+        with self.session_factory() as db:
+            idle = db.query(self.record).filter(self.record.updated_at < deadline)
+            states = [ConversationState.model_validate_json(row.state_json) for row in idle]
+            idle.delete(synchronize_session=False)
+            db.commit()
+        return states
+    
+    def __len__(self) -> int:
+        with self.session_factory() as db:
+            return db.query(self.record).count()
+
+
+class FileStateBackend(StateBackend):
+    """
+    State backend with one JSON file per conversation in a shared directory
+    
+    Files are replaced atomically, so the version is the file's
+    (inode, mtime) and checking it costs a single stat call. A conditional
+    save checks the version and replaces the file under an exclusive
+    flock on the directory's lock file, so it is only safe for workers
+    on one host (and best-effort where fcntl is unavailable).
+    """
+    
+    def __init__(self, directory: str = Config.STATE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def _path(self, conversation_id: str) -> Path:
+        # Hex-encode the id so any id maps to a safe file name
+        return self.directory / f"{conversation_id.encode('utf-8').hex()}.json"
+    
+    @staticmethod
+    def _version(stat: os.stat_result) -> Tuple[int, int]:
+        return stat.st_ino, stat.st_mtime_ns
+    
+    def version(self, conversation_id: str) -> Optional[Tuple[int, int]]:
+        try:
+            return self._version(os.stat(self._path(conversation_id)))
+        except FileNotFoundError:
+            return None
+    
+    def load(self, conversation_id: str) -> Optional[Tuple[Tuple[int, int], ConversationState]]:
+        try:
+            with open(self._path(conversation_id), 'rb') as f:
+                version = self._version(os.fstat(f.fileno()))
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        return version, ConversationState.model_validate_json(data)
+    
+    @contextmanager
+    def _locked(self):
+        """Hold the directory's exclusive lock"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.directory / ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def save(self, state: ConversationState, expected: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+        path = self._path(state.conversation_id)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(state.model_dump_json().encode('utf-8'))
+        with self._locked():
+            if expected is not None and self.version(state.conversation_id) != expected:
+                os.unlink(temp_path)
+                raise StateConflict(f"Conversation {state.conversation_id} changed since version {expected}")
+            os.replace(temp_path, path)
+            return self._version(os.stat(path))
+    
+    def delete(self, conversation_id: str):
+        try:
+            os.unlink(self._path(conversation_id))
+        except FileNotFoundError:
+            pass
+    
+    def expire(self, idle_seconds: float) -> List[ConversationState]:
+        deadline = time.time_ns() - int(idle_seconds * 1e9)
+        states = []
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime_ns >= deadline:
+                    continue
+                states.append(ConversationState.model_validate_json(path.read_bytes()))
+                os.unlink(path)
+            except FileNotFoundError:
+                continue  # another worker got there first
+        return states
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+
+def create_state_backend(name: str = Config.STATE_BACKEND) -> Optional[StateBackend]:
+    """
+    Build the configured state backend
+    
+    Args:
+        name: 'memory' (state stays in this worker), 'sql' or 'file'
+    
+    Returns:
+        The backend, or None for in-process state
+    """
+    if name == "memory":
+        return None
+    if name == "sql":
+        return SQLStateBackend()
+    if name == "file":
+        return FileStateBackend()
+    raise ValueError(f"Unknown state backend: {name}")
@@ -13,17 +13,108 @@ class Config:
     # Mock Scammer API
     MOCK_SCAMMER_API_URL = os.getenv("MOCK_SCAMMER_API_URL", "http://localhost:8001")
     MOCK_SCAMMER_API_KEY = os.getenv("MOCK_SCAMMER_API_KEY", "")
+    MOCK_SCAMMER_POOL_LIMIT = int(os.getenv("MOCK_SCAMMER_POOL_LIMIT", 100))  # total pooled connections
+    MOCK_SCAMMER_POOL_LIMIT_PER_HOST = int(os.getenv("MOCK_SCAMMER_POOL_LIMIT_PER_HOST", 50))
+    MOCK_SCAMMER_KEEPALIVE_TIMEOUT = float(os.getenv("MOCK_SCAMMER_KEEPALIVE_TIMEOUT", 30))  # seconds idle before closing
+    MOCK_SCAMMER_DNS_CACHE_TTL = int(os.getenv("MOCK_SCAMMER_DNS_CACHE_TTL", 300))  # seconds
+    MOCK_SCAMMER_TIMEOUT = float(os.getenv("MOCK_SCAMMER_TIMEOUT", 10))  # seconds per request
     
     # Server Configuration
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8000))
     DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+    # Seconds open connections (e.g. /events streams) get to finish on shutdown
+    SHUTDOWN_TIMEOUT = int(os.getenv("SHUTDOWN_TIMEOUT", 10))
+    
+    # Logging: level of the honeypot logger, and size-based log file rotation
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # DEBUG also logs request payloads
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
     
     # Honeypot Configuration
     MAX_CONVERSATION_LENGTH = 20  # Max messages before auto-terminate
+    MAX_ACTIVE_CONVERSATIONS = int(os.getenv("MAX_ACTIVE_CONVERSATIONS", 10000))  # LRU eviction beyond this
+    CONVERSATION_IDLE_TTL = int(os.getenv("CONVERSATION_IDLE_TTL", 1800))  # seconds
+    
+    # Database storage profile (see app/database.py)
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # ms to wait on a locked database
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -65536))  # negative means KiB (64 MiB)
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))  # bytes (256 MiB)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))  # non-SQLite databases
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds
+    
+    # Background database writes: flush after this many rows or seconds
+    DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", 500))
+    DB_WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", 1.0))
+    
+    # Detection/extraction offload: "inline", "thread" or "process" pool;
+    # inputs shorter than OFFLOAD_INLINE_BELOW characters always run inline
+    OFFLOAD_MODE = os.getenv("OFFLOAD_MODE", "thread")
+    OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", 0))  # 0: min(4, CPU count)
+    OFFLOAD_INLINE_BELOW = int(os.getenv("OFFLOAD_INLINE_BELOW", 2000))
+    
+    # Event-loop lag sampling period and the lag logged as a stall (seconds)
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.25))
+    LOOP_LAG_WARN = float(os.getenv("LOOP_LAG_WARN", 0.1))
+    
+    # Event-loop stack sampling for /metrics/profile, seconds between samples (0: off)
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0))
+    
+    # Streaming ingestion (/ingest/stream): records parsed ahead of processing
+    # per connection, records processed together, and the longest line accepted
+    INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", 256))
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+    INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", 65536))
+    
+    # Analytics event history: events kept per log, and an optional file the
+    # detection message text goes to instead of memory, in fixed-size slots
+    ANALYTICS_EVENT_CAPACITY = int(os.getenv("ANALYTICS_EVENT_CAPACITY", 1000))
+    ANALYTICS_SPILL_PATH = os.getenv("ANALYTICS_SPILL_PATH", "")  # suffixed with the pid; empty: keep in memory
+    ANALYTICS_SPILL_SLOT_BYTES = int(os.getenv("ANALYTICS_SPILL_SLOT_BYTES", 1024))
+    
+    # Live dashboard events (/events): seconds between coalesced frames, seconds
+    # between keepalives, frames queued per slow client before it is resynced,
+    # and detections carried per frame
+    EVENTS_COALESCE_INTERVAL = float(os.getenv("EVENTS_COALESCE_INTERVAL", 1.0))
+    EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", 15))
+    EVENTS_MAX_QUEUE = int(os.getenv("EVENTS_MAX_QUEUE", 32))
+    EVENTS_MAX_DETECTIONS = int(os.getenv("EVENTS_MAX_DETECTIONS", 20))
+    
+    # Analytics trend rollups: how long minute, hour and day buckets are kept,
+    # and how often new counts are written to the database (seconds)
+    ROLLUP_MINUTE_RETENTION_HOURS = int(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", 48))
+    ROLLUP_HOUR_RETENTION_DAYS = int(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", 90))
+    ROLLUP_DAY_RETENTION_DAYS = int(os.getenv("ROLLUP_DAY_RETENTION_DAYS", 730))
+    ROLLUP_FLUSH_INTERVAL = float(os.getenv("ROLLUP_FLUSH_INTERVAL", 60))
+    
+    # Where live conversation state is kept: "memory" (this worker only),
+    # or "sql" / "file" to share it between workers
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+    STATE_DIR = os.getenv("STATE_DIR", "state")  # used by the file backend
     SCAM_DETECTION_THRESHOLD = 0.6
     EXTRACTION_TIMEOUT = 30  # seconds
     
+    # Cascade detection: rule confidences strictly inside this band are
+    # ambiguous and get a second opinion from the ML model. By default
+    # everything from one indicator (0.1) up to four (0.4) is escalated:
+    # weak negatives can be promoted, weak positives get their type and
+    # confidence refined, and fusion never demotes a rule positive
+    CASCADE_ML_LOWER = float(os.getenv("CASCADE_ML_LOWER", 0.0))
+    CASCADE_ML_UPPER = float(os.getenv("CASCADE_ML_UPPER", 0.5))
+    CASCADE_ML_WEIGHT = float(os.getenv("CASCADE_ML_WEIGHT", 0.5))  # ML share of the fused confidence
+    
+    # Confidence added when a message reuses an indicator seen in earlier scams
+    KNOWN_INDICATOR_BOOST = float(os.getenv("KNOWN_INDICATOR_BOOST", 0.3))
+    INDICATOR_INDEX_MAX_ENTRIES = int(os.getenv("INDICATOR_INDEX_MAX_ENTRIES", 100000))  # least recently seen go first
+    INDICATOR_MAX_CONVERSATION_IDS = int(os.getenv("INDICATOR_MAX_CONVERSATION_IDS", 32))  # remembered per indicator
+    
+    # ML model artifact (retrain with: python -m app.services.ml_detector)
+    ML_MODEL_PATH = os.getenv("ML_MODEL_PATH", "models/ml_scam_detector.joblib")
+    
     # Personas for engagement
     SCAMMER_PERSONAS = {
         "elderly_person": "I'm an elderly person who might be vulnerable",
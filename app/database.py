@@ -3,19 +3,68 @@ Database Models for Agentic Honeypot
 Enables persistent storage of conversations and intelligence
 """
 
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, JSON
+from sqlalchemy import create_engine, event, Column, String, Integer, BigInteger, Float, DateTime, Text, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import argparse
 import os
+from app.config import Config
+from app.models import INDICATOR_TYPES
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./honeypot.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# writer, and synchronous=NORMAL only syncs at checkpoints (safe under WAL)
+SQLITE_PRAGMAS = {
+    "journal_mode": Config.SQLITE_JOURNAL_MODE,
+    "synchronous": Config.SQLITE_SYNCHRONOUS,
+    "busy_timeout": Config.SQLITE_BUSY_TIMEOUT,
+    "cache_size": Config.SQLITE_CACHE_SIZE,
+    "mmap_size": Config.SQLITE_MMAP_SIZE,
+    "temp_store": "MEMORY",
+}
+
+
+def create_db_engine(url: str = DATABASE_URL, sqlite_pragmas: Optional[Dict[str, object]] = None):
+    """
+    Create an engine with the storage profile for its backend
+    
+    SQLite connections get `sqlite_pragmas` (SQLITE_PRAGMAS by default) on
+    connect; other databases get an explicitly sized connection pool.
+    """
+    url_info = make_url(url)
+    if url_info.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            pool_timeout=Config.DB_POOL_TIMEOUT,
+            pool_recycle=Config.DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+    
+    pragmas = dict(SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+    if url_info.database in (None, "", ":memory:"):
+        pragmas.pop("journal_mode", None)  # in-memory databases cannot use WAL
+    
+    sqlite_engine = create_engine(url, connect_args={"check_same_thread": False})
+    
+    @event.listens_for(sqlite_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    
+    return sqlite_engine
+
+
+engine = create_db_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -50,6 +99,19 @@ class ConversationRecord(Base):
         return f"<ConversationRecord {self.conversation_id}>"
 
 
+class ConversationStateRecord(Base):
+    """Live conversation state shared between workers"""
+    __tablename__ = "conversation_states"
+    
+    conversation_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)  # bumped on every save
+    state_json = Column(Text, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)  # epoch seconds
+    
+    def __repr__(self):
+        return f"<ConversationStateRecord {self.conversation_id} v{self.version}>"
+
+
 class IntelligenceRecord(Base):
     """Database model for storing extracted intelligence"""
     __tablename__ = "intelligence"
@@ -66,6 +128,25 @@ class IntelligenceRecord(Base):
         return f"<IntelligenceRecord {self.intelligence_type}: {self.value}>"
 
 
+class IndicatorLinkRecord(Base):
+    """Normalized indicator -> conversation links, one row per indicator per conversation"""
+    __tablename__ = "indicator_links"
+    __table_args__ = (
+        # Also the index for (intelligence_type, value) pivot lookups
+        UniqueConstraint("intelligence_type", "value", "conversation_id", name="uq_indicator_links_type_value_conversation"),
+        Index("ix_indicator_links_conversation_found", "conversation_id", "found_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    intelligence_type = Column(String, nullable=False)
+    value = Column(String, nullable=False)
+    conversation_id = Column(String, nullable=False)
+    found_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<IndicatorLinkRecord {self.intelligence_type}: {self.value} in {self.conversation_id}>"
+
+
 class ScamPatternRecord(Base):
     """Database model for tracking scam patterns"""
     __tablename__ = "scam_patterns"
@@ -81,6 +162,19 @@ class ScamPatternRecord(Base):
         return f"<ScamPatternRecord {self.scam_type}: {self.pattern}>"
 
 
+class RollupRecord(Base):
+    """Event count for one time bucket of an analytics series"""
+    __tablename__ = "analytics_rollups"
+    
+    series = Column(String, primary_key=True)
+    resolution = Column(Integer, primary_key=True)  # bucket width in seconds
+    bucket_start = Column(BigInteger, primary_key=True)  # epoch seconds, a multiple of resolution
+    count = Column(Float, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<RollupRecord {self.series}@{self.resolution}s {self.bucket_start}: {self.count:g}>"
+
+
 # Create all tables
 Base.metadata.create_all(bind=engine)
 
@@ -106,7 +200,8 @@ def save_conversation(conversation_id: str, conv_data: dict, db=None):
             conversation_id=conversation_id,
             **conv_data
         )
-        db.add(record)
+        # merge so a conversation saved again replaces its earlier record
+        record = db.merge(record)
         db.commit()
         return record
     except Exception as e:
@@ -140,6 +235,18 @@ def save_intelligence(conversation_id: str, intelligence_type: str, value: str,
             IntelligenceRecord.value == value
         ).first()
         
+        linked = db.query(IndicatorLinkRecord.id).filter(
+            IndicatorLinkRecord.intelligence_type == intelligence_type,
+            IndicatorLinkRecord.value == value,
+            IndicatorLinkRecord.conversation_id == conversation_id
+        ).first()
+        if not linked:
+            db.add(IndicatorLinkRecord(
+                conversation_id=conversation_id,
+                intelligence_type=intelligence_type,
+                value=value
+            ))
+        
         if not existing:
             record = IntelligenceRecord(
                 conversation_id=conversation_id,
@@ -149,9 +256,341 @@ def save_intelligence(conversation_id: str, intelligence_type: str, value: str,
             db.add(record)
             db.commit()
             return record
+        db.commit()
         return existing
     except Exception as e:
         db.rollback()
         raise e
     finally:
         db.close()
+
+
+# Bulk writes (used by the background DatabaseWriter)
+
+def _dialect_insert(db, model):
+    """INSERT construct with ON CONFLICT support, or None if the dialect has none"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    return None
+
+
+def save_conversations_batch(rows: List[dict], db=None) -> int:
+    """
+    Upsert many conversations in one transaction
+    
+    Args:
+        rows: ConversationRecord column dicts, each with a conversation_id
+    
+    Returns:
+        Number of rows written
+    """
+    if not rows:
+        return 0
+    if db is None:
+        db = SessionLocal()
+    
+    try:
+        insert = _dialect_insert(db, ConversationRecord)
+        if insert is None:
+            for row in rows:
+                db.merge(ConversationRecord(**row))
+        else:
+            now = datetime.utcnow()
+            rows = [{"created_at": now, "updated_at": now, **row} for row in rows]
+            columns = set().union(*rows) - {"conversation_id", "created_at"}
+            db.execute(insert.on_conflict_do_update(
+                index_elements=["conversation_id"],
+                set_={column: insert.excluded[column] for column in columns}
+            ), rows)
+        db.commit()
+        return len(rows)
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def _insert_ignoring_duplicates(db, model, rows: List[dict], key_columns: List[str]):
+    """Insert rows, skipping any whose key columns match an existing or earlier row"""
+    insert = _dialect_insert(db, model)
+    if insert is not None:
+        db.execute(insert.on_conflict_do_nothing(index_elements=key_columns), rows)
+        return
+    
+    def key(row) -> tuple:
+        return tuple(row[column] for column in key_columns)
+    
+    first_column = getattr(model, key_columns[0])
+    candidates = {row[key_columns[0]] for row in rows}
+    known = set(db.query(*(getattr(model, column) for column in key_columns)).filter(first_column.in_(candidates)))
+    for row in rows:
+        if key(row) not in known:
+            known.add(key(row))
+            db.add(model(**row))
+
+
+def save_intelligence_batch(rows: List[dict], db=None) -> int:
+    """
+    Record many indicator sightings in one transaction
+    
+    Each indicator is linked to its conversation in IndicatorLinkRecord, and
+    values not seen before are added to IntelligenceRecord.
+    
+    Args:
+        rows: Column dicts (conversation_id, intelligence_type, value)
+    
+    Returns:
+        Number of rows submitted
+    """
+    if not rows:
+        return 0
+    if db is None:
+        db = SessionLocal()
+    
+    try:
+        now = datetime.utcnow()
+        rows = [{"found_at": now, **row} for row in rows]
+        _insert_ignoring_duplicates(db, IntelligenceRecord, rows, ["value"])
+        _insert_ignoring_duplicates(db, IndicatorLinkRecord, rows, ["intelligence_type", "value", "conversation_id"])
+        db.commit()
+        return len(rows)
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+# Analytics rollups (used by RollupStore)
+
+def save_rollups_batch(rows: List[dict], db=None) -> int:
+    """
+    Add counts to rollup buckets, creating the ones not stored yet
+    
+    Every worker flushes only what it counted since its last flush, so
+    adding keeps the stored totals right however many workers write.
+    
+    Args:
+        rows: Column dicts (series, resolution, bucket_start, count), with
+            the count to add
+    
+    Returns:
+        Number of rows written
+    """
+    if not rows:
+        return 0
+    if db is None:
+        db = SessionLocal()
+    
+    try:
+        insert = _dialect_insert(db, RollupRecord)
+        if insert is None:
+            for row in rows:
+                record = db.get(RollupRecord, (row["series"], row["resolution"], row["bucket_start"]))
+                if record is None:
+                    db.add(RollupRecord(**row))
+                else:
+                    record.count += row["count"]
+        else:
+            db.execute(insert.on_conflict_do_update(
+                index_elements=["series", "resolution", "bucket_start"],
+                set_={"count": RollupRecord.count + insert.excluded.count}
+            ), rows)
+        db.commit()
+        return len(rows)
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def load_rollups(since: Dict[int, int], db=None) -> List[Tuple[str, int, int, float]]:
+    """
+    Stored rollup buckets newer than a cutoff per resolution
+    
+    Args:
+        since: Earliest bucket_start to load, keyed by resolution
+    
+    Returns:
+        (series, resolution, bucket_start, count) tuples
+    """
+    if db is None:
+        db = SessionLocal()
+    
+    try:
+        rows = []
+        for resolution, cutoff in since.items():
+            rows.extend(db.query(
+                RollupRecord.series, RollupRecord.resolution, RollupRecord.bucket_start, RollupRecord.count
+            ).filter(RollupRecord.resolution == resolution, RollupRecord.bucket_start >= cutoff))
+        return [tuple(row) for row in rows]
+    finally:
+        db.close()
+
+
+def prune_rollups(before: Dict[int, int], db=None) -> int:
+    """
+    Delete rollup buckets older than a cutoff per resolution
+    
+    Returns:
+        Number of rows deleted
+    """
+    if db is None:
+        db = SessionLocal()
+    
+    try:
+        deleted = 0
+        for resolution, cutoff in before.items():
+            deleted += db.query(RollupRecord).filter(
+                RollupRecord.resolution == resolution, RollupRecord.bucket_start < cutoff
+            ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+# Indicator pivots (served by the indicator_links indexes)
+
+def find_conversations_by_indicator(value: str, intelligence_type: Optional[str] = None,
+                                    limit: int = 100, db=None) -> List[Tuple[str, str, datetime]]:
+    """
+    Conversations an indicator was seen in, most recent first
+    
+    Args:
+        value: Indicator value (UPI ID, phone number, link, ...)
+        intelligence_type: Restrict to one type, e.g. 'upi_id'
+        limit: Maximum number of conversations
+    
+    Returns:
+        [(conversation_id, intelligence_type, found_at), ...]
+    """
+    if db is None:
+        db = SessionLocal()
+    
+    try:
+        # Constraining the leading type column (to every type if none is
+        # given) keeps the lookup on the (type, value, conversation) index
+        types = [intelligence_type] if intelligence_type else list(INDICATOR_TYPES.values())
+        rows = db.query(
+            IndicatorLinkRecord.conversation_id, IndicatorLinkRecord.intelligence_type, IndicatorLinkRecord.found_at
+        ).filter(
+            IndicatorLinkRecord.intelligence_type.in_(types),
+            IndicatorLinkRecord.value == value
+        ).order_by(IndicatorLinkRecord.found_at.desc()).limit(limit).all()
+        return [tuple(row) for row in rows]
+    finally:
+        db.close()
+
+
+def get_conversation_indicators(conversation_id: str, db=None) -> List[Tuple[str, str, datetime]]:
+    """
+    Indicators seen in a conversation, in the order they were found
+    
+    Returns:
+        [(intelligence_type, value, found_at), ...]
+    """
+    if db is None:
+        db = SessionLocal()
+    
+    try:
+        rows = db.query(
+            IndicatorLinkRecord.intelligence_type, IndicatorLinkRecord.value, IndicatorLinkRecord.found_at
+        ).filter(
+            IndicatorLinkRecord.conversation_id == conversation_id
+        ).order_by(IndicatorLinkRecord.found_at).all()
+        return [tuple(row) for row in rows]
+    finally:
+        db.close()
+
+
+# Schema migration
+
+def migrate_schema(target_engine=None, chunk_size: int = 1000) -> Dict[str, int]:
+    """
+    Bring an existing database up to the current schema
+    
+    Creates missing tables and indexes, then backfills indicator_links from
+    the intelligence table and the JSON indicator columns of conversations,
+    one chunk per transaction. Safe to re-run: existing links are skipped.
+    
+    Returns:
+        Number of link rows submitted from each source
+    """
+    target_engine = target_engine or engine
+    Base.metadata.create_all(bind=target_engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=target_engine)
+    key_columns = ["intelligence_type", "value", "conversation_id"]
+    counts = {"intelligence": 0, "conversations": 0}
+    
+    last_id = 0
+    while True:
+        with Session() as db:
+            chunk = db.query(IntelligenceRecord).filter(
+                IntelligenceRecord.id > last_id,
+                IntelligenceRecord.conversation_id.isnot(None),
+                IntelligenceRecord.intelligence_type.isnot(None)
+            ).order_by(IntelligenceRecord.id).limit(chunk_size).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            rows = [{
+                "intelligence_type": record.intelligence_type,
+                "value": record.value,
+                "conversation_id": record.conversation_id,
+                "found_at": record.found_at,
+            } for record in chunk]
+            _insert_ignoring_duplicates(db, IndicatorLinkRecord, rows, key_columns)
+            db.commit()
+            counts["intelligence"] += len(rows)
+    
+    last_conversation = ""
+    while True:
+        with Session() as db:
+            chunk = db.query(ConversationRecord).filter(
+                ConversationRecord.conversation_id > last_conversation
+            ).order_by(ConversationRecord.conversation_id).limit(chunk_size).all()
+            if not chunk:
+                break
+            last_conversation = chunk[-1].conversation_id
+            rows = [
+                {
+                    "intelligence_type": intelligence_type,
+                    "value": value,
+                    "conversation_id": record.conversation_id,
+                    "found_at": record.created_at,
+                }
+                for record in chunk
+                for field, intelligence_type in INDICATOR_TYPES.items()
+                for value in getattr(record, field) or []
+            ]
+            if rows:
+                _insert_ignoring_duplicates(db, IndicatorLinkRecord, rows, key_columns)
+                db.commit()
+                counts["conversations"] += len(rows)
+    
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Honeypot database maintenance")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    
+    if args.command == "migrate":
+        counts = migrate_schema(chunk_size=args.chunk_size)
+        print(f"Schema up to date; backfilled indicator links from {counts['intelligence']} intelligence "
+              f"rows and {counts['conversations']} conversation indicators")
+
+
+if __name__ == "__main__":
+    main()
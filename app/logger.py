@@ -1,9 +1,13 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from datetime import datetime
 import json
 from pathlib import Path
 import os
+from app.config import Config
 
 # Configure encoding for Windows console
 if sys.platform == 'win32':
@@ -15,13 +19,22 @@ if sys.platform == 'win32':
 logs_dir = Path("logs")
 logs_dir.mkdir(exist_ok=True)
 
+# Listeners writing queued records, by the name of the logger set up here
+_listeners = {}
+
 # Configure logging
 def setup_logger(name: str = "honeypot"):
-    """Setup logging configuration"""
+    """
+    Setup logging configuration
+    
+    The logger only puts records on a queue; a background listener thread
+    does the formatting and console/file I/O, so logging never blocks the
+    event loop on a write. The log file rotates by size.
+    """
     
     # Create logger
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(Config.LOG_LEVEL)
     
     # Create formatters without emojis for terminal
     detailed_formatter = logging.Formatter(
@@ -38,16 +51,62 @@ def setup_logger(name: str = "honeypot"):
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(simple_formatter)
-    logger.addHandler(console_handler)
     
-    # File Handler (DEBUG level) - can include emojis
-    file_handler = logging.FileHandler(f'logs/{name}_{datetime.now().strftime("%Y%m%d")}.log', encoding='utf-8')
+    # File Handler (DEBUG level) - can include emojis; rotated by size and
+    # opened on the first record, so a process that never logs to it (a
+    # pool worker importing this module) leaves the file alone
+    file_handler = logging.handlers.RotatingFileHandler(
+        f'logs/{name}_{datetime.now().strftime("%Y%m%d")}.log',
+        maxBytes=Config.LOG_MAX_BYTES,
+        backupCount=Config.LOG_BACKUP_COUNT,
+        encoding='utf-8',
+        delay=True
+    )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(detailed_formatter)
-    logger.addHandler(file_handler)
+    
+    # Queue in front of both handlers, drained by a listener thread
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
     
     return logger
 
+
+def setup_worker_logger(name: str = "honeypot"):
+    """
+    Reconfigure a logger inside a process pool worker
+    
+    Workers write straight to stderr instead of the log file: each one
+    rotating the parent's file would rename it out from under the others.
+    A forked worker also inherits the queue handler but not the listener
+    thread draining it, so its records would pile up unwritten.
+    """
+    logger = logging.getLogger(name)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    listener = _listeners.pop(name, None)
+    if listener is not None:
+        listener.stop()
+    
+    worker_handler = logging.StreamHandler(sys.stderr)
+    worker_handler.setLevel(logging.INFO)
+    worker_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(levelname)s - [worker %(process)d] - %(message)s',
+        datefmt='%H:%M:%S'
+    ))
+    logger.addHandler(worker_handler)
+    return logger
+
+
+@atexit.register
+def stop_logging():
+    """Write out queued records and stop the listener threads"""
+    while _listeners:
+        _listeners.popitem()[1].stop()
+
 # Create main logger
 logger = setup_logger("honeypot")
 
@@ -58,8 +117,9 @@ class APILogger:
     def log_request(endpoint: str, method: str, data: dict = None):
         """Log incoming request"""
         logger.info(f"[{method}] REQUEST: {endpoint}")
-        if data:
-            logger.debug(f"   Data: {json.dumps(data, indent=2)[:200]}...")
+        # Only serialize the payload when debug records are kept
+        if data and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"   Data: {json.dumps(data)[:200]}...")
     
     @staticmethod
     def log_response(endpoint: str, status_code: int, response_time_ms: float):
@@ -86,9 +146,9 @@ class APILogger:
     def log_error(endpoint: str, error: str, exception=None):
         """Log errors"""
         logger.error(f"[ERROR] on {endpoint}: {error}")
-        if exception:
+        if exception and logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"   Exception: {str(exception)}")
 
 # Export logger
-__all__ = ['logger', 'APILogger', 'setup_logger']
+__all__ = ['logger', 'APILogger', 'setup_logger', 'setup_worker_logger', 'stop_logging']
 
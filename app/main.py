@@ -1,17 +1,79 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import uuid
 import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from app.models import ScamMessage, HoneypotResponse, ExtractedIntelligence
-from app.services.detector import ScamDetector
+from typing import Any, Dict, List, Optional
+from app.models import ScamMessage, HoneypotResponse, ExtractedIntelligence, DetectionResult, ConversationState, INDICATOR_TYPES
+from app.services.cascade_detector import CascadeDetector
 from app.services.extractor import IntelligenceExtractor
+from app.services.indicator_index import IndicatorIndex
+from app.services.analytics import analytics_engine
+from app.services.stream_ingest import IngestStreamResponse, StreamIngestor
+from app.services.live_events import EventBroadcaster
+from app.services import offload
+from app.services.offload import Offloader, LoopLagMonitor
+from app.services.metrics import MetricsRegistry, MetricsMiddleware, StackSampler
+from app.services.db_writer import DatabaseWriter
+from app.agents.conversation_store import ConversationStore
+from app.agents.state_backends import create_state_backend
 from app.agents.engagement_agent import EngagementAgent
 from app.config import Config
 from app.logger import logger, APILogger
 
+# Write-behind persistence for conversations and intelligence
+db_writer = DatabaseWriter()
+
+# Indicators seen in earlier scams, checked on every message
+indicator_index = IndicatorIndex()
+
+# Runs large detection/extraction jobs off the event loop, and watches how late the loop runs
+offloader = Offloader()
+loop_monitor = LoopLagMonitor()
+
+# Request and per-stage metrics, served at /metrics
+metrics = MetricsRegistry()
+stage_latency = metrics.histogram("stage_duration_seconds", "Time spent in each request processing stage", ("stage",))
+request_latency = metrics.histogram("request_duration_seconds", "HTTP request latency by route", ("route",))
+requests_total = metrics.counter("requests_total", "HTTP requests by method, route and status", ("method", "route", "status"))
+detections_total = metrics.counter("detections_total", "Analyzed messages by detected scam type", ("scam_type",))
+profiler = StackSampler() if Config.PROFILE_SAMPLE_INTERVAL > 0 else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the database writer and background tasks on startup; stop and drain them on shutdown"""
+    await db_writer.start()
+    offloader.start()
+    loop_monitor.start()
+    if profiler is not None:
+        profiler.start()
+    try:
+        await asyncio.to_thread(indicator_index.load)
+    except Exception as e:
+        logger.warning(f"Indicator index not loaded, starting empty: {str(e)}")
+    try:
+        await asyncio.to_thread(analytics_engine.rollups.load)
+    except Exception as e:
+        logger.warning(f"Analytics rollups not loaded, starting empty: {str(e)}")
+    analytics_engine.rollups.start()
+    events.start()
+    yield
+    await events.stop()
+    await analytics_engine.rollups.stop()
+    analytics_engine.close()
+    if profiler is not None:
+        profiler.stop()
+    await loop_monitor.stop()
+    offloader.shutdown()
+    await db_writer.stop()
+
+
 # Initialize FastAPI app with enhanced configuration
 app = FastAPI(
     title="Agentic Honeypot for Scam Detection",
@@ -19,7 +81,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -31,6 +94,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count and time every request (outermost, so it sees the final status)
+app.add_middleware(MetricsMiddleware, requests=requests_total, duration=request_latency)
+
 # Mount static files (Dashboard UI)
 static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
@@ -40,15 +106,145 @@ else:
     logger.warning("⚠️ Static files directory not found")
 
 # Initialize services
-detector = ScamDetector()
+detector = CascadeDetector()
 extractor = IntelligenceExtractor()
-agent = EngagementAgent()
+offload.use_services(detector, extractor)
+agent = EngagementAgent(ConversationStore(backend=create_state_backend(), on_evict=db_writer.queue_conversation))
+
+metrics.gauge("active_conversations", "Active conversations held by this worker", lambda: agent.counters.active)
+metrics.gauge("conversation_messages", "Messages in the conversations held by this worker", lambda: agent.counters.messages)
+metrics.gauge("db_writes_pending", "Rows queued for the database writer", lambda: db_writer.pending)
+metrics.gauge("known_indicators", "Indicators in the known indicator index", lambda: len(indicator_index))
+metrics.gauge("event_loop_lag_max_seconds", "Largest event-loop lag seen", lambda: loop_monitor.max_lag)
+
+
+def _live_stats() -> Dict[str, Any]:
+    """Dashboard stats pushed to /events subscribers"""
+    stats = {
+        "active_conversations": agent.counters.active,
+        "total_messages": agent.counters.messages,
+        "scams_detected": analytics_engine.total_scams,
+        "avg_response_time": round(request_latency.quantiles("/analyze").get("p50", 0.0) * 1000, 2),
+    }
+    for scam_type, count in analytics_engine.scam_type_counts.items():
+        stats[f"{scam_type}_scams"] = count
+    for field, intelligence_type in INDICATOR_TYPES.items():
+        stats[field] = analytics_engine.intelligence_type_counts.get(intelligence_type, 0)
+    return stats
+
+
+# Coalesced live updates for dashboards, served at /events
+events = EventBroadcaster(_live_stats)
+metrics.gauge("event_subscribers", "Open /events streams", lambda: events.subscribers)
+
+# Serializer for list responses
+_response_list = TypeAdapter(List[HoneypotResponse])
 
 logger.info("🚀 Agentic Honeypot System Initialized")
 logger.info(f"📍 Server: {Config.HOST}:{Config.PORT}")
 logger.info(f"🔍 Debug Mode: {Config.DEBUG}")
 
 
+def _count_intelligence(intelligence: ExtractedIntelligence) -> int:
+    """Number of extracted data points (excluding suspicious patterns)"""
+    return (len(intelligence.bank_accounts) + len(intelligence.upi_ids) + 
+            len(intelligence.phishing_links) + len(intelligence.phone_numbers) + 
+            len(intelligence.email_addresses))
+
+
+def _observe_stages(timings: Dict[str, float]):
+    """Record the stage timings of an analysis run"""
+    for stage, seconds in timings.items():
+        stage_latency.observe(seconds, stage)
+
+
+def _count_detection(detection: DetectionResult, conversation_id: str, message: str):
+    """Count an analyzed message, and record it with the analytics engine if it is a scam"""
+    scam_type = detection.scam_type.value if detection.is_scam and detection.scam_type else "none"
+    detections_total.inc(scam_type)
+    if detection.is_scam:
+        analytics_engine.record_scam_detection({
+            "conversation_id": conversation_id,
+            "scam_type": scam_type,
+            "confidence": detection.confidence,
+            "message": message
+        })
+        events.publish_detection({
+            "conversation_id": conversation_id,
+            "scam_type": scam_type,
+            "confidence": detection.confidence,
+            "timestamp": time.time()
+        })
+    else:
+        events.notify()
+
+
+async def _get_state(conversation_id: str) -> Optional[ConversationState]:
+    """Look up a conversation's state, timing the lookup"""
+    with stage_latency.time("state_lookup"):
+        return await agent.get_conversation_state_async(conversation_id)
+
+
+def _serialize(response: Any) -> Response:
+    """Serialize a response model (or list of them) to JSON, timing the serialization"""
+    with stage_latency.time("serialization"):
+        if isinstance(response, list):
+            body = _response_list.dump_json(response)
+        else:
+            body = response.model_dump_json()
+    return Response(body, media_type="application/json")
+
+
+async def _conversation_state_dict(conversation_id: str, conv_state: Optional[ConversationState] = None) -> Dict[str, Any]:
+    """Summary of a conversation's state for API responses"""
+    if conv_state is None:
+        conv_state = await _get_state(conversation_id)
+    return {
+        "conversation_id": conversation_id,
+        "engagement_level": conv_state.engagement_level if conv_state else 0,
+        "message_count": len(conv_state.messages) if conv_state else 0,
+        "is_active": conv_state.is_active if conv_state else True
+    }
+
+
+def _record_intelligence(conversation_id: str, intelligence: ExtractedIntelligence):
+    """Queue a conversation's indicators for the database and add them to the index"""
+    db_writer.queue_intelligence(conversation_id, intelligence)
+    indicator_index.observe(conversation_id, intelligence)
+    for field, intelligence_type in INDICATOR_TYPES.items():
+        for value in getattr(intelligence, field):
+            analytics_engine.record_intelligence({
+                "conversation_id": conversation_id,
+                "type": intelligence_type,
+                "value": value
+            })
+
+
+async def _engage_new_conversation(
+    conversation_id: str,
+    message: str,
+    detection: DetectionResult,
+    intelligence: ExtractedIntelligence
+) -> str:
+    """Open a conversation with the scammer, or explain why none is needed"""
+    if not detection.is_scam:
+        return "Message does not appear to be a scam. No engagement needed."
+    analytics_engine.record_conversation()
+    _record_intelligence(conversation_id, intelligence)
+    try:
+        with stage_latency.time("engagement"):
+            return await agent.engage_with_scammer(
+                conversation_id=conversation_id,
+                scammer_message=message,
+                scam_type=detection.scam_type,
+                persona="elderly_person",
+                intelligence=intelligence
+            )
+    except Exception as e:
+        logger.warning(f"Engagement error: {str(e)}")
+        return f"Error engaging with scammer: {str(e)}"
+
+
 @app.get("/")
 async def dashboard():
     """Serve the web dashboard"""
@@ -67,7 +263,8 @@ async def health_check():
         "status": "healthy",
         "service": "Agentic Honeypot",
         "version": "1.0.0",
-        "active_conversations": len(agent.conversation_states)
+        # Same source as /stats: conversations held by this worker
+        "active_conversations": agent.counters.active
     }
 
 
@@ -78,7 +275,7 @@ async def analyze_scam(message: ScamMessage) -> HoneypotResponse:
     
     Args:
         message: ScamMessage containing the incoming message
-        
+    
     Returns:
         HoneypotResponse with detection results and engagement
     """
@@ -88,66 +285,164 @@ async def analyze_scam(message: ScamMessage) -> HoneypotResponse:
     try:
         APILogger.log_request("/analyze", "POST", {"message_length": len(message.message)})
         
-        # Detect scam
-        detection = detector.detect_scam(message.message)
+        # Detect scam and extract intelligence (off the event loop for large
+        # messages), boosting detection with indicators from earlier scams
+        detection, intelligence, timings = await offloader.run(offload.analyze_message, message.message, size=len(message.message))
+        detection = indicator_index.apply(detection, intelligence)
+        _observe_stages(timings)
+        _count_detection(detection, conversation_id, message.message)
         
         if detection.is_scam:
             APILogger.log_scam_detected(conversation_id, detection.scam_type.value if detection.scam_type else "unknown", detection.confidence)
         
-        # Extract intelligence
-        intelligence = extractor.extract_intelligence(message.message)
-        
         # Log extracted data
-        total_intel = (len(intelligence.bank_accounts) + len(intelligence.upi_ids) + 
-                       len(intelligence.phishing_links) + len(intelligence.phone_numbers) + 
-                       len(intelligence.email_addresses))
+        total_intel = _count_intelligence(intelligence)
         if total_intel > 0:
             APILogger.log_intelligence_extracted(conversation_id, "data points", total_intel)
         
         # Generate engagement response
-        ai_response = ""
-        if detection.is_scam:
-            try:
-                ai_response = await agent.engage_with_scammer(
-                    conversation_id=conversation_id,
-                    scammer_message=message.message,
-                    scam_type=detection.scam_type,
-                    persona="elderly_person"
-                )
-            except Exception as e:
-                logger.warning(f"Engagement error: {str(e)}")
-                ai_response = f"Error engaging with scammer: {str(e)}"
-        else:
-            ai_response = "Message does not appear to be a scam. No engagement needed."
-        
-        # Get conversation state for response
-        conv_state = agent.get_conversation_state(conversation_id)
-        state_dict = {
-            "conversation_id": conversation_id,
-            "engagement_level": conv_state.engagement_level if conv_state else 0,
-            "message_count": len(conv_state.messages) if conv_state else 0,
-            "is_active": True
-        }
+        ai_response = await _engage_new_conversation(conversation_id, message.message, detection, intelligence)
         
         response = HoneypotResponse(
             conversation_id=conversation_id,
             detected_scam=detection,
             ai_response=ai_response,
             extracted_intelligence=intelligence,
-            conversation_state=state_dict
+            conversation_state=await _conversation_state_dict(conversation_id)
         )
         
         elapsed_time = (time.time() - start_time) * 1000
         APILogger.log_response("/analyze", 200, elapsed_time)
         
-        return response
-        
+        return _serialize(response)
+    
     except Exception as e:
         logger.error(f"Error in /analyze: {str(e)}", exc_info=True)
         APILogger.log_error("/analyze", str(e), e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/analyze/batch")
+async def analyze_batch(messages: List[ScamMessage]) -> List[HoneypotResponse]:
+    """
+    Analyze a batch of messages in one request
+    
+    Detection and extraction run once over the whole batch; each scam
+    still gets its own conversation. A message that fails to process
+    gets an error result instead of failing the batch.
+    
+    Args:
+        messages: ScamMessages to analyze
+    
+    Returns:
+        One HoneypotResponse per message, in input order
+    """
+    start_time = time.time()
+    APILogger.log_request("/analyze/batch", "POST", {"batch_size": len(messages)})
+    
+    texts = [message.message for message in messages]
+    detections, intelligence_batch, timings = await offloader.run(offload.analyze_batch, texts, size=sum(map(len, texts)))
+    _observe_stages(timings)
+    
+    responses = []
+    scam_count = 0
+    for text, detection, intelligence in zip(texts, detections, intelligence_batch):
+        conversation_id = str(uuid.uuid4())
+        try:
+            if isinstance(detection, Exception):
+                raise detection
+            if isinstance(intelligence, Exception):
+                raise intelligence
+            detection = indicator_index.apply(detection, intelligence)
+            _count_detection(detection, conversation_id, text)
+            
+            ai_response = await _engage_new_conversation(conversation_id, text, detection, intelligence)
+            scam_count += detection.is_scam
+            
+            responses.append(HoneypotResponse(
+                conversation_id=conversation_id,
+                detected_scam=detection,
+                ai_response=ai_response,
+                extracted_intelligence=intelligence,
+                conversation_state=await _conversation_state_dict(conversation_id)
+            ))
+        except Exception as e:
+            APILogger.log_error("/analyze/batch", str(e), e)
+            responses.append(HoneypotResponse(
+                conversation_id=conversation_id,
+                detected_scam=DetectionResult(
+                    is_scam=False,
+                    confidence=0.0,
+                    scam_type=None,
+                    reason=f"Processing error: {str(e)}"
+                ),
+                ai_response="",
+                extracted_intelligence=ExtractedIntelligence(),
+                conversation_state={
+                    "conversation_id": conversation_id,
+                    "error": str(e),
+                    "is_active": False
+                }
+            ))
+    
+    logger.info(f"Batch analyzed: {len(messages)} messages, {scam_count} scams")
+    elapsed_time = (time.time() - start_time) * 1000
+    APILogger.log_response("/analyze/batch", 200, elapsed_time)
+    
+    return _serialize(responses)
+
+
+async def _ingest_batch(messages: List[ScamMessage]) -> List[Dict[str, Any]]:
+    """Detect and extract a batch of streamed messages, recording intelligence from scams"""
+    texts = [message.message for message in messages]
+    detections, intelligence_batch, timings = await offloader.run(offload.analyze_batch, texts, size=sum(map(len, texts)))
+    _observe_stages(timings)
+    
+    results = []
+    for message, detection, intelligence in zip(messages, detections, intelligence_batch):
+        if isinstance(detection, Exception) or isinstance(intelligence, Exception):
+            error = detection if isinstance(detection, Exception) else intelligence
+            results.append({"sender_id": message.sender_id, "error": f"Processing error: {str(error)}"})
+            continue
+        conversation_id = str(uuid.uuid4())
+        detection = indicator_index.apply(detection, intelligence)
+        _count_detection(detection, conversation_id, message.message)
+        if detection.is_scam:
+            _record_intelligence(conversation_id, intelligence)
+        results.append({
+            "conversation_id": conversation_id,
+            "sender_id": message.sender_id,
+            "detected_scam": detection.model_dump(mode="json"),
+            "extracted_intelligence": intelligence.model_dump(),
+        })
+    return results
+
+
+@app.post("/ingest/stream")
+async def ingest_stream(request: Request) -> IngestStreamResponse:
+    """
+    Analyze a continuous NDJSON feed of ScamMessage records
+    
+    Each record is run through detection and extraction (no engagement) and
+    answered with one NDJSON line carrying its `index` in the feed, as soon
+    as its batch completes. In-flight records per connection are bounded,
+    so a client sending faster than they are processed is slowed down.
+    """
+    APILogger.log_request("/ingest/stream", "POST")
+    ingestor = StreamIngestor(_ingest_batch)
+    
+    async def results():
+        start_time = time.time()
+        try:
+            async for line in ingestor.run(request.stream()):
+                yield line
+        finally:
+            logger.info(f"Ingest stream closed: {ingestor.stats}")
+            APILogger.log_response("/ingest/stream", 200, (time.time() - start_time) * 1000)
+    
+    return IngestStreamResponse(results())
+
+
 @app.post("/conversation/{conversation_id}")
 async def continue_conversation(conversation_id: str, message: ScamMessage) -> HoneypotResponse:
     """
@@ -156,7 +451,7 @@ async def continue_conversation(conversation_id: str, message: ScamMessage) -> H
     Args:
         conversation_id: ID of existing conversation
         message: Next message from scammer
-        
+    
     Returns:
         Updated conversation response
     """
@@ -165,43 +460,50 @@ async def continue_conversation(conversation_id: str, message: ScamMessage) -> H
     try:
         APILogger.log_request(f"/conversation/{conversation_id}", "POST", {"message_length": len(message.message)})
         
-        # Detect scam in new message
-        detection = detector.detect_scam(message.message)
+        # Extract intelligence from the new message and merge it with what the
+        # conversation has already yielded, and detect scam in the new message
+        # (boosted by indicators from other scams)
+        conv_state = await _get_state(conversation_id)
+        previous = conv_state.extracted_intel if conv_state else None
+        detection, intelligence, timings = await offloader.run(
+            offload.analyze_message, message.message, previous,
+            size=len(message.message)
+        )
+        detection = indicator_index.apply(detection, intelligence, conversation_id)
+        _observe_stages(timings)
+        _count_detection(detection, conversation_id, message.message)
         
         if detection.is_scam:
             APILogger.log_scam_detected(conversation_id, detection.scam_type.value if detection.scam_type else "unknown", detection.confidence)
         
-        # Extract intelligence from entire conversation
-        conv_state = agent.get_conversation_state(conversation_id)
-        if conv_state:
-            history = [msg["content"] for msg in conv_state.messages]
-            intelligence = extractor.extract_intelligence(message.message, history)
-        else:
-            intelligence = extractor.extract_intelligence(message.message)
-        
         # Log extracted data
-        total_intel = (len(intelligence.bank_accounts) + len(intelligence.upi_ids) + 
-                       len(intelligence.phishing_links) + len(intelligence.phone_numbers) + 
-                       len(intelligence.email_addresses))
+        total_intel = _count_intelligence(intelligence)
         if total_intel > 0:
             APILogger.log_intelligence_extracted(conversation_id, "data points", total_intel)
+        # Once a conversation is a scam every turn's indicators count, even
+        # from messages that look harmless on their own. Its earlier turns
+        # were recorded with those turns; a conversation only now turning
+        # out to be a scam is counted and records everything it has yielded
+        tracked_scam = conv_state is not None and conv_state.scam_type is not None
+        if detection.is_scam or tracked_scam:
+            if not tracked_scam:
+                analytics_engine.record_conversation()
+            new_intelligence = intelligence.difference(previous) if tracked_scam else intelligence
+            if _count_intelligence(new_intelligence) > 0:
+                _record_intelligence(conversation_id, new_intelligence)
         
-        # Generate engagement response
-        ai_response = await agent.engage_with_scammer(
-            conversation_id=conversation_id,
-            scammer_message=message.message,
-            scam_type=detection.scam_type
-        )
-        
-        # Get updated conversation state
-        conv_state = agent.get_conversation_state(conversation_id)
-        state_dict = {
-            "conversation_id": conversation_id,
-            "engagement_level": conv_state.engagement_level if conv_state else 0,
-            "message_count": len(conv_state.messages) if conv_state else 0,
-            "is_active": True
-        }
+        # Generate engagement response; the agent stores the intelligence with
+        # the conversation before saving or closing it
+        with stage_latency.time("engagement"):
+            ai_response = await agent.engage_with_scammer(
+                conversation_id=conversation_id,
+                scammer_message=message.message,
+                scam_type=detection.scam_type,
+                intelligence=intelligence
+            )
         
+        # Get updated conversation state (still ours if it was just closed)
+        conv_state = await _get_state(conversation_id) or conv_state
         if conv_state:
             APILogger.log_engagement(conversation_id, conv_state.engagement_level)
         
@@ -210,14 +512,14 @@ async def continue_conversation(conversation_id: str, message: ScamMessage) -> H
             detected_scam=detection,
             ai_response=ai_response,
             extracted_intelligence=intelligence,
-            conversation_state=state_dict
+            conversation_state=await _conversation_state_dict(conversation_id, conv_state)
         )
         
         elapsed_time = (time.time() - start_time) * 1000
         APILogger.log_response(f"/conversation/{conversation_id}", 200, elapsed_time)
         
-        return response
-        
+        return _serialize(response)
+    
     except Exception as e:
         logger.error(f"Error in /conversation: {str(e)}", exc_info=True)
         APILogger.log_error(f"/conversation/{conversation_id}", str(e), e)
@@ -230,7 +532,7 @@ async def get_conversation(conversation_id: str):
     start_time = time.time()
     APILogger.log_request(f"/conversation/{conversation_id}", "GET")
     
-    conv_state = agent.get_conversation_state(conversation_id)
+    conv_state = await agent.get_conversation_state_async(conversation_id)
     
     if not conv_state:
         logger.warning(f"Conversation not found: {conversation_id}")
@@ -239,7 +541,7 @@ async def get_conversation(conversation_id: str):
     
     response = {
         "conversation_id": conversation_id,
-        "messages": conv_state.messages,
+        "messages": conv_state.messages.to_list(),
         "persona": conv_state.scammer_persona,
         "engagement_level": conv_state.engagement_level,
         "extracted_intelligence": conv_state.extracted_intel.model_dump()
@@ -257,8 +559,9 @@ async def terminate_conversation(conversation_id: str):
     start_time = time.time()
     APILogger.log_request(f"/terminate/{conversation_id}", "POST")
     
-    if agent.terminate_conversation(conversation_id):
+    if await agent.terminate_conversation_async(conversation_id):
         logger.info(f"Conversation terminated: {conversation_id}")
+        events.notify()
         response = {
             "status": "success",
             "message": f"Conversation {conversation_id} terminated",
@@ -281,12 +584,23 @@ async def get_stats():
     start_time = time.time()
     APILogger.log_request("/stats", "GET")
     
-    active_conversations = len(agent.conversation_states)
-    total_messages = sum(len(state.messages) for state in agent.conversation_states.values())
+    # Maintained by the agent as conversations change; nothing is scanned here
+    conversations = agent.counters.snapshot()
+    active_conversations = conversations["active"]
+    total_messages = conversations["total_messages"]
     
     stats = {
         "active_conversations": active_conversations,
         "total_messages": total_messages,
+        "conversations": conversations,
+        "detection_stages": detector.get_stage_counts(),
+        "evicted_conversations": dict(agent.conversation_states.evictions),
+        "database_writes": {**db_writer.stats, "pending": db_writer.pending},
+        "known_indicators": indicator_index.summary(),
+        "offload": {"mode": offloader.mode, **offloader.stats},
+        "stage_latency_ms": stage_latency.summary(),
+        "event_loop_lag": loop_monitor.summary(),
+        "live_events": {"subscribers": events.subscribers, **events.stats},
         "system_status": "operational",
         "timestamp": time.time()
     }
@@ -298,8 +612,69 @@ async def get_stats():
     return stats
 
 
+@app.get("/events")
+async def live_events():
+    """
+    Server-Sent Events stream of dashboard updates
+    
+    Starts with a "snapshot" event holding all dashboard stats, followed by
+    at most one "update" event per EVENTS_COALESCE_INTERVAL with the stats
+    that changed and the scams detected since the previous one. Streams stay
+    open until the client leaves; on shutdown the server gives them
+    SHUTDOWN_TIMEOUT seconds (--timeout-graceful-shutdown) before the
+    lifespan ends the rest.
+    """
+    return StreamingResponse(
+        events.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/analytics/trend")
+async def get_trend(
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    hours: float = 24,
+    resolution: Optional[str] = None,
+    series: str = "detections"
+):
+    """
+    Detection or intelligence counts per time bucket
+    
+    The window is [start, end) in epoch seconds, or the last `hours` hours
+    if start is not given. Without a resolution the finest one that still
+    covers the window is used (minute, hour or day).
+    """
+    end = time.time() if end is None else end
+    start = end - hours * 3600 if start is None else start
+    try:
+        return analytics_engine.get_trend(start, end, resolution, series)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request, stage and service metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/profile")
+async def get_profile():
+    """
+    Event-loop stack samples in collapsed-stack format (for flame graphs)
+    
+    Only available when PROFILE_SAMPLE_INTERVAL is set.
+    """
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiler disabled; set PROFILE_SAMPLE_INTERVAL")
+    return PlainTextResponse(profiler.collapsed())
+
+
 # This allows running with: uvicorn app.main:app --reload
 if __name__ == "__main__":
     import uvicorn
     logger.info(f"🌐 Starting server on {Config.HOST}:{Config.PORT}")
-    uvicorn.run(app, host=Config.HOST, port=Config.PORT, reload=Config.DEBUG)
+    uvicorn.run(app, host=Config.HOST, port=Config.PORT, reload=Config.DEBUG,
+                timeout_graceful_shutdown=Config.SHUTDOWN_TIMEOUT)
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, Field, GetCoreSchemaHandler, GetJsonSchemaHandler
+from pydantic_core import core_schema
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Union
+from collections import Counter
 from enum import Enum
 
 
@@ -36,15 +38,140 @@ class ExtractedIntelligence(BaseModel):
     phone_numbers: List[str] = []
     email_addresses: List[str] = []
     suspicious_patterns: List[str] = []
+    
+    def merge(self, other: "ExtractedIntelligence") -> "ExtractedIntelligence":
+        """Union with another result, keeping first-seen order and dropping duplicates"""
+        return ExtractedIntelligence(**{
+            field: list(dict.fromkeys(getattr(self, field) + getattr(other, field)))
+            for field in ExtractedIntelligence.model_fields
+        })
+    
+    def difference(self, other: "ExtractedIntelligence") -> "ExtractedIntelligence":
+        """Values not already in another result, in their original order"""
+        return ExtractedIntelligence(**{
+            field: [value for value in getattr(self, field) if value not in getattr(other, field)]
+            for field in ExtractedIntelligence.model_fields
+        })
+
+
+class MessageHistory:
+    """
+    Compact conversation history
+    
+    Stores one byte per message for the role (an index into a shared table
+    of interned role names) and the content strings in a single list, instead
+    of one {"role", "content"} dict per message. Reads still hand out dicts
+    and it serializes to the same list of dicts, so the JSON shape is unchanged.
+    """
+    
+    __slots__ = ('_roles', '_contents')
+    
+    # Shared by every history; codes are positions in _ROLE_NAMES
+    _ROLE_NAMES: List[str] = ['scammer', 'honeypot']
+    _ROLE_CODES: Dict[str, int] = {'scammer': 0, 'honeypot': 1}
+    
+    def __init__(self, messages: Optional[List[Dict[str, str]]] = None):
+        self._roles = bytearray()
+        self._contents: List[str] = []
+        for message in messages or ():
+            self.add(message["role"], message["content"])
+    
+    @classmethod
+    def _role_code(cls, role: str) -> int:
+        code = cls._ROLE_CODES.get(role)
+        if code is None:
+            if len(cls._ROLE_NAMES) == 256:
+                raise ValueError(f"Too many distinct message roles to add {role!r}")
+            code = len(cls._ROLE_NAMES)
+            cls._ROLE_NAMES.append(role)
+            cls._ROLE_CODES[role] = code
+        return code
+    
+    def add(self, role: str, content: str):
+        """Append a message without building a dict"""
+        self._roles.append(self._role_code(role))
+        self._contents.append(content)
+    
+    def append(self, message: Dict[str, str]):
+        """Append a {"role", "content"} message"""
+        self.add(message["role"], message["content"])
+    
+    def role_counts(self) -> Dict[str, int]:
+        """Number of messages per role"""
+        names = self._ROLE_NAMES
+        return {names[code]: count for code, count in Counter(self._roles).items()}
+    
+    def pairs(self) -> Iterator[Tuple[str, str]]:
+        """(role, content) for every message, in order"""
+        names = self._ROLE_NAMES
+        return ((names[code], content) for code, content in zip(self._roles, self._contents))
+    
+    def to_list(self) -> List[Dict[str, str]]:
+        """The history as a list of {"role", "content"} dicts"""
+        return [{"role": role, "content": content} for role, content in self.pairs()]
+    
+    def __len__(self) -> int:
+        return len(self._contents)
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return ({"role": role, "content": content} for role, content in self.pairs())
+    
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            names = self._ROLE_NAMES
+            return [
+                {"role": names[code], "content": content}
+                for code, content in zip(self._roles[index], self._contents[index])
+            ]
+        return {"role": self._ROLE_NAMES[self._roles[index]], "content": self._contents[index]}
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MessageHistory):
+            return self._roles == other._roles and self._contents == other._contents
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"MessageHistory({self.to_list()!r})"
+    
+    @classmethod
+    def _validate(cls, value) -> "MessageHistory":
+        if isinstance(value, MessageHistory):
+            return value
+        return cls(value)
+    
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda history: history.to_list()),
+        )
+    
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema, handler: GetJsonSchemaHandler) -> Dict[str, Any]:
+        return handler(core_schema.list_schema(core_schema.dict_schema(core_schema.str_schema(), core_schema.str_schema())))
+
+
+# ExtractedIntelligence indicator fields -> stored intelligence_type
+INDICATOR_TYPES = {
+    'bank_accounts': 'bank_account',
+    'upi_ids': 'upi_id',
+    'phishing_links': 'phishing_link',
+    'phone_numbers': 'phone_number',
+    'email_addresses': 'email_address',
+}
 
 
 class ConversationState(BaseModel):
     """Model for maintaining conversation state"""
     conversation_id: str
-    messages: List[Dict[str, str]] = []
+    messages: MessageHistory = Field(default_factory=MessageHistory)
     scammer_persona: str = "elderly_person"
     extracted_intel: ExtractedIntelligence = ExtractedIntelligence()
     engagement_level: int = 0  # 0-100
+    scam_type: Optional[ScamType] = None
+    is_active: bool = True
 
 
 class HoneypotResponse(BaseModel):
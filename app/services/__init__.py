@@ -1,6 +1,7 @@
 """Initialize services package"""
 from app.services.detector import ScamDetector
+from app.services.cascade_detector import CascadeDetector
 from app.services.extractor import IntelligenceExtractor
 from app.services.mock_scammer_api import MockScammerAPI
 
-__all__ = ['ScamDetector', 'IntelligenceExtractor', 'MockScammerAPI']
+__all__ = ['ScamDetector', 'CascadeDetector', 'IntelligenceExtractor', 'MockScammerAPI']
@@ -3,71 +3,153 @@ Advanced Analytics Engine
 Provides detailed analytics and insights about scam patterns
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
-from collections import defaultdict
-import statistics
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from collections import defaultdict, deque
+from app.config import Config
+from app.services.event_log import EventLog
+from app.services.rollups import RollupStore
+
+
+class RunningWindow:
+    """Last `size` values with their sum and the count above `high`, kept up to date on each push"""
+    
+    def __init__(self, size: int, high: float = 0.8):
+        self.values = deque(maxlen=size)
+        self.high = high
+        self.total = 0.0
+        self.high_count = 0
+    
+    def push(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            dropped = self.values[0]
+            self.total -= dropped
+            self.high_count -= dropped > self.high
+        self.values.append(value)
+        self.total += value
+        self.high_count += value > self.high
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else 0.0
+
 
 class AnalyticsEngine:
-    """Advanced analytics for scam detection and intelligence"""
+    """
+    Advanced analytics for scam detection and intelligence
     
-    def __init__(self):
-        self.scam_history = []
-        self.intelligence_history = []
-        self.conversation_history = []
-        self.hourly_stats = defaultdict(int)
+    Every aggregate is maintained as events are recorded: running counts and
+    sums per type, fixed-size windows for the "recent N" views and a
+    RollupStore of minute/hour/day buckets for trends. Raw events go to
+    fixed-capacity EventLogs, with detection messages optionally spilled to
+    disk. Memory stays bounded and each query costs O(1) or O(buckets),
+    however long the engine runs.
+    """
+    
+    RECENT_WINDOW = 100           # detections behind the performance metrics
+    RATE_WINDOW = 1000            # detections the detection rate is relative to
+    PATTERN_WINDOW = 10           # detections per scam type behind risk levels
+    HISTORY_EXPORT = 50           # raw records returned by export_analytics
+    
+    def __init__(self, event_capacity: int = Config.ANALYTICS_EVENT_CAPACITY,
+                 spill_path: str = Config.ANALYTICS_SPILL_PATH):
+        # Detection message text is the bulk of an event; only it is spilled,
+        # to a file per process since opening it truncates it
+        spill_path = f"{spill_path}.{os.getpid()}" if spill_path else None
+        self.scam_history = EventLog(max(event_capacity, self.HISTORY_EXPORT), spill_path)
+        self.intelligence_history = EventLog(max(event_capacity, self.HISTORY_EXPORT))
         self.scam_type_counts = defaultdict(int)
         self.intelligence_type_counts = defaultdict(int)
+        self.total_scams = 0
+        self.total_intelligence = 0
+        self.total_conversations = 0
+        self._confidence_sum = 0.0
+        self._recent = RunningWindow(self.RECENT_WINDOW)
+        self._recent_by_type: Dict[Any, RunningWindow] = {}
+        self.rollups = RollupStore()
     
     def record_scam_detection(self, scam_data: Dict[str, Any]):
         """Record a scam detection event"""
-        detection_record = {
-            'timestamp': datetime.now().isoformat(),
-            'conversation_id': scam_data.get('conversation_id'),
-            'scam_type': scam_data.get('scam_type'),
-            'confidence': scam_data.get('confidence', 0),
-            'message': scam_data.get('message', ''),
-            'extracted_intel': scam_data.get('extracted_intel', [])
-        }
+        now = datetime.now()
+        scam_type = scam_data.get('scam_type')
+        confidence = scam_data.get('confidence', 0)
+        conversation_id = scam_data.get('conversation_id')
+        self.scam_history.append(
+            now.timestamp(), conversation_id, scam_type, confidence,
+            scam_data.get('message', ''), scam_data.get('extracted_intel', [])
+        )
         
-        self.scam_history.append(detection_record)
-        self.scam_type_counts[detection_record['scam_type']] += 1
-        
-        # Update hourly stats
-        hour_key = datetime.now().strftime('%Y-%m-%d %H:00')
-        self.hourly_stats[hour_key] += 1
+        self.scam_type_counts[scam_type] += 1
+        self.total_scams += 1
+        self._confidence_sum += confidence
+        self._recent.push(confidence)
+        if scam_type not in self._recent_by_type:
+            self._recent_by_type[scam_type] = RunningWindow(self.PATTERN_WINDOW)
+        self._recent_by_type[scam_type].push(confidence)
+        self.rollups.record('detections', now.timestamp())
+    
+    def record_conversation(self):
+        """Count a scam conversation, once, when it is first detected as one"""
+        self.total_conversations += 1
     
     def record_intelligence(self, intel_data: Dict[str, Any]):
         """Record extracted intelligence"""
-        intel_record = {
-            'timestamp': datetime.now().isoformat(),
-            'conversation_id': intel_data.get('conversation_id'),
-            'intel_type': intel_data.get('type'),
-            'value': intel_data.get('value'),
-            'confidence': intel_data.get('confidence', 0)
-        }
-        
-        self.intelligence_history.append(intel_record)
-        self.intelligence_type_counts[intel_record['intel_type']] += 1
+        intel_type = intel_data.get('type')
+        timestamp = time.time()
+        self.intelligence_history.append(
+            timestamp, intel_data.get('conversation_id'), intel_type,
+            intel_data.get('confidence', 0), intel_data.get('value')
+        )
+        self.intelligence_type_counts[intel_type] += 1
+        self.total_intelligence += 1
+        self.rollups.record('intelligence', timestamp)
     
     def get_hourly_trend(self, hours: int = 24) -> Dict[str, int]:
         """Get hourly scam detection trend"""
-        trend = {}
-        for i in range(hours):
-            time = (datetime.now() - timedelta(hours=i)).strftime('%Y-%m-%d %H:00')
-            trend[time] = self.hourly_stats.get(time, 0)
-        return dict(sorted(trend.items()))
+        # The current hour and the hours-1 before it
+        current_hour = int(time.time() // 3600) * 3600
+        points = self.rollups.range('detections', current_hour - (hours - 1) * 3600, current_hour + 3600, 'hour')
+        return {
+            datetime.fromtimestamp(bucket_start).strftime('%Y-%m-%d %H:00'): int(count)
+            for bucket_start, count in points
+        }
+    
+    def get_trend(self, start: float, end: Optional[float] = None, resolution: Optional[str] = None,
+                  series: str = 'detections') -> Dict[str, Any]:
+        """
+        Event counts per bucket over an arbitrary window
+        
+        Args:
+            start: Window start, epoch seconds
+            end: Window end, epoch seconds (now if None)
+            resolution: "minute", "hour" or "day" (the finest that fits if None)
+            series: "detections" or "intelligence"
+        
+        Returns:
+            Series, resolution and (bucket start, count) points, oldest first
+        """
+        end = time.time() if end is None else end
+        resolution = resolution or self.rollups.pick_resolution(start, end)
+        return {
+            'series': series,
+            'resolution': resolution,
+            'points': self.rollups.range(series, start, end, resolution)
+        }
     
     def get_high_risk_patterns(self) -> List[Dict[str, Any]]:
         """Identify high-risk scam patterns"""
         patterns = []
         
         for scam_type, count in self.scam_type_counts.items():
-            # Get recent detections for this type
-            recent = [s for s in self.scam_history if s['scam_type'] == scam_type][-10:]
+            # Recent detections for this type
+            recent = self._recent_by_type.get(scam_type)
             
             if recent:
-                avg_confidence = statistics.mean([s['confidence'] for s in recent])
+                avg_confidence = recent.mean()
                 pattern = {
                     'type': scam_type,
                     'occurrences': count,
@@ -85,7 +167,7 @@ class AnalyticsEngine:
     
     def get_conversation_analytics(self) -> Dict[str, Any]:
         """Get comprehensive conversation analytics"""
-        if not self.scam_history:
+        if not self.total_scams:
             return {
                 'total_scams': 0,
                 'average_confidence': 0,
@@ -94,30 +176,28 @@ class AnalyticsEngine:
             }
         
         return {
-            'total_scams': len(self.scam_history),
-            'average_confidence': statistics.mean([s['confidence'] for s in self.scam_history]),
-            'total_conversations': len(set(s['conversation_id'] for s in self.scam_history)),
-            'intelligence_extracted': len(self.intelligence_history),
+            'total_scams': self.total_scams,
+            'average_confidence': self._confidence_sum / self.total_scams,
+            'total_conversations': self.total_conversations,
+            'intelligence_extracted': self.total_intelligence,
             'scam_type_distribution': dict(self.scam_type_counts),
             'intelligence_type_distribution': dict(self.intelligence_type_counts)
         }
     
     def get_performance_metrics(self) -> Dict[str, Any]:
         """Get system performance metrics"""
-        if not self.scam_history:
+        if not self.total_scams:
             return {
                 'detection_rate': 0,
                 'avg_confidence': 0,
                 'patterns_identified': 0
             }
         
-        recent_scams = self.scam_history[-100:]
-        
         return {
-            'detection_rate': len(recent_scams) / max(1, len(self.scam_history[-1000:])) * 100,
-            'avg_confidence': statistics.mean([s['confidence'] for s in recent_scams]),
-            'high_confidence_detections': len([s for s in recent_scams if s['confidence'] > 0.8]),
-            'patterns_identified': len(self.get_high_risk_patterns()),
+            'detection_rate': len(self._recent) / max(1, min(self.total_scams, self.RATE_WINDOW)) * 100,
+            'avg_confidence': self._recent.mean(),
+            'high_confidence_detections': self._recent.high_count,
+            'patterns_identified': len(self._recent_by_type),
             'system_uptime': 'N/A'  # Would need server start time
         }
     
@@ -164,6 +244,10 @@ class AnalyticsEngine:
         report += "\n╚══════════════════════════════════════════════════════════╝\n"
         return report
     
+    def close(self):
+        """Release the spill file (call on shutdown)"""
+        self.scam_history.close()
+    
     def export_analytics(self) -> Dict[str, Any]:
         """Export full analytics data"""
         return {
@@ -171,8 +255,29 @@ class AnalyticsEngine:
             'analytics': self.get_conversation_analytics(),
             'metrics': self.get_performance_metrics(),
             'patterns': self.get_high_risk_patterns(),
-            'scam_history': self.scam_history[-50:],  # Last 50 detections
-            'intelligence_history': self.intelligence_history[-50:]
+            'scam_history': [
+                {
+                    'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                    'conversation_id': conversation_id,
+                    'scam_type': scam_type,
+                    'confidence': confidence,
+                    'message': message,
+                    'extracted_intel': extracted_intel
+                }
+                for timestamp, conversation_id, scam_type, confidence, message, extracted_intel
+                in self.scam_history.recent(self.HISTORY_EXPORT)  # Last 50 detections
+            ],
+            'intelligence_history': [
+                {
+                    'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                    'conversation_id': conversation_id,
+                    'intel_type': intel_type,
+                    'value': value,
+                    'confidence': confidence
+                }
+                for timestamp, conversation_id, intel_type, confidence, value, _
+                in self.intelligence_history.recent(self.HISTORY_EXPORT)
+            ]
         }
 
 # Initialize global analytics engine
@@ -0,0 +1,129 @@
+"""
+Hybrid rule + ML scam detection
+Cheap rules decide clear-cut messages; only ambiguous ones reach the ML model
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.models import DetectionResult, ScamType
+from app.services.detector import ScamDetector
+from app.config import Config
+
+
+class CascadeDetector(ScamDetector):
+    """
+    Two-stage scam detector
+    
+    Stage 1 scores the message with the compiled rule pass. Messages whose
+    rule confidence falls outside the (lower, upper) band are decided there:
+    no indicators means benign, a high score means scam. Messages inside the
+    band go to the ML model, and both scores are fused into one result.
+    The ML model can promote a message to scam but never demote one the
+    rules already flagged.
+    """
+    
+    STAGES = ('rules_benign', 'rules_scam', 'ml')
+    
+    def __init__(
+        self,
+        ml_model=None,
+        lower: float = Config.CASCADE_ML_LOWER,
+        upper: float = Config.CASCADE_ML_UPPER,
+        ml_weight: float = Config.CASCADE_ML_WEIGHT
+    ):
+        if ml_model is None:
+            from app.services.ml_detector import ml_detector as ml_model
+        self.ml_model = ml_model
+        self.lower = lower
+        self.upper = upper
+        self.ml_weight = ml_weight
+        self.stage_counts = dict.fromkeys(self.STAGES, 0)
+        self._counts_lock = threading.Lock()
+    
+    def detect_scam(self, message: str) -> DetectionResult:
+        """
+        Detect if a message is a scam attempt, consulting the ML model only when needed
+        
+        Args:
+            message: The message to analyze
+        
+        Returns:
+            DetectionResult with scam status, confidence, and type
+        """
+        return self._detect([message])[0]
+    
+    def detect_batch(self, messages: List[str]) -> List[DetectionResult]:
+        """
+        Detect scams in a batch; ambiguous messages share one ML call
+        
+        Args:
+            messages: Messages to analyze
+        
+        Returns:
+            One DetectionResult per message, in input order
+        """
+        return self._detect(messages)
+    
+    def _detect(self, messages: List[str]) -> List[DetectionResult]:
+        """Run the rule stage on every message and the ML stage on the ambiguous ones"""
+        results: List[Optional[DetectionResult]] = []
+        ambiguous: List[Tuple[int, Dict[ScamType, int], DetectionResult]] = []
+        for index, message in enumerate(messages):
+            scores = ScamDetector.score_message(message)
+            rule_result = ScamDetector.result_from_scores(scores)
+            if self.lower < rule_result.confidence < self.upper:
+                ambiguous.append((index, scores, rule_result))
+                results.append(None)
+            else:
+                results.append(rule_result)
+        
+        decided = len(messages) - len(ambiguous)
+        scams = sum(1 for result in results if result is not None and result.is_scam)
+        self._count(rules_benign=decided - scams, rules_scam=scams, ml=len(ambiguous))
+        
+        if ambiguous:
+            ml_results = self.ml_model.score_batch([messages[index] for index, _, _ in ambiguous], top_features=0)
+            for (index, scores, rule_result), ml_result in zip(ambiguous, ml_results):
+                results[index] = self._fuse(scores, rule_result, ml_result)
+        
+        return results
+    
+    def _fuse(self, scores: Dict[ScamType, int], rule_result: DetectionResult, ml_result: Dict) -> DetectionResult:
+        """Blend rule and ML confidence into one DetectionResult"""
+        # The ML model only knows scam types, so a flat distribution is no
+        # evidence at all; rescale its confidence from [1/K, 1] to [0, 1]
+        baseline = 1 / len(ml_result['probabilities'])
+        ml_evidence = max(0.0, (ml_result['confidence'] - baseline) / (1 - baseline))
+        confidence = (1 - self.ml_weight) * rule_result.confidence + self.ml_weight * ml_evidence
+        if rule_result.is_scam:
+            # Rule positives stay positive, however the ML model disagrees
+            confidence = max(confidence, rule_result.confidence)
+        is_scam = confidence >= ScamDetector.SCAM_THRESHOLD
+        
+        rule_type = max(scores, key=scores.get)
+        scam_type = ScamType(ml_result["scam_type"])
+        if rule_result.is_scam and not ml_evidence:
+            # No ML evidence to overrule the type the rules found
+            scam_type = rule_result.scam_type
+        evidence = (
+            f"rules: {scores[rule_type]} indicators, confidence {rule_result.confidence:.2f}; "
+            f"ml: confidence {ml_result['confidence']:.2f}"
+        )
+        
+        return DetectionResult(
+            is_scam=is_scam,
+            confidence=confidence,
+            scam_type=scam_type if is_scam else None,
+            reason=f"Detected {scam_type.value} scam ({evidence})" if is_scam else f"No scam detected ({evidence})"
+        )
+    
+    def _count(self, **increments: int):
+        """Add to the per-stage counters"""
+        with self._counts_lock:
+            for stage, amount in increments.items():
+                self.stage_counts[stage] += amount
+    
+    def get_stage_counts(self) -> Dict[str, int]:
+        """How many messages each stage decided"""
+        with self._counts_lock:
+            return dict(self.stage_counts)
@@ -0,0 +1,146 @@
+"""
+Write-behind database writer
+Buffers conversation and intelligence writes from the request path and
+persists them in bulk transactions on a worker thread
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+from app.models import ConversationState, ExtractedIntelligence, INDICATOR_TYPES
+from app.config import Config
+from app.logger import logger
+
+
+class DatabaseWriter:
+    """
+    Background writer for conversations and intelligence
+    
+    `queue_*` calls only append to in-memory buffers. A background task
+    flushes them with one bulk transaction per table when `batch_size`
+    rows are pending or `flush_interval` seconds have passed, running the
+    blocking database work in a thread so the event loop never waits on it.
+    `stop()` drains whatever is left. Until `start()` is called (scripts,
+    tests without the app lifespan) queued rows are written immediately.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = Config.DB_WRITE_BATCH_SIZE,
+        flush_interval: float = Config.DB_WRITE_FLUSH_INTERVAL,
+        session_factory=None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory  # app.database.SessionLocal if None
+        # Latest data per conversation; a later write replaces an unflushed one
+        self._conversations: Dict[str, dict] = {}
+        self._intelligence: List[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.stats = {"flushes": 0, "conversations_written": 0, "intelligence_written": 0, "failed_rows": 0}
+    
+    @property
+    def pending(self) -> int:
+        """Rows waiting to be written"""
+        return len(self._conversations) + len(self._intelligence)
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def queue_conversation(self, state: ConversationState):
+        """Queue a conversation to be upserted into ConversationRecord"""
+        from app.agents.conversation_store import conversation_record_data
+        self._conversations[state.conversation_id] = {
+            "conversation_id": state.conversation_id,
+            **conversation_record_data(state),
+        }
+        self._queued()
+    
+    def queue_intelligence(self, conversation_id: str, intelligence: ExtractedIntelligence):
+        """Queue every extracted indicator to be recorded with its conversation"""
+        for field, intelligence_type in INDICATOR_TYPES.items():
+            for value in getattr(intelligence, field):
+                self._intelligence.append({
+                    "conversation_id": conversation_id,
+                    "intelligence_type": intelligence_type,
+                    "value": value,
+                })
+        self._queued()
+    
+    def _queued(self):
+        if not self.running:
+            self._write(*self._take())
+        elif self.pending >= self.batch_size:
+            self._wakeup.set()
+    
+    def _take(self):
+        """Swap out the buffers so new writes queue while these are written"""
+        conversations, self._conversations = list(self._conversations.values()), {}
+        intelligence, self._intelligence = self._intelligence, []
+        return conversations, intelligence
+    
+    def _write(self, conversations: List[dict], intelligence: List[dict]):
+        """Write a batch in bulk (blocking)"""
+        from app.database import SessionLocal, save_conversations_batch, save_intelligence_batch
+        if not conversations and not intelligence:
+            return
+        session_factory = self.session_factory or SessionLocal
+        start_time = time.time()
+        try:
+            self.stats["conversations_written"] += save_conversations_batch(conversations, session_factory())
+        except Exception as e:
+            self.stats["failed_rows"] += len(conversations)
+            logger.error(f"Failed to write {len(conversations)} conversations: {str(e)}")
+        try:
+            self.stats["intelligence_written"] += save_intelligence_batch(intelligence, session_factory())
+        except Exception as e:
+            self.stats["failed_rows"] += len(intelligence)
+            logger.error(f"Failed to write {len(intelligence)} intelligence rows: {str(e)}")
+        self.stats["flushes"] += 1
+        logger.debug(f"Flushed {len(conversations)} conversations and {len(intelligence)} "
+                     f"intelligence rows in {(time.time() - start_time) * 1000:.1f}ms")
+    
+    async def flush(self):
+        """Write everything queued so far"""
+        if self._flush_lock is None:
+            self._write(*self._take())
+            return
+        async with self._flush_lock:
+            batch = self._take()
+            await asyncio.to_thread(self._write, *batch)
+    
+    async def start(self):
+        """Start the background flush task"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background task and drain the queue"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        self._wakeup = None
+        self._flush_lock = None
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self.pending:
+                await self.flush()
+            if self._stopping:
+                return
@@ -1,8 +1,77 @@
 import re
-from typing import Tuple
+from typing import Dict, List, Tuple
 from app.models import DetectionResult, ScamType
 
 
+def _build_trie_pattern(terms: List[str]) -> str:
+    """
+    Build a prefix-factored alternation regex for a list of literal terms
+    
+    All terms sharing a first character hang off one branch, so the regex engine
+    tries at most one branch per position. At any position the match is the
+    longest term that starts there.
+    """
+    trie: Dict[str, dict] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node: Dict[str, dict]) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        body = '|'.join(alternatives)
+        if '' in node:
+            return f'(?:{body})?'
+        return body if len(alternatives) == 1 else f'(?:{body})'
+    
+    return build(trie)
+
+
+def _is_word_char(char: str) -> bool:
+    """Match the `\\w` definition used by `re` for str patterns"""
+    return char.isalnum() or char == '_'
+
+
+def _build_term_matcher(terms: Dict[str, List[Tuple[str, tuple]]]):
+    """
+    Compile every scored term into one regex
+    
+    Args:
+        terms: Mapping of term to its (role, scam types) entries
+        
+    Returns:
+        (compiled scanner, {matched term: ((term, role, scam types), ...)})
+        where a matched term also implies every shorter term it starts with
+    """
+    implied = {
+        term: tuple(
+            (other, role, scam_types)
+            for other in terms if term.startswith(other)
+            for role, scam_types in terms[other]
+        )
+        for term in terms
+    }
+    return re.compile(_build_trie_pattern(list(terms))), implied
+
+
+def _scored_terms(scam_keywords: Dict[str, List[str]], **word_roles) -> Dict[str, List[Tuple[str, tuple]]]:
+    """Collect keywords and signal words into a {term: [(role, scam types), ...]} table"""
+    terms: Dict[str, List[Tuple[str, tuple]]] = {}
+    keyword_types: Dict[str, tuple] = {}
+    for scam_type, keywords in scam_keywords.items():
+        for keyword in keywords:
+            keyword_types[keyword] = keyword_types.get(keyword, ()) + (ScamType(scam_type),)
+    for keyword, scam_types in keyword_types.items():
+        terms.setdefault(keyword, []).append(('keyword', scam_types))
+    for role, words in word_roles.items():
+        for word in words:
+            terms.setdefault(word, []).append((role, ()))
+    return terms
+
+
 class ScamDetector:
     """Service to detect scam messages using pattern matching and keyword analysis"""
     
@@ -32,6 +101,19 @@ class ScamDetector:
         ]
     }
     
+    # Urgency signals (whole words); each group adds 1 to the phishing score
+    URGENCY_WORDS = ['urgent', 'immediate', 'hurry', 'quick', 'now', 'asap', 'today']
+    URGENCY_PHRASES = ['act now', 'verify now', 'click now']
+    URGENCY_MARKER = '!!!'
+    
+    # Personal info requests (whole words); each group adds 2 to the phishing score
+    INFO_TERMS = ['password', 'otp', 'pin', 'cvv', 'ssn', 'account number', 'routing number']
+    INFO_REQUEST_VERBS = ['confirm', 'verify', 'provide', 'send']
+    INFO_SECRETS = ['password', 'otp', 'pin', 'cvv']
+    
+    # Lower threshold for detection (URLs are suspicious enough at 0.2)
+    SCAM_THRESHOLD = 0.2
+    
     # URL patterns
     URL_PATTERN = r'https?://[^\s]+'
     
@@ -41,51 +123,121 @@ class ScamDetector:
     # UPI ID pattern
     UPI_PATTERN = r'[\w\.-]+@[a-zA-Z]{3,}'
     
+    # Compiled once at import time
+    _MATCHER, _IMPLIED = _build_term_matcher(_scored_terms(
+        SCAM_KEYWORDS,
+        urgency_word=URGENCY_WORDS,
+        urgency_phrase=URGENCY_PHRASES,
+        urgency_marker=[URGENCY_MARKER],
+        info_term=INFO_TERMS,
+        request_verb=INFO_REQUEST_VERBS,
+        secret=INFO_SECRETS,
+        newline=['\n'],
+    ))
+    _URL_REGEX = re.compile(URL_PATTERN)
+    _ACCOUNT_REGEX = re.compile(ACCOUNT_PATTERN)
+    _UPI_REGEX = re.compile(UPI_PATTERN)
+    
     @staticmethod
-    def detect_scam(message: str) -> DetectionResult:
+    def _is_whole_word(text: str, start: int, length: int) -> bool:
+        """Check the `\\b...\\b` boundaries around a term found at `start`"""
+        end = start + length
+        return not ((start > 0 and _is_word_char(text[start - 1])) or
+                    (end < len(text) and _is_word_char(text[end])))
+    
+    @staticmethod
+    def score_message(message: str) -> Dict[ScamType, int]:
         """
-        Detect if a message is a scam attempt
+        Score a message against every scam type in a single scan
         
         Args:
             message: The message to analyze
             
         Returns:
-            DetectionResult with scam status, confidence, and type
+            Hit counts keyed by scam type (keyword hits plus phishing signals)
         """
         message_lower = message.lower()
-        
-        # Score for each scam type
         scores = {scam_type: 0 for scam_type in ScamType}
         
+        keywords = {}
+        found = dict.fromkeys(('urgency_word', 'urgency_phrase', 'urgency_marker', 'info_term', 'info_request'), False)
+        verb_on_line = False
+        settled = set()  # matched terms that can no longer change the score
+        
+        # Walk every term occurrence left to right; restarting one character
+        # past each hit keeps overlapping phrases visible
+        search = ScamDetector._MATCHER.search
+        match = search(message_lower)
+        while match is not None:
+            start = match.start()
+            matched = match.group()
+            if matched not in settled:
+                resolved = True
+                for term, role, scam_types in ScamDetector._IMPLIED[matched]:
+                    if role == 'keyword':
+                        keywords[term] = scam_types
+                    elif role == 'newline':
+                        verb_on_line = False
+                        resolved = False
+                    elif role == 'urgency_marker':
+                        found[role] = True
+                    elif role in ('request_verb', 'secret'):
+                        if not found['info_request'] and ScamDetector._is_whole_word(message_lower, start, len(term)):
+                            if role == 'request_verb':
+                                verb_on_line = True
+                            elif verb_on_line:
+                                found['info_request'] = True
+                        resolved = resolved and found['info_request']
+                    elif not found[role]:
+                        found[role] = ScamDetector._is_whole_word(message_lower, start, len(term))
+                        resolved = resolved and found[role]
+                if resolved:
+                    settled.add(matched)
+            match = search(message_lower, start + 1)
+        
         # Check keywords
-        for scam_type, keywords in ScamDetector.SCAM_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    scores[scam_type] += 1
+        for scam_types in keywords.values():
+            for scam_type in scam_types:
+                scores[scam_type] += 1
         
         # Check for URLs/links (phishing indicator)
-        if re.search(ScamDetector.URL_PATTERN, message):
+        if ScamDetector._URL_REGEX.search(message):
             scores['phishing'] += 2
         
         # Check for urgency patterns
-        urgency_patterns = [
-            r'\b(urgent|immediate|hurry|quick|now|asap|today)\b',
-            r'(!!!|!!!)',
-            r'\b(act now|verify now|click now)\b'
-        ]
-        for pattern in urgency_patterns:
-            if re.search(pattern, message_lower):
-                scores['phishing'] += 1
+        scores['phishing'] += found['urgency_word'] + found['urgency_marker'] + found['urgency_phrase']
         
         # Check for personal info requests
-        info_patterns = [
-            r'\b(password|otp|pin|cvv|ssn|account number|routing number)\b',
-            r'\b(confirm|verify|provide|send)\b.*\b(password|otp|pin|cvv)\b'
-        ]
-        for pattern in info_patterns:
-            if re.search(pattern, message_lower):
-                scores['phishing'] += 2
+        scores['phishing'] += 2 * (found['info_term'] + found['info_request'])
         
+        return scores
+    
+    @staticmethod
+    def detect_scam(message: str) -> DetectionResult:
+        """
+        Detect if a message is a scam attempt
+        
+        Args:
+            message: The message to analyze
+            
+        Returns:
+            DetectionResult with scam status, confidence, and type
+        """
+        # Score for each scam type
+        scores = ScamDetector.score_message(message)
+        return ScamDetector.result_from_scores(scores)
+    
+    @staticmethod
+    def result_from_scores(scores: Dict[ScamType, int]) -> DetectionResult:
+        """
+        Turn per-type hit counts into a DetectionResult
+        
+        Args:
+            scores: Hit counts from score_message
+            
+        Returns:
+            DetectionResult with scam status, confidence, and type
+        """
         # Find dominant scam type
         max_score = max(scores.values())
         if max_score == 0:
@@ -100,7 +252,7 @@ class ScamDetector:
         confidence = min(max_score / 10, 1.0)  # Normalize confidence
         
         # Determine if it's actually a scam based on threshold
-        is_scam = confidence >= 0.2  # Lower threshold for detection (URLs are suspicious enough at 0.2)
+        is_scam = confidence >= ScamDetector.SCAM_THRESHOLD
         
         return DetectionResult(
             is_scam=is_scam,
@@ -109,17 +261,31 @@ class ScamDetector:
             reason=f"Detected {detected_type} scam with {scores[detected_type]} indicators"
         )
     
+    @staticmethod
+    def detect_batch(messages: List[str]) -> List[DetectionResult]:
+        """
+        Detect scams in a batch of messages
+        
+        Args:
+            messages: Messages to analyze
+            
+        Returns:
+            One DetectionResult per message, in input order
+        """
+        return [ScamDetector.detect_scam(message) for message in messages]
+    
     @staticmethod
     def extract_urls(message: str) -> list:
         """Extract URLs from message"""
-        return re.findall(ScamDetector.URL_PATTERN, message)
+        return ScamDetector._URL_REGEX.findall(message)
     
     @staticmethod
     def extract_accounts(message: str) -> list:
         """Extract potential account numbers"""
-        return re.findall(ScamDetector.ACCOUNT_PATTERN, message)
+        return ScamDetector._ACCOUNT_REGEX.findall(message)
     
     @staticmethod
     def extract_upi_ids(message: str) -> list:
         """Extract UPI IDs from message"""
-        return re.findall(ScamDetector.UPI_PATTERN, message)
+        return ScamDetector._UPI_REGEX.findall(message)
+
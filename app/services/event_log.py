@@ -0,0 +1,120 @@
+"""
+Fixed-capacity event log
+Keeps the most recent events in preallocated columns instead of one dict
+per event, with the free text optionally spilled to a file
+"""
+
+import os
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import Config
+
+# (timestamp, conversation_id, type, confidence, text, extra)
+Event = Tuple[float, Optional[str], Any, float, str, Any]
+
+
+class EventLog:
+    """
+    Ring buffer of events stored column by column
+    
+    Timestamps and confidences live in float arrays and event types are
+    interned to small integer codes, so a slot costs a few dozen bytes
+    plus its text. With `spill_path` set, the text goes to that file in
+    fixed `slot_bytes` slots (longer text is truncated) and memory use no
+    longer depends on message size; the file never exceeds
+    capacity * slot_bytes. Overwritten slots are simply reused.
+    """
+    
+    def __init__(
+        self,
+        capacity: int = Config.ANALYTICS_EVENT_CAPACITY,
+        spill_path: Optional[str] = None,
+        slot_bytes: int = Config.ANALYTICS_SPILL_SLOT_BYTES
+    ):
+        if capacity < 1:
+            raise ValueError("Event log capacity must be at least 1")
+        self.capacity = capacity
+        self.slot_bytes = slot_bytes
+        self.timestamps = array("d", [0.0]) * capacity
+        self.confidences = array("d", [0.0]) * capacity
+        self.type_codes = array("H", [0]) * capacity
+        self.conversations: List[Optional[str]] = [None] * capacity
+        self.extras: List[Any] = [None] * capacity
+        self._types: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+        self._next = 0
+        self._size = 0
+        self.total = 0
+        self.spill_path = spill_path
+        if spill_path:
+            self._spill = open(spill_path, "w+b")
+            self._texts = None
+            self.text_lengths = array("L", [0]) * capacity
+        else:
+            self._spill = None
+            self._texts: List[str] = [""] * capacity
+    
+    def _code(self, event_type: Any) -> int:
+        code = self._codes.get(event_type)
+        if code is None:
+            code = self._codes[event_type] = len(self._types)
+            self._types.append(event_type)
+        return code
+    
+    def append(self, timestamp: float, conversation_id: Optional[str], event_type: Any,
+               confidence: float = 0.0, text: str = "", extra: Any = None):
+        """Store one event, overwriting the oldest once the log is full"""
+        slot = self._next
+        self.timestamps[slot] = timestamp
+        self.confidences[slot] = confidence
+        self.type_codes[slot] = self._code(event_type)
+        self.conversations[slot] = conversation_id
+        self.extras[slot] = extra
+        if self._spill is None:
+            self._texts[slot] = text
+        else:
+            data = (text or "").encode("utf-8")[:self.slot_bytes]
+            self._spill.seek(slot * self.slot_bytes)
+            self._spill.write(data)
+            self.text_lengths[slot] = len(data)
+        
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total += 1
+    
+    def _text(self, slot: int) -> str:
+        if self._spill is None:
+            return self._texts[slot]
+        self._spill.seek(slot * self.slot_bytes)
+        # A cut inside a multi-byte character drops that character
+        return self._spill.read(self.text_lengths[slot]).decode("utf-8", errors="ignore")
+    
+    def recent(self, count: Optional[int] = None) -> List[Event]:
+        """
+        The last `count` events (all retained if None), oldest first
+        
+        Returns:
+            (timestamp, conversation_id, type, confidence, text, extra) tuples
+        """
+        count = self._size if count is None else max(0, min(count, self._size))
+        events = []
+        for back in range(count, 0, -1):
+            slot = (self._next - back) % self.capacity
+            events.append((
+                self.timestamps[slot],
+                self.conversations[slot],
+                self._types[self.type_codes[slot]],
+                self.confidences[slot],
+                self._text(slot),
+                self.extras[slot]
+            ))
+        return events
+    
+    def close(self):
+        """Close and remove the spill file, if any"""
+        if self._spill is not None and not self._spill.closed:
+            self._spill.close()
+            os.unlink(self.spill_path)
+    
+    def __len__(self) -> int:
+        return self._size
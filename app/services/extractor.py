@@ -1,8 +1,163 @@
 import re
-from typing import List
+from typing import Dict, List, Optional
 from app.models import ExtractedIntelligence
 
 
+class ExtractionEngine:
+    """
+    Precompiled extraction engine for the IntelligenceExtractor patterns
+    
+    Everything is compiled once, and cheap checks on the text decide which
+    scans can possibly match, so only those run:
+    
+    - '@' patterns (UPI IDs, emails) only scan the whitespace-separated
+      tokens that contain '@'
+    - all-digit word patterns (`\\b\\d{m,n}\\b`) share one scan whose matches
+      are split by length, and digit patterns only run when the text has
+      enough consecutive digits
+    - other patterns only run when their leading literal is present
+    - suspicious patterns are skipped unless all their word groups occur,
+      and are only tried where their leading word occurs
+    
+    Results match running every pattern with re.findall / re.search.
+    """
+    
+    DIGIT_WORD = re.compile(r'\\b\\d\{(\d+)(?:,(\d+))?\}\\b')
+    
+    def __init__(self, patterns: Dict[str, List[str]], suspicious_patterns: List[str]):
+        self.categories = list(patterns)
+        
+        # [(category, compiled, lowercase literal trigger or None)]
+        self._literal_scans: List[tuple] = []
+        # [(category, compiled, digits needed)]
+        self._digit_scans: List[tuple] = []
+        # [(category, min length, max length)] served by one all-digit word scan
+        self._digit_words: List[tuple] = []
+        # [(category, compiled)] run over the '@' tokens only
+        self._at_scans: List[tuple] = []
+        
+        for category, category_patterns in patterns.items():
+            for pattern in category_patterns:
+                compiled = re.compile(pattern, re.IGNORECASE)
+                if compiled.groups:
+                    raise ValueError(f"Extraction patterns must not capture groups: {pattern}")
+                digit_word = self.DIGIT_WORD.fullmatch(pattern)
+                if digit_word:
+                    low, high = digit_word.groups()
+                    self._digit_words.append((category, int(low), int(high or low)))
+                elif pattern.startswith(r'\b\d'):
+                    digits = sum(int(n) for n in re.findall(r'\\d\{(\d+)', pattern))
+                    self._digit_scans.append((category, compiled, digits))
+                elif '@' in pattern and r'\s' not in pattern:
+                    self._at_scans.append((category, compiled))
+                else:
+                    self._literal_scans.append((category, compiled, self._literal_trigger(pattern)))
+        
+        self._digit_runs = re.compile(r'\d+')
+        shortest = min((low for _, low, _ in self._digit_words), default=0)
+        self._digit_word_scan = re.compile(rf'\b\d{{{shortest},}}\b')
+        self._shortest_digit_word = shortest
+        
+        self._suspicious = [
+            (pattern, re.compile(pattern, re.IGNORECASE), self._word_groups(pattern))
+            for pattern in suspicious_patterns
+        ]
+    
+    @staticmethod
+    def _literal_trigger(pattern: str) -> Optional[str]:
+        """Lowercase literal that every match of the pattern starts with, or None"""
+        literal = re.match(r'(?:[a-z0-9/:]|\\[.+/])+', pattern)
+        if not literal:
+            return None
+        text = literal.group().replace('\\', '')
+        # An optional last character ('https?') is not guaranteed
+        if pattern[literal.end():literal.end() + 1] in ('?', '*', '{'):
+            text = text[:-1]
+        return text or None
+    
+    @staticmethod
+    def _word_groups(pattern: str) -> List[Optional[re.Pattern]]:
+        """
+        Regexes for the `\\b(word|...)` alternations of a pattern, without the boundaries
+        
+        Every group must occur for the pattern to match. The first one is only
+        used when the pattern starts with it.
+        """
+        groups = [re.compile(f"(?:{words})") for words in re.findall(r'\\b\(([a-z \-|]+)\)', pattern)]
+        if not re.match(r'\\b\(', pattern):
+            groups.insert(0, None)
+        return groups
+    
+    def extract(self, text: str) -> ExtractedIntelligence:
+        """
+        Extract every indicator category and suspicious pattern from text
+        
+        Args:
+            text: Text to search in
+            
+        Returns:
+            ExtractedIntelligence with unique matches per category
+        """
+        found: Dict[str, Dict[str, None]] = {category: {} for category in self.categories}
+        # Lowercase literal checks only agree with re.IGNORECASE on ASCII text
+        text_lower = text.lower() if text.isascii() else None
+        
+        for category, compiled, trigger in self._literal_scans:
+            if trigger and text_lower is not None and trigger not in text_lower:
+                continue
+            found[category].update(dict.fromkeys(compiled.findall(text)))
+        
+        if self._at_scans and '@' in text:
+            # None of these patterns match whitespace, so every match lies
+            # inside a single token and the tokens can be scanned on their own
+            tokens = ' '.join(token for token in text.split() if '@' in token)
+            for category, compiled in self._at_scans:
+                found[category].update(dict.fromkeys(compiled.findall(tokens)))
+        
+        runs = [len(run) for run in self._digit_runs.findall(text)]
+        if runs:
+            self._scan_digits(text, max(runs), sum(runs), found)
+        
+        intelligence = ExtractedIntelligence(**{
+            category: list(values) for category, values in found.items()
+        })
+        intelligence.suspicious_patterns = [
+            pattern for pattern, compiled, word_groups in self._suspicious
+            if self._search(text, text_lower, compiled, word_groups)
+        ]
+        return intelligence
+    
+    def _scan_digits(self, text: str, longest_run: int, total_digits: int, found: Dict[str, Dict[str, None]]):
+        """Run the digit scans the text's digit runs can satisfy"""
+        if self._digit_words and longest_run >= self._shortest_digit_word:
+            words = self._digit_word_scan.findall(text)
+            for category, low, high in self._digit_words:
+                found[category].update(dict.fromkeys(word for word in words if low <= len(word) <= high))
+        
+        for category, compiled, digits in self._digit_scans:
+            if total_digits >= digits:
+                found[category].update(dict.fromkeys(compiled.findall(text)))
+    
+    @staticmethod
+    def _search(text: str, text_lower: Optional[str], compiled: re.Pattern, word_groups: List[Optional[re.Pattern]]) -> bool:
+        """re.search that bails out early and only tries positions where the leading word occurs"""
+        if text_lower is None or not word_groups:
+            return compiled.search(text) is not None
+        if not all(group.search(text_lower) for group in word_groups if group is not None):
+            return False
+        leading = word_groups[0]
+        if leading is None:
+            return compiled.search(text) is not None
+        position = 0
+        while True:
+            candidate = leading.search(text_lower, position)
+            if candidate is None:
+                return False
+            if compiled.match(text, candidate.start()):
+                return True
+            position = candidate.start() + 1
+
+
 class IntelligenceExtractor:
     """Service to extract sensitive information from scam messages"""
     
@@ -13,7 +168,7 @@ class IntelligenceExtractor:
             r'\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b',  # Formatted account
         ],
         'upi_ids': [
-            r'[\w\.-]+@(okhdfcbank|okaxis|okicici|okSBI|oksyndicate|okbob|okpnb|ybl|payworld|upi)\b',
+            r'[\w\.-]+@(?:okhdfcbank|okaxis|okicici|okSBI|oksyndicate|okbob|okpnb|ybl|payworld|upi)\b',
             r'[\w\.-]+@[a-z]+',  # Generic UPI pattern
         ],
         'phishing_links': [
@@ -41,6 +196,9 @@ class IntelligenceExtractor:
         r'\b(send|transfer|wire|pay).*\b(money|rupees|amount)\b.*\b(immediately|now|urgent)\b',
     ]
     
+    # Compiled once at import time
+    _ENGINE = ExtractionEngine(PATTERNS, SUSPICIOUS_PATTERNS)
+    
     @staticmethod
     def extract_intelligence(message: str, conversation_history: List[str] = None) -> ExtractedIntelligence:
         """
@@ -53,59 +211,43 @@ class IntelligenceExtractor:
         Returns:
             ExtractedIntelligence object with extracted details
         """
-        intelligence = ExtractedIntelligence()
-        
         # Combine message with history for better context
         full_text = message
         if conversation_history:
             full_text = " ".join(conversation_history) + " " + message
         
-        # Extract each type of information
-        intelligence.bank_accounts = IntelligenceExtractor._extract_pattern(
-            full_text, IntelligenceExtractor.PATTERNS['bank_accounts']
-        )
-        
-        intelligence.upi_ids = IntelligenceExtractor._extract_pattern(
-            full_text, IntelligenceExtractor.PATTERNS['upi_ids']
-        )
-        
-        intelligence.phishing_links = IntelligenceExtractor._extract_pattern(
-            full_text, IntelligenceExtractor.PATTERNS['phishing_links']
-        )
-        
-        intelligence.phone_numbers = IntelligenceExtractor._extract_pattern(
-            full_text, IntelligenceExtractor.PATTERNS['phone_numbers']
-        )
-        
-        intelligence.email_addresses = IntelligenceExtractor._extract_pattern(
-            full_text, IntelligenceExtractor.PATTERNS['email_addresses']
-        )
-        
-        # Extract suspicious patterns
-        intelligence.suspicious_patterns = [
-            pattern for pattern in IntelligenceExtractor.SUSPICIOUS_PATTERNS
-            if re.search(pattern, full_text, re.IGNORECASE)
-        ]
+        return IntelligenceExtractor._ENGINE.extract(full_text)
+    
+    @staticmethod
+    def extract_batch(messages: List[str]) -> List[ExtractedIntelligence]:
+        """
+        Extract intelligence from each message of a batch independently
         
-        return intelligence
+        Args:
+            messages: Messages to extract from
+            
+        Returns:
+            One ExtractedIntelligence per message, in input order
+        """
+        extract = IntelligenceExtractor._ENGINE.extract
+        return [extract(message) for message in messages]
     
     @staticmethod
-    def _extract_pattern(text: str, patterns: List[str]) -> List[str]:
+    def extract_incremental(message: str, accumulated: Optional[ExtractedIntelligence] = None) -> ExtractedIntelligence:
         """
-        Extract matches from text using multiple regex patterns
+        Extract intelligence from a new message and merge it into earlier results
+        
+        Only the new message is scanned, so each turn costs the same no matter
+        how long the conversation already is.
         
         Args:
-            text: Text to search in
-            patterns: List of regex patterns
+            message: New message from the scammer
+            accumulated: Intelligence already extracted from this conversation
             
         Returns:
-            List of unique matches
+            ExtractedIntelligence covering the whole conversation so far
         """
-        matches = set()
-        for pattern in patterns:
-            try:
-                found = re.findall(pattern, text, re.IGNORECASE)
-                matches.update(found)
-            except re.error:
-                pass
-        return list(matches)
+        intelligence = IntelligenceExtractor._ENGINE.extract(message)
+        if accumulated is None:
+            return intelligence
+        return accumulated.merge(intelligence)
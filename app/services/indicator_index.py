@@ -0,0 +1,225 @@
+"""
+In-memory reputation index of known scam indicators
+Answers "has this UPI ID / phone number / link been seen in earlier scam
+conversations?" without a database round trip
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.models import DetectionResult, ExtractedIntelligence, ScamType, INDICATOR_TYPES
+from app.services.detector import ScamDetector
+from app.config import Config
+from app.logger import logger
+
+# Scam type implied by a known indicator when the rules found none
+INDICATOR_SCAM_TYPES = {
+    'bank_account': ScamType.BANKING,
+    'upi_id': ScamType.UPI,
+    'phishing_link': ScamType.PHISHING,
+}
+
+
+class IndicatorStats:
+    """
+    Sighting counters for one indicator
+    
+    The most recent `max_ids` conversation ids are kept, so a conversation
+    reporting the same indicator again is not counted twice. One that
+    returns after `max_ids` newer conversations is counted again.
+    """
+    
+    __slots__ = ("conversations", "first_seen", "last_seen", "conversation_ids", "max_ids")
+    
+    def __init__(self, first_seen: float, max_ids: int = Config.INDICATOR_MAX_CONVERSATION_IDS):
+        self.conversations = 0
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.conversation_ids: Dict[str, None] = {}  # insertion-ordered, oldest first
+        self.max_ids = max_ids
+    
+    def add(self, conversation_id: str) -> bool:
+        """Count a conversation unless it is already known; True if it was new"""
+        if conversation_id in self.conversation_ids:
+            return False
+        self.conversation_ids[conversation_id] = None
+        if len(self.conversation_ids) > self.max_ids:
+            del self.conversation_ids[next(iter(self.conversation_ids))]
+        self.conversations += 1
+        return True
+    
+    def seen_elsewhere(self, conversation_id: Optional[str]) -> int:
+        """Conversations other than `conversation_id` this indicator was seen in"""
+        return self.conversations - (conversation_id in self.conversation_ids)
+    
+    def to_dict(self) -> Dict[str, float]:
+        return {"conversations": self.conversations, "first_seen": self.first_seen, "last_seen": self.last_seen}
+
+
+class IndicatorIndex:
+    """
+    Hash index of (intelligence_type, value) -> IndicatorStats
+    
+    Warm-loaded from the database at startup and updated with every
+    indicator recorded afterwards, so lookups are plain dict hits. Each
+    indicator remembers the conversations it was seen in (up to
+    `max_conversation_ids`), so repeats and interleaved turns are not
+    counted again. At most `max_entries` indicators are kept; the least
+    recently seen are evicted first.
+    """
+    
+    def __init__(
+        self,
+        boost: float = Config.KNOWN_INDICATOR_BOOST,
+        max_entries: int = Config.INDICATOR_INDEX_MAX_ENTRIES,
+        max_conversation_ids: int = Config.INDICATOR_MAX_CONVERSATION_IDS
+    ):
+        self.boost = boost
+        self.max_entries = max_entries
+        self.max_conversation_ids = max_conversation_ids
+        # Least recently seen first
+        self._entries: "OrderedDict[Tuple[str, str], IndicatorStats]" = OrderedDict()
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._entries
+    
+    def get(self, intelligence_type: str, value: str) -> Optional[IndicatorStats]:
+        return self._entries.get((intelligence_type, value))
+    
+    def load(self, session_factory=None) -> int:
+        """
+        Rebuild the index from the intelligence and indicator link tables
+        
+        Only the `max_entries` most recently seen indicators are read into
+        memory, however many the tables hold.
+        
+        Returns:
+            Number of indicators loaded
+        """
+        from sqlalchemy import func, union_all
+        from app.database import SessionLocal, IndicatorLinkRecord, IntelligenceRecord
+        session_factory = session_factory or SessionLocal
+        start_time = time.time()
+        entries: Dict[Tuple[str, str], IndicatorStats] = {}
+        
+        def merge(intelligence_type, value, conversation_id, found_at):
+            if (intelligence_type, value) not in recent:
+                return
+            seen_at = found_at.timestamp() if found_at else 0.0
+            stats = entries.get((intelligence_type, value))
+            if stats is None:
+                stats = entries[(intelligence_type, value)] = IndicatorStats(seen_at, self.max_conversation_ids)
+            if conversation_id is not None:
+                stats.add(conversation_id)
+            stats.first_seen = min(stats.first_seen, seen_at)
+            stats.last_seen = max(stats.last_seen, seen_at)
+        
+        with session_factory() as db:
+            # Pick the `max_entries` most recently seen indicators up front,
+            # so rows for the rest are skipped instead of built and trimmed
+            sightings = union_all(
+                db.query(IntelligenceRecord.intelligence_type, IntelligenceRecord.value, IntelligenceRecord.found_at)
+                .filter(IntelligenceRecord.intelligence_type.isnot(None)).statement,
+                db.query(IndicatorLinkRecord.intelligence_type, IndicatorLinkRecord.value, IndicatorLinkRecord.found_at)
+                .statement,
+            ).subquery()
+            recent = {
+                (intelligence_type, value) for intelligence_type, value in db.query(
+                    sightings.c.intelligence_type, sightings.c.value
+                ).group_by(sightings.c.intelligence_type, sightings.c.value)
+                .order_by(func.max(sightings.c.found_at).desc().nulls_last())
+                .limit(self.max_entries)
+            }
+            # First sightings, which may predate the link table's backfill;
+            # read before the links so the two are deduplicated
+            for row in db.query(
+                IntelligenceRecord.intelligence_type, IntelligenceRecord.value,
+                IntelligenceRecord.conversation_id, IntelligenceRecord.found_at
+            ).filter(IntelligenceRecord.intelligence_type.isnot(None)).yield_per(10000):
+                merge(*row)
+            # Oldest first, so each indicator ends up holding its latest conversation ids
+            links = db.query(
+                IndicatorLinkRecord.intelligence_type,
+                IndicatorLinkRecord.value,
+                IndicatorLinkRecord.conversation_id,
+                IndicatorLinkRecord.found_at
+            ).order_by(IndicatorLinkRecord.found_at).yield_per(10000)
+            for row in links:
+                merge(*row)
+        
+        self._entries = OrderedDict(sorted(entries.items(), key=lambda item: item[1].last_seen))
+        logger.info(f"Indicator index loaded {len(self._entries)} indicators in {(time.time() - start_time) * 1000:.0f}ms")
+        return len(self._entries)
+    
+    def observe(self, conversation_id: str, intelligence: ExtractedIntelligence, seen_at: Optional[float] = None):
+        """Record the indicators a conversation reported"""
+        seen_at = seen_at or time.time()
+        for field, intelligence_type in INDICATOR_TYPES.items():
+            for value in getattr(intelligence, field):
+                key = (intelligence_type, value)
+                stats = self._entries.get(key)
+                if stats is None:
+                    stats = self._entries[key] = IndicatorStats(seen_at, self.max_conversation_ids)
+                else:
+                    self._entries.move_to_end(key)
+                stats.add(conversation_id)
+                stats.last_seen = seen_at
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def known(self, intelligence: ExtractedIntelligence,
+              conversation_id: Optional[str] = None) -> List[Tuple[str, str, IndicatorStats]]:
+        """
+        Indicators in `intelligence` already seen in other conversations
+        
+        Returns:
+            [(intelligence_type, value, stats), ...]
+        """
+        found = []
+        for field, intelligence_type in INDICATOR_TYPES.items():
+            for value in getattr(intelligence, field):
+                stats = self._entries.get((intelligence_type, value))
+                if stats is not None and stats.seen_elsewhere(conversation_id) > 0:
+                    found.append((intelligence_type, value, stats))
+        return found
+    
+    def apply(self, detection: DetectionResult, intelligence: ExtractedIntelligence,
+              conversation_id: Optional[str] = None) -> DetectionResult:
+        """
+        Boost a detection's confidence when the message reuses known indicators
+        
+        Args:
+            detection: Result from the detector
+            intelligence: Indicators extracted from the same message
+            conversation_id: Conversation the message belongs to, whose own
+                earlier sightings do not count
+        
+        Returns:
+            The detection unchanged, or a boosted copy
+        """
+        known = self.known(intelligence, conversation_id)
+        if not known or not self.boost:
+            return detection
+        
+        confidence = min(1.0, detection.confidence + self.boost)
+        scam_type = detection.scam_type or INDICATOR_SCAM_TYPES.get(known[0][0], ScamType.OTHER)
+        conversations = max(stats.seen_elsewhere(conversation_id) for _, _, stats in known)
+        return detection.model_copy(update={
+            "is_scam": confidence >= ScamDetector.SCAM_THRESHOLD,
+            "confidence": confidence,
+            "scam_type": scam_type,
+            "reason": f"{detection.reason}; {len(known)} known indicator(s) seen in up to "
+                      f"{conversations} earlier conversation(s)",
+        })
+    
+    def summary(self) -> Dict[str, int]:
+        """Indicator counts by type"""
+        counts = {intelligence_type: 0 for intelligence_type in INDICATOR_TYPES.values()}
+        for intelligence_type, _ in self._entries:
+            counts[intelligence_type] = counts.get(intelligence_type, 0) + 1
+        return counts
@@ -0,0 +1,173 @@
+"""
+Live dashboard updates over Server-Sent Events
+Coalesces stat changes and new detections into one frame per interval,
+serialized once and fanned out to every subscribed dashboard
+"""
+
+import asyncio
+import collections
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+from app.config import Config
+from app.logger import logger
+
+
+def sse_frame(event: str, data: Any) -> bytes:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+KEEPALIVE = b": keepalive\n\n"
+
+
+class _Subscriber:
+    """Frames waiting for one client; a client that falls behind is resynced instead of buffered"""
+    
+    def __init__(self, max_queue: int):
+        self.frames: collections.deque = collections.deque()
+        self.max_queue = max_queue
+        self.wakeup = asyncio.Event()
+        self.resync = False
+    
+    def push(self, frame: bytes):
+        if len(self.frames) >= self.max_queue:
+            # Its queued deltas are superseded by a fresh snapshot
+            self.frames.clear()
+            self.resync = True
+        else:
+            self.frames.append(frame)
+        self.wakeup.set()
+
+
+class EventBroadcaster:
+    """
+    Pushes dashboard stats and detections to SSE subscribers
+    
+    `notify()` and `publish_detection()` only mark work pending; they cost
+    the same with no dashboard open or with a hundred. Once per `interval`
+    seconds, if anything changed, the stats are read with `snapshot()` a
+    single time, diffed against the last frame, and the changed keys plus
+    the detections since then go out as one "update" frame to every
+    subscriber. New subscribers (and slow ones that overflow their queue)
+    get a full "snapshot" frame. A comment line every `heartbeat` seconds
+    keeps idle connections open through proxies.
+    """
+    
+    def __init__(
+        self,
+        snapshot: Callable[[], Dict[str, Any]],
+        interval: float = Config.EVENTS_COALESCE_INTERVAL,
+        heartbeat: float = Config.EVENTS_HEARTBEAT,
+        max_queue: int = Config.EVENTS_MAX_QUEUE,
+        max_detections: int = Config.EVENTS_MAX_DETECTIONS
+    ):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_queue = max_queue
+        self._subscribers: Set[_Subscriber] = set()
+        self._detections: collections.deque = collections.deque(maxlen=max_detections)
+        self._last: Dict[str, Any] = {}
+        self._dirty = True
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"frames": 0, "snapshots": 0, "resyncs": 0, "coalesced_events": 0}
+    
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+    
+    def notify(self):
+        """Note that the stats may have changed"""
+        self._dirty = True
+        self.stats["coalesced_events"] += 1
+    
+    def publish_detection(self, detection: Dict[str, Any]):
+        """Queue a detection for the next frame (only the latest max_detections are kept)"""
+        if self._subscribers:
+            self._detections.append(detection)
+        self.notify()
+    
+    def start(self):
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+    
+    def close(self):
+        """End every subscriber's stream"""
+        self._closed = True
+        for subscriber in self._subscribers:
+            subscriber.wakeup.set()
+    
+    async def stop(self):
+        """Stop broadcasting and end every subscriber's stream"""
+        self.close()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    def _snapshot_frame(self) -> bytes:
+        self.stats["snapshots"] += 1
+        return sse_frame("snapshot", {"stats": self._last})
+    
+    def _refresh(self) -> Dict[str, Any]:
+        """Read the stats and return the keys that changed since the last read"""
+        self._dirty = False
+        current = self.snapshot()
+        delta = {key: value for key, value in current.items() if self._last.get(key) != value}
+        self._last = current
+        return delta
+    
+    def _broadcast(self):
+        delta = self._refresh()
+        detections = list(self._detections)
+        self._detections.clear()
+        if not self._subscribers or (not delta and not detections):
+            return
+        frame = sse_frame("update", {"stats": delta, "detections": detections})
+        self.stats["frames"] += 1
+        for subscriber in self._subscribers:
+            subscriber.push(frame)
+    
+    async def _run(self):
+        idle = 0.0
+        while True:
+            await asyncio.sleep(self.interval)
+            idle += self.interval
+            if not self._subscribers:
+                self._detections.clear()
+                continue
+            if self._dirty:
+                try:
+                    self._broadcast()
+                    idle = 0.0
+                except Exception as e:
+                    logger.warning(f"Live event broadcast failed: {str(e)}")
+            if idle >= self.heartbeat:
+                idle = 0.0
+                for subscriber in self._subscribers:
+                    subscriber.push(KEEPALIVE)
+    
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        """SSE byte stream for one client, starting with a full snapshot"""
+        subscriber = _Subscriber(self.max_queue)
+        if self._dirty or not self._last:
+            # Bring current subscribers up to date before the snapshot moves on
+            self._broadcast()
+        self._subscribers.add(subscriber)
+        logger.info(f"Live events subscriber connected ({len(self._subscribers)} open)")
+        try:
+            yield self._snapshot_frame()
+            while not self._closed:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                if subscriber.resync:
+                    subscriber.resync = False
+                    self.stats["resyncs"] += 1
+                    yield self._snapshot_frame()
+                while subscriber.frames:
+                    yield subscriber.frames.popleft()
+        finally:
+            self._subscribers.discard(subscriber)
+            logger.info(f"Live events subscriber disconnected ({len(self._subscribers)} open)")
@@ -0,0 +1,266 @@
+"""
+Request and stage metrics
+Latency histograms and counters rendered in the Prometheus text format,
+plus an optional stack-sampling profiler for the event loop thread
+"""
+
+import bisect
+import collections
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.config import Config
+
+# Latency bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], **extra: str) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter per label set"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values: Dict[Tuple[str, ...], float] = collections.defaultdict(float)
+    
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] += amount
+    
+    def render(self) -> Iterator[str]:
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {value:g}"
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+    
+    def render(self) -> Iterator[str]:
+        yield f"{self.name} {float(self.read()):g}"
+
+
+class Histogram:
+    """
+    Latency histogram per label set
+    
+    Keeps cumulative bucket counts, sum and count for Prometheus, and the
+    most recent `window` samples for p50/p95/p99 summaries.
+    """
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS, window: int = 1024):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.window = window
+        # labels -> [bucket counts..., +Inf count], sum, recent samples
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = collections.defaultdict(float)
+        self._recent: Dict[Tuple[str, ...], collections.deque] = {}
+    
+    def observe(self, seconds: float, *labels: str):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._recent[labels] = collections.deque(maxlen=self.window)
+        counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self._sums[labels] += seconds
+        self._recent[labels].append(seconds)
+    
+    @contextmanager
+    def time(self, *labels: str):
+        """Observe the duration of the `with` block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+    
+    def quantiles(self, *labels: str) -> Dict[str, float]:
+        """Recent-window quantiles in seconds, e.g. {'p50': ..., 'p95': ..., 'p99': ...}"""
+        samples = self._recent.get(labels)
+        if not samples:
+            return {}
+        if len(samples) == 1:
+            return {f"p{round(q * 100)}": samples[0] for q in QUANTILES}
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        return {f"p{round(q * 100)}": cuts[round(q * 100) - 1] for q in QUANTILES}
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count and recent quantiles (ms) per label set, keyed by the joined label values"""
+        return {
+            "/".join(labels) or "all": {
+                "count": sum(counts),
+                **{name: value * 1000 for name, value in self.quantiles(*labels).items()},
+            }
+            for labels, counts in sorted(self._counts.items())
+        }
+    
+    def render(self) -> Iterator[str]:
+        for labels, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le=f'{bound:g}')} {cumulative}"
+            cumulative += counts[-1]
+            yield f"{self.name}_bucket{_labels(self.label_names, labels, le='+Inf')} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {self._sums[labels]:.6f}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+    
+    def render_recent(self) -> Iterator[str]:
+        """Recent-window quantiles, rendered as the `<name>_recent` gauge family"""
+        for labels in sorted(self._recent):
+            for name, value in self.quantiles(*labels).items():
+                quantile = f"{int(name[1:]) / 100:g}"
+                yield f"{self.name}_recent{_labels(self.label_names, labels, quantile=quantile)} {value:.6f}"
+
+
+class MetricsRegistry:
+    """Named metrics rendered together for a scrape"""
+    
+    def __init__(self, prefix: str = "honeypot"):
+        self.prefix = prefix
+        self._metrics: Dict[str, object] = {}
+    
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help_text, label_names))
+    
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), **options) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help_text, label_names, **options))
+    
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", help_text, read))
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+            if isinstance(metric, Histogram):
+                lines.append(f"# HELP {metric.name}_recent {metric.help_text} (quantiles over recent samples)")
+                lines.append(f"# TYPE {metric.name}_recent gauge")
+                lines.extend(metric.render_recent())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them by route and status"""
+    
+    def __init__(self, app, requests: Counter, duration: Histogram):
+        self.app = app
+        self.requests = requests
+        self.duration = duration
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        start = time.perf_counter()
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Route templates keep conversation ids out of the label values
+            path = getattr(route, "path", None) or "unmatched"
+            self.requests.inc(scope["method"], path, str(status))
+            self.duration.observe(time.perf_counter() - start, path)
+
+
+class StackSampler:
+    """
+    Sampling profiler for one thread (the event loop by default)
+    
+    A daemon thread snapshots the target thread's stack every `interval`
+    seconds and counts identical stacks. The result is in collapsed-stack
+    format ("outer;inner;leaf count"), ready for flame graph tools. The
+    profiled code runs untouched, so the overhead stays small.
+    """
+    
+    def __init__(self, interval: float = Config.PROFILE_SAMPLE_INTERVAL, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Dict[str, int] = collections.Counter()
+        self.samples = 0
+        self._target: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, thread_id: Optional[int] = None):
+        """Start sampling `thread_id` (the calling thread if None)"""
+        if self.running:
+            return
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+    
+    def collapsed(self, limit: int = 200) -> str:
+        """The `limit` most frequent stacks in collapsed-stack format"""
+        top = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return "".join(f"{stack} {count}\n" for stack, count in top)
+    
+    def reset(self):
+        self.stacks = collections.Counter()
+        self.samples = 0
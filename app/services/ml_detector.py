@@ -3,18 +3,93 @@ Advanced ML-based scam detection enhancement
 Provides machine learning models for improved detection accuracy
 """
 
+import argparse
+import hashlib
 import json
-from typing import Dict, List, Tuple
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import joblib
+import sklearn
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
 import numpy as np
 from pathlib import Path
+from app.config import Config
+from app.logger import logger
+
+# Bump when the artifact layout changes so old files are retrained
+MODEL_FORMAT_VERSION = 1
+
+# Training data for the bundled model, by scam type
+TRAINING_DATA = {
+    'banking': [
+        'your bank account has been compromised',
+        'verify your bank details immediately',
+        'update your banking information',
+        'confirm your account details for security',
+        'your account requires immediate verification',
+        'reset your banking password now',
+        'suspicious activity on your bank account',
+        'bank security alert urgent',
+        'verify identity with bank details',
+        'your bank account is locked',
+    ],
+    'upi': [
+        'send money via upi to secure account',
+        'upi payment required for verification',
+        'share your upi id for refund',
+        'upi transfer needed for confirmation',
+        'update upi details for safety',
+        'link your upi account now',
+        'upi verification required',
+        'share upi id with us',
+    ],
+    'phishing': [
+        'click here to verify account',
+        'confirm your identity by clicking link',
+        'visit this website to complete verification',
+        'open this link to secure your account',
+        'click to prevent account closure',
+        'verify by visiting this website',
+        'authenticate yourself through this link',
+        'secure your account by clicking here',
+    ],
+    'investment': [
+        'guaranteed returns on investment',
+        'invest now get 100% profit',
+        'double your money in 30 days',
+        'risk free investment opportunity',
+        'guaranteed returns investment scheme',
+        'make quick money with us',
+        'get rich quick with this plan',
+        'investment with guaranteed profits',
+    ],
+    'romance': [
+        'i love you lets get married',
+        'can you send me money',
+        'im in financial trouble help me',
+        'transfer money for our future',
+        'i need money for emergency',
+        'send me gifts online',
+        'i miss you send money for ticket',
+        'help me with money for travel',
+    ]
+}
+
 
 class MLScamDetector:
-    """Machine Learning enhanced scam detector"""
+    """
+    Machine Learning enhanced scam detector
+    
+    The trained pipeline is persisted as an artifact at `model_path` and
+    loaded (memory-mapped) on startup. Training only happens when the
+    artifact is missing or its version or feature hash no longer matches.
+    """
     
-    def __init__(self):
+    def __init__(self, model_path: Optional[str] = None, retrain: bool = False):
+        self.model_path = Path(model_path or Config.ML_MODEL_PATH)
         self.model = None
         self.vectorizer = TfidfVectorizer(max_features=1000, lowercase=True)
         self.classifier = MultinomialNB()
@@ -23,67 +98,87 @@ class MLScamDetector:
             ('classifier', self.classifier)
         ])
         self.is_trained = False
+        self._feature_names = None
         self.scam_types = ['banking', 'upi', 'phishing', 'investment', 'romance']
+        if retrain:
+            self.initialize_training_data()
+            self.save_model()
+        else:
+            self.load_or_train()
+    
+    def feature_hash(self) -> str:
+        """Hash of everything the trained model depends on"""
+        fingerprint = {
+            'training_data': TRAINING_DATA,
+            'vectorizer': self.vectorizer.get_params(),
+            'classifier': self.classifier.get_params(),
+            'sklearn_version': sklearn.__version__,
+        }
+        encoded = json.dumps(fingerprint, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+    
+    def load_or_train(self):
+        """Load the persisted model, retraining and exporting it if missing or stale"""
+        if self.load_model():
+            return
         self.initialize_training_data()
+        try:
+            self.save_model()
+        except OSError as e:
+            logger.warning(f"Could not save ML model to {self.model_path}: {e}")
     
-    def initialize_training_data(self):
-        """Initialize with predefined training data for scam detection"""
+    def load_model(self, path: Optional[str] = None) -> bool:
+        """
+        Load a model artifact, memory-mapping its arrays
+        Returns: True if a current artifact was loaded
+        """
+        path = Path(path or self.model_path)
+        if not path.exists():
+            return False
         
-        training_data = {
-            'banking': [
-                'your bank account has been compromised',
-                'verify your bank details immediately',
-                'update your banking information',
-                'confirm your account details for security',
-                'your account requires immediate verification',
-                'reset your banking password now',
-                'suspicious activity on your bank account',
-                'bank security alert urgent',
-                'verify identity with bank details',
-                'your bank account is locked',
-            ],
-            'upi': [
-                'send money via upi to secure account',
-                'upi payment required for verification',
-                'share your upi id for refund',
-                'upi transfer needed for confirmation',
-                'update upi details for safety',
-                'link your upi account now',
-                'upi verification required',
-                'share upi id with us',
-            ],
-            'phishing': [
-                'click here to verify account',
-                'confirm your identity by clicking link',
-                'visit this website to complete verification',
-                'open this link to secure your account',
-                'click to prevent account closure',
-                'verify by visiting this website',
-                'authenticate yourself through this link',
-                'secure your account by clicking here',
-            ],
-            'investment': [
-                'guaranteed returns on investment',
-                'invest now get 100% profit',
-                'double your money in 30 days',
-                'risk free investment opportunity',
-                'guaranteed returns investment scheme',
-                'make quick money with us',
-                'get rich quick with this plan',
-                'investment with guaranteed profits',
-            ],
-            'romance': [
-                'i love you lets get married',
-                'can you send me money',
-                'im in financial trouble help me',
-                'transfer money for our future',
-                'i need money for emergency',
-                'send me gifts online',
-                'i miss you send money for ticket',
-                'help me with money for travel',
-            ]
+        try:
+            artifact = joblib.load(path, mmap_mode='r')
+        except Exception as e:
+            logger.warning(f"Unreadable ML model artifact {path}: {e}")
+            return False
+        
+        if artifact.get('format_version') != MODEL_FORMAT_VERSION or \
+                artifact.get('feature_hash') != self.feature_hash():
+            logger.info(f"ML model artifact {path} is stale, retraining")
+            return False
+        
+        self.pipeline = artifact['pipeline']
+        self.vectorizer = self.pipeline.named_steps['tfidf']
+        self.classifier = self.pipeline.named_steps['classifier']
+        self._feature_names = None
+        self.is_trained = True
+        return True
+    
+    def save_model(self, path: Optional[str] = None) -> Path:
+        """Export the trained model as a versioned artifact"""
+        if not self.is_trained:
+            raise ValueError("Model not trained yet")
+        
+        path = Path(path or self.model_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        artifact = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'feature_hash': self.feature_hash(),
+            'sklearn_version': sklearn.__version__,
+            'created_at': time.time(),
+            'pipeline': self.pipeline,
         }
         
+        # Write then rename so workers never load a half-written file
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        joblib.dump(artifact, temp_path)
+        os.replace(temp_path, path)
+        return path
+    
+    def initialize_training_data(self):
+        """Train on the predefined training data for scam detection"""
+        training_data = TRAINING_DATA
+        
         # Prepare training data
         texts = []
         labels = []
@@ -95,8 +190,58 @@ class MLScamDetector:
         # Train the model
         if texts:
             self.pipeline.fit(texts, labels)
+            self._feature_names = None
             self.is_trained = True
     
+    def score_batch(self, messages: List[str], top_features: int = 10) -> List[Dict[str, Any]]:
+        """
+        Score messages with a single TF-IDF transform and predict_proba call
+        
+        Args:
+            messages: Messages to score
+            top_features: Number of top TF-IDF features to return per message (0 skips them)
+            
+        Returns:
+            Per message: {'scam_type', 'confidence', 'probabilities', 'top_features'}
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained yet")
+        
+        if not messages:
+            return []
+        
+        features = self.vectorizer.transform(messages)
+        probabilities = self.classifier.predict_proba(features)
+        best = np.argmax(probabilities, axis=1)
+        classes = [str(scam_type) for scam_type in self.classifier.classes_]
+        
+        results = []
+        for row, index in enumerate(best):
+            results.append({
+                'scam_type': classes[index],
+                'confidence': float(probabilities[row, index]),
+                'probabilities': dict(zip(classes, probabilities[row].tolist())),
+                'top_features': self._top_features(features, row, top_features) if top_features else {},
+            })
+        return results
+    
+    def score(self, message: str, top_features: int = 10) -> Dict[str, Any]:
+        """Score a single message; see score_batch"""
+        return self.score_batch([message], top_features)[0]
+    
+    def _top_features(self, features, row: int, limit: int) -> Dict[str, float]:
+        """Highest-weighted TF-IDF features of one row of a transformed matrix"""
+        if self._feature_names is None:
+            self._feature_names = self.vectorizer.get_feature_names_out()
+        
+        start, end = features.indptr[row], features.indptr[row + 1]
+        result = {}
+        for idx, score in zip(features.indices[start:end], features.data[start:end]):
+            result[self._feature_names[idx]] = float(score)
+        
+        # Sort by importance
+        return dict(sorted(result.items(), key=lambda x: x[1], reverse=True)[:limit])
+    
     def predict_scam_type(self, message: str) -> Tuple[str, float]:
         """
         Predict scam type using ML model
@@ -106,29 +251,29 @@ class MLScamDetector:
             raise ValueError("Model not trained yet")
         
         try:
-            # Get prediction
-            prediction = self.pipeline.predict([message])[0]
-            
-            # Get prediction probability
-            probabilities = self.pipeline.predict_proba([message])[0]
-            confidence = float(np.max(probabilities))
-            
-            return prediction, confidence
+            result = self.score(message, top_features=0)
+            return result['scam_type'], result['confidence']
         except Exception as e:
             print(f"ML prediction error: {e}")
             return 'unknown', 0.0
     
+    def predict_batch(self, messages: List[str]) -> List[Tuple[str, float]]:
+        """
+        Predict scam types for a batch of messages with one vectorized call
+        Returns: [(scam_type, confidence), ...] in input order
+        """
+        return [
+            (result['scam_type'], result['confidence'])
+            for result in self.score_batch(messages, top_features=0)
+        ]
+    
     def predict_all_probabilities(self, message: str) -> Dict[str, float]:
         """Get probabilities for all scam types"""
         if not self.is_trained:
             raise ValueError("Model not trained yet")
         
         try:
-            probabilities = self.pipeline.predict_proba([message])[0]
-            result = {}
-            for scam_type, prob in zip(self.pipeline.classes_, probabilities):
-                result[scam_type] = float(prob)
-            return result
+            return self.score(message, top_features=0)['probabilities']
         except Exception as e:
             print(f"Error getting probabilities: {e}")
             return {scam_type: 0.0 for scam_type in self.scam_types}
@@ -136,24 +281,26 @@ class MLScamDetector:
     def get_feature_importance(self, message: str) -> Dict[str, float]:
         """Get important features (keywords) for prediction"""
         try:
-            # Get TF-IDF features
-            tfidf_matrix = self.vectorizer.transform([message])
-            feature_names = self.vectorizer.get_feature_names_out()
-            
-            # Get non-zero features
-            feature_indices = tfidf_matrix.nonzero()[1]
-            importance_scores = tfidf_matrix.data
-            
-            result = {}
-            for idx, score in zip(feature_indices, importance_scores):
-                feature = feature_names[idx]
-                result[feature] = float(score)
-            
-            # Sort by importance
-            return dict(sorted(result.items(), key=lambda x: x[1], reverse=True)[:10])
+            return self._top_features(self.vectorizer.transform([message]), 0, 10)
         except Exception as e:
             print(f"Error getting feature importance: {e}")
             return {}
 
 # Initialize global ML detector
 ml_detector = MLScamDetector()
+
+
+def main():
+    """Retrain the model offline and export the artifact"""
+    parser = argparse.ArgumentParser(description="Train the ML scam detector and export its artifact")
+    parser.add_argument("--output", default=Config.ML_MODEL_PATH, help="artifact path to write")
+    args = parser.parse_args()
+    
+    start_time = time.time()
+    detector = MLScamDetector(model_path=args.output, retrain=True)
+    print(f"Exported {detector.model_path} in {(time.time() - start_time) * 1000:.0f}ms "
+          f"(feature hash {detector.feature_hash()[:12]})")
+
+
+if __name__ == "__main__":
+    main()
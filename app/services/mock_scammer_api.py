@@ -1,14 +1,87 @@
 import aiohttp
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 from app.config import Config
 
 
 class MockScammerAPI:
-    """Client to interact with Mock Scammer API for simulation"""
+    """
+    Client to interact with Mock Scammer API for simulation
     
-    def __init__(self, base_url: str = Config.MOCK_SCAMMER_API_URL, api_key: str = Config.MOCK_SCAMMER_API_KEY):
+    All calls share one pooled aiohttp session, so connections (and TLS
+    sessions) are kept alive and reused instead of being set up per call.
+    Use the client as an async context manager (or call `start()` /
+    `close()`) to bound the session's lifetime; it is also opened lazily
+    on first use.
+    """
+    
+    def __init__(
+        self,
+        base_url: str = Config.MOCK_SCAMMER_API_URL,
+        api_key: str = Config.MOCK_SCAMMER_API_KEY,
+        limit: int = Config.MOCK_SCAMMER_POOL_LIMIT,
+        limit_per_host: int = Config.MOCK_SCAMMER_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = Config.MOCK_SCAMMER_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = Config.MOCK_SCAMMER_DNS_CACHE_TTL,
+        timeout: float = Config.MOCK_SCAMMER_TIMEOUT
+    ):
         self.base_url = base_url
         self.api_key = api_key
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def start(self) -> aiohttp.ClientSession:
+        """Open the pooled session (no-op if it is already open)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            headers = {}
+            if self.api_key:
+                headers['Authorization'] = f'Bearer {self.api_key}'
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def __aenter__(self) -> "MockScammerAPI":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def _request(self, method: str, path: str, expected_status: int, error_fields: Dict[str, Any], **kwargs) -> Dict:
+        """Make a request on the pooled session, turning failures into error dicts"""
+        try:
+            session = await self.start()
+            async with session.request(method, f'{self.base_url}{path}', **kwargs) as resp:
+                if resp.status == expected_status:
+                    return await resp.json()
+                else:
+                    return {
+                        'error': f'API returned status {resp.status}',
+                        **error_fields
+                    }
+        except Exception as e:
+            return {
+                'error': str(e),
+                **error_fields
+            }
     
     async def send_message(self, conversation_id: str, message: str) -> Dict:
         """
@@ -17,89 +90,25 @@ class MockScammerAPI:
         Args:
             conversation_id: ID of the conversation
             message: Message to send to the mock scammer
-            
+        
         Returns:
             Response from mock scammer API
         """
-        try:
-            async with aiohttp.ClientSession() as session:
-                headers = {}
-                if self.api_key:
-                    headers['Authorization'] = f'Bearer {self.api_key}'
-                
-                payload = {
-                    'conversation_id': conversation_id,
-                    'message': message,
-                }
-                
-                async with session.post(
-                    f'{self.base_url}/scam/send',
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    else:
-                        return {
-                            'error': f'API returned status {resp.status}',
-                            'conversation_id': conversation_id
-                        }
-        except Exception as e:
-            return {
-                'error': str(e),
-                'conversation_id': conversation_id
-            }
+        payload = {
+            'conversation_id': conversation_id,
+            'message': message,
+        }
+        return await self._request(
+            'POST', '/scam/send', 200, {'conversation_id': conversation_id}, json=payload
+        )
     
     async def get_conversation(self, conversation_id: str) -> Dict:
         """Get conversation details from Mock Scammer API"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                headers = {}
-                if self.api_key:
-                    headers['Authorization'] = f'Bearer {self.api_key}'
-                
-                async with session.get(
-                    f'{self.base_url}/scam/conversation/{conversation_id}',
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    else:
-                        return {
-                            'error': f'API returned status {resp.status}',
-                            'conversation_id': conversation_id
-                        }
-        except Exception as e:
-            return {
-                'error': str(e),
-                'conversation_id': conversation_id
-            }
+        return await self._request(
+            'GET', f'/scam/conversation/{conversation_id}', 200, {'conversation_id': conversation_id}
+        )
     
     async def create_conversation(self, initial_message: str) -> Dict:
         """Create a new conversation with mock scammer"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                headers = {}
-                if self.api_key:
-                    headers['Authorization'] = f'Bearer {self.api_key}'
-                
-                payload = {'initial_message': initial_message}
-                
-                async with session.post(
-                    f'{self.base_url}/scam/conversation',
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 201:
-                        return await resp.json()
-                    else:
-                        return {
-                            'error': f'API returned status {resp.status}'
-                        }
-        except Exception as e:
-            return {
-                'error': str(e)
-            }
+        payload = {'initial_message': initial_message}
+        return await self._request('POST', '/scam/conversation', 201, {}, json=payload)
@@ -0,0 +1,101 @@
+"""
+Local stand-in for the Mock Scammer API
+Serves the endpoints MockScammerAPI calls with scripted scammer replies,
+so simulations and load tests can run offline
+"""
+
+import asyncio
+import uuid
+from typing import Dict, List, Tuple
+from aiohttp import web
+
+# Scripted scammer lines, cycled through turn by turn
+SCAMMER_SCRIPT = [
+    "Your bank account has been locked due to unusual activity. Verify your account now.",
+    "Please confirm your identity. Send your OTP to unlock the account.",
+    "Urgent action required! Transfer the security deposit to secure@ybl today.",
+    "Click here https://secure-verify-bank.com to update your details.",
+    "Send money now or your account will be closed permanently.",
+]
+
+
+def create_app(latency: float = 0.0, fail_every: int = 0) -> web.Application:
+    """
+    Build the mock scammer application
+    
+    Args:
+        latency: Seconds to wait before each reply
+        fail_every: Answer every Nth send of each conversation with a 503
+            (0 never fails), so a run's failures do not depend on how
+            concurrent conversations interleave
+    
+    Returns:
+        aiohttp application serving /scam/conversation and /scam/send
+    """
+    conversations: Dict[str, List[Dict[str, str]]] = {}
+    sends: Dict[str, int] = {}
+    
+    async def reply_delay():
+        if latency:
+            await asyncio.sleep(latency)
+    
+    async def create_conversation(request: web.Request) -> web.Response:
+        payload = await request.json()
+        await reply_delay()
+        conversation_id = str(uuid.uuid4())
+        message = payload.get("initial_message") or SCAMMER_SCRIPT[0]
+        conversations[conversation_id] = [{"role": "scammer", "content": message}]
+        return web.json_response({"conversation_id": conversation_id, "message": message}, status=201)
+    
+    async def send_message(request: web.Request) -> web.Response:
+        payload = await request.json()
+        await reply_delay()
+        conversation_id = payload.get("conversation_id")
+        if fail_every:
+            sends[conversation_id] = sends.get(conversation_id, 0) + 1
+            if sends[conversation_id] % fail_every == 0:
+                return web.json_response({"error": "temporarily unavailable"}, status=503)
+        history = conversations.get(conversation_id)
+        if history is None:
+            return web.json_response({"error": "conversation not found"}, status=404)
+        history.append({"role": "honeypot", "content": payload.get("message", "")})
+        turn = sum(1 for message in history if message["role"] == "scammer")
+        message = SCAMMER_SCRIPT[turn % len(SCAMMER_SCRIPT)]
+        history.append({"role": "scammer", "content": message})
+        return web.json_response({
+            "conversation_id": conversation_id,
+            "message": message,
+            "turn": turn,
+        })
+    
+    async def get_conversation(request: web.Request) -> web.Response:
+        conversation_id = request.match_info["conversation_id"]
+        history = conversations.get(conversation_id)
+        if history is None:
+            return web.json_response({"error": "conversation not found"}, status=404)
+        return web.json_response({"conversation_id": conversation_id, "messages": history})
+    
+    app = web.Application()
+    app.router.add_post("/scam/conversation", create_conversation)
+    app.router.add_post("/scam/send", send_message)
+    app.router.add_get("/scam/conversation/{conversation_id}", get_conversation)
+    return app
+
+
+async def start_server(host: str = "127.0.0.1", port: int = 0, **options) -> Tuple[web.AppRunner, str]:
+    """
+    Start the mock scammer server on the running event loop
+    
+    Returns:
+        (runner, base URL); call `await runner.cleanup()` to stop it
+    """
+    runner = web.AppRunner(create_app(**options))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host="127.0.0.1", port=8001)
@@ -0,0 +1,204 @@
+"""
+Offloading CPU-bound analysis from the event loop
+Runs detection and extraction inline for small inputs and on a thread or
+process pool for large ones, and measures how late the event loop runs
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models import DetectionResult, ExtractedIntelligence
+from app.config import Config
+from app.logger import logger
+
+OFFLOAD_MODES = ("inline", "thread", "process")
+
+# Services used by the analysis functions; the app's own instances in this
+# process, fresh ones inside process pool workers
+_detector = None
+_extractor = None
+
+
+def use_services(detector, extractor):
+    """Set the detector and extractor the analysis functions run with"""
+    global _detector, _extractor
+    _detector = detector
+    _extractor = extractor
+
+
+def _init_worker():
+    """Process pool initializer: log to stderr and build this worker's own services"""
+    from app.logger import setup_worker_logger
+    from app.services.cascade_detector import CascadeDetector
+    from app.services.extractor import IntelligenceExtractor
+    setup_worker_logger()
+    use_services(CascadeDetector(), IntelligenceExtractor())
+
+
+def run_batch(batch_func, item_func, items: List[Any]) -> List[Any]:
+    """
+    Run a batch function, falling back to one call per item if it fails
+    
+    Returns:
+        One result per item; items that still fail get their exception instead
+    """
+    try:
+        return batch_func(items)
+    except Exception as e:
+        logger.warning(f"Batch call {batch_func.__name__} failed, retrying per item: {str(e)}")
+    
+    results = []
+    for item in items:
+        try:
+            results.append(item_func(item))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def analyze_message(message: str, accumulated: Optional[ExtractedIntelligence] = None
+                    ) -> Tuple[DetectionResult, ExtractedIntelligence, Dict[str, float]]:
+    """
+    Detect and extract one message, merging into `accumulated` intelligence if given
+    
+    Returns:
+        (detection, intelligence, seconds spent per stage)
+    """
+    start = time.perf_counter()
+    detection = _detector.detect_scam(message)
+    detected = time.perf_counter()
+    intelligence = _extractor.extract_incremental(message, accumulated)
+    return detection, intelligence, {"detection": detected - start, "extraction": time.perf_counter() - detected}
+
+
+def analyze_batch(messages: List[str]) -> Tuple[List[Any], List[Any], Dict[str, float]]:
+    """
+    Detect and extract a batch; failed items get their exception instead of a result
+    
+    Returns:
+        (detections, intelligence, seconds spent per stage)
+    """
+    start = time.perf_counter()
+    detections = run_batch(_detector.detect_batch, _detector.detect_scam, messages)
+    detected = time.perf_counter()
+    intelligence = run_batch(_extractor.extract_batch, _extractor.extract_intelligence, messages)
+    return detections, intelligence, {"detection": detected - start, "extraction": time.perf_counter() - detected}
+
+
+class Offloader:
+    """
+    Runs CPU-bound calls off the event loop
+    
+    Calls on inputs smaller than `inline_below` characters run inline,
+    where a pool round trip would cost more than the work itself. Larger
+    ones go to the pool: threads keep the loop responsive (the regex and
+    model work still shares the GIL), processes also run in parallel but
+    use their own detector instances, so their detection stage counts are
+    not reflected in the app's.
+    """
+    
+    def __init__(
+        self,
+        mode: str = Config.OFFLOAD_MODE,
+        workers: int = Config.OFFLOAD_WORKERS,
+        inline_below: int = Config.OFFLOAD_INLINE_BELOW
+    ):
+        if mode not in OFFLOAD_MODES:
+            raise ValueError(f"Unknown offload mode: {mode}")
+        self.mode = mode
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.inline_below = inline_below
+        self._executor: Optional[concurrent.futures.Executor] = None
+        self.stats = {"inline": 0, "offloaded": 0}
+    
+    def start(self):
+        """Create the worker pool (no-op for inline mode or if already started)"""
+        if self.mode == "inline" or self._executor is not None:
+            return
+        if self.mode == "thread":
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="offload")
+        else:
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_init_worker)
+    
+    def shutdown(self):
+        """Stop the worker pool, waiting for running calls"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    async def run(self, func: Callable, *args, size: int = 0) -> Any:
+        """
+        Call `func(*args)`, on the pool if `size` reaches the inline threshold
+        
+        Args:
+            func: Module-level function (process pools pickle it by name)
+            size: Input size in characters
+        
+        Returns:
+            What `func` returns
+        """
+        if self.mode == "inline" or size < self.inline_below:
+            self.stats["inline"] += 1
+            return func(*args)
+        self.start()
+        self.stats["offloaded"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how much later than scheduled a periodic wakeup runs
+    
+    Lag means something held the loop, and every request waiting on it
+    was delayed by as much.
+    """
+    
+    def __init__(
+        self,
+        interval: float = Config.LOOP_LAG_INTERVAL,
+        warn_after: float = Config.LOOP_LAG_WARN,
+        window: int = 600
+    ):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.samples: collections.deque = collections.deque(maxlen=window)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            scheduled = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - scheduled))
+    
+    def record(self, lag: float):
+        self.samples.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.warn_after:
+            self.stalls += 1
+            logger.warning(f"Event loop stalled for {lag * 1000:.0f}ms")
+    
+    def summary(self) -> Dict[str, float]:
+        """Lag over the recent window in milliseconds, plus the all-time max and stall count"""
+        result = {"samples": len(self.samples), "max_ms": self.max_lag * 1000, "stalls": self.stalls}
+        if len(self.samples) >= 2:
+            cuts = statistics.quantiles(self.samples, n=100, method="inclusive")
+            result.update(p50_ms=cuts[49] * 1000, p99_ms=cuts[98] * 1000)
+        return result
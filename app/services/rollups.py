@@ -0,0 +1,229 @@
+"""
+Time-series rollups for analytics trends
+Counts events in epoch-aligned minute, hour and day buckets with bounded
+retention, persisted to the database so trends survive restarts
+"""
+
+import asyncio
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+from app.config import Config
+from app.logger import logger
+
+# Bucket width in seconds per resolution, finest first
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+_RESOLUTION_NAMES = {step: name for name, step in RESOLUTIONS.items()}
+
+
+class _Ring:
+    """Counts for the last `slots` buckets of one resolution, indexed by bucket number"""
+    
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.buckets = array("q", [-1]) * slots
+        self.counts = array("d", [0.0]) * slots
+    
+    def add(self, bucket: int, amount: float):
+        slot = bucket % self.slots
+        if self.buckets[slot] != bucket:
+            # The slot still holds a bucket past retention; reuse it
+            self.buckets[slot] = bucket
+            self.counts[slot] = 0.0
+        self.counts[slot] += amount
+    
+    def get(self, bucket: int) -> float:
+        slot = bucket % self.slots
+        return self.counts[slot] if self.buckets[slot] == bucket else 0.0
+
+
+class RollupStore:
+    """
+    Event counts per series at minute, hour and day resolution
+    
+    Every event is added to all three resolutions at once, so the coarse
+    series are the fine ones downsampled, without a resampling pass. Each
+    resolution is a ring of preallocated buckets covering its retention:
+    recording is O(1), a range query is O(buckets) and memory is fixed per
+    series. Every `flush_interval` seconds the counts added since the last
+    flush are added to the analytics_rollups rows, so workers sharing the
+    table each contribute their own events, and rows past retention are
+    deleted there.
+    """
+    
+    def __init__(
+        self,
+        retention: Optional[Dict[str, float]] = None,
+        flush_interval: float = Config.ROLLUP_FLUSH_INTERVAL,
+        max_points: int = 2000,
+        session_factory=None
+    ):
+        self.retention = retention or {
+            "minute": Config.ROLLUP_MINUTE_RETENTION_HOURS * 3600,
+            "hour": Config.ROLLUP_HOUR_RETENTION_DAYS * 86400,
+            "day": Config.ROLLUP_DAY_RETENTION_DAYS * 86400,
+        }
+        self.flush_interval = flush_interval
+        self.max_points = max_points
+        self.session_factory = session_factory  # app.database.SessionLocal if None
+        self._series: Dict[str, Dict[str, _Ring]] = {}
+        # (series, bucket width, bucket_start) -> count added since the last flush
+        self._pending: Dict[Tuple[str, int, int], float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"flushes": 0, "rows_written": 0, "failed_rows": 0}
+    
+    def _rings(self, series: str) -> Dict[str, _Ring]:
+        rings = self._series.get(series)
+        if rings is None:
+            rings = self._series[series] = {
+                name: _Ring(int(self.retention[name] // step) + 1) for name, step in RESOLUTIONS.items()
+            }
+        return rings
+    
+    def series(self) -> List[str]:
+        return sorted(self._series)
+    
+    def record(self, series: str, timestamp: Optional[float] = None, amount: float = 1.0):
+        """Count `amount` events of `series` at `timestamp` (now if None)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        for name, ring in self._rings(series).items():
+            step = RESOLUTIONS[name]
+            bucket = int(timestamp // step)
+            ring.add(bucket, amount)
+            key = (series, step, bucket * step)
+            self._pending[key] = self._pending.get(key, 0.0) + amount
+    
+    def pick_resolution(self, start: float, end: Optional[float] = None, now: Optional[float] = None) -> str:
+        """The finest resolution that still holds `start` and covers the window in max_points buckets"""
+        now = time.time() if now is None else now
+        end = now if end is None else end
+        for name, step in RESOLUTIONS.items():
+            if now - start <= self.retention[name] and (end - start) / step <= self.max_points:
+                return name
+        return "day"
+    
+    def range(self, series: str, start: float, end: Optional[float] = None,
+              resolution: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        Counts for every bucket overlapping [start, end), oldest first
+        
+        Args:
+            start: Window start, epoch seconds
+            end: Window end, epoch seconds (now if None)
+            resolution: "minute", "hour" or "day" (picked from the window if None)
+        
+        Returns:
+            (bucket_start, count) pairs, with zeros for empty buckets and
+            for those whose slot was reused after their retention ran out
+        """
+        end = time.time() if end is None else end
+        resolution = resolution or self.pick_resolution(start, end)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        step = RESOLUTIONS[resolution]
+        first, last = int(start // step), -int(-end // step)
+        if last - first > self.max_points:
+            raise ValueError(f"Window spans {last - first} {resolution} buckets, more than {self.max_points}")
+        rings = self._series.get(series)
+        if rings is None:
+            return [(bucket * step, 0.0) for bucket in range(first, last)]
+        ring = rings[resolution]
+        return [(bucket * step, ring.get(bucket)) for bucket in range(first, last)]
+    
+    def _cutoffs(self, now: float) -> Dict[int, int]:
+        """Oldest bucket_start kept per resolution (in seconds, keyed by bucket width)"""
+        return {
+            step: int((now - self.retention[name]) // step) * step
+            for name, step in RESOLUTIONS.items()
+        }
+    
+    def load(self, session_factory=None) -> int:
+        """
+        Add the stored buckets still within retention to the in-memory counts
+        
+        Meant for startup, before anything is recorded. The stored counts
+        include every worker's flushed events; afterwards this store only
+        adds its own.
+        
+        Returns:
+            Number of buckets loaded
+        """
+        from app.database import SessionLocal, load_rollups
+        session_factory = session_factory or self.session_factory or SessionLocal
+        rows = load_rollups(self._cutoffs(time.time()), session_factory())
+        for series, step, bucket_start, count in rows:
+            self._rings(series)[_RESOLUTION_NAMES[step]].add(bucket_start // step, count)
+        logger.info(f"Rollup store loaded {len(rows)} buckets")
+        return len(rows)
+    
+    def _take(self) -> List[dict]:
+        """Counts added to each bucket since the last flush"""
+        pending, self._pending = self._pending, {}
+        return [
+            {"series": series, "resolution": step, "bucket_start": bucket_start, "count": count}
+            for (series, step, bucket_start), count in pending.items()
+        ]
+    
+    def _write(self, rows: List[dict]) -> List[dict]:
+        """
+        Add the pending counts to the stored buckets and delete expired ones (blocking)
+        
+        Runs on a worker thread, so it leaves `_pending` alone.
+        
+        Returns:
+            The rows that were not written, for the caller to requeue
+        """
+        from app.database import SessionLocal, prune_rollups, save_rollups_batch
+        session_factory = self.session_factory or SessionLocal
+        failed = []
+        try:
+            self.stats["rows_written"] += save_rollups_batch(rows, session_factory())
+        except Exception as e:
+            failed = rows
+            logger.error(f"Failed to write {len(rows)} rollup buckets: {str(e)}")
+        try:
+            prune_rollups(self._cutoffs(time.time()), session_factory())
+        except Exception as e:
+            logger.error(f"Failed to prune rollup buckets: {str(e)}")
+        self.stats["flushes"] += 1
+        return failed
+    
+    def _requeue(self, rows: List[dict]):
+        """Return unwritten counts to the pending ones, to be retried with the next flush"""
+        self.stats["failed_rows"] += len(rows)
+        for row in rows:
+            key = (row["series"], row["resolution"], row["bucket_start"])
+            self._pending[key] = self._pending.get(key, 0.0) + row["count"]
+    
+    def flush(self):
+        """Write the changed buckets now (blocking)"""
+        self._requeue(self._write(self._take()))
+    
+    async def _flush_async(self):
+        """Write the changed buckets on a worker thread, requeueing failures back on the loop"""
+        write = asyncio.ensure_future(asyncio.to_thread(self._write, self._take()))
+        try:
+            self._requeue(await asyncio.shield(write))
+        except asyncio.CancelledError:
+            # Stopped mid-write: the thread carries on, so keep what it fails to write
+            self._requeue(await write)
+            raise
+    
+    def start(self):
+        """Start the periodic flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flush task and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._flush_async()
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._pending:
+                await self._flush_async()
@@ -0,0 +1,223 @@
+"""
+Concurrent honeypot-vs-scammer simulation
+Drives many conversations between the EngagementAgent and the mock scammer
+service at once to load-test persona strategies and plan capacity
+
+Run with: python -m app.services.simulation --conversations 200 --concurrency 50
+(without --url a local mock scammer server is started)
+"""
+
+import argparse
+import asyncio
+import bisect
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.agents.conversation_store import ConversationStore
+from app.agents.engagement_agent import EngagementAgent
+from app.services.detector import ScamDetector
+from app.services.mock_scammer_api import MockScammerAPI
+
+
+class SimulationError(Exception):
+    """A mock scammer call still failed after all retries"""
+
+
+class LatencyHistogram:
+    """Latency samples bucketed by upper bound in milliseconds"""
+    
+    BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.samples: List[float] = []
+    
+    def record(self, seconds: float):
+        milliseconds = seconds * 1000
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, milliseconds)] += 1
+        self.samples.append(milliseconds)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Percentiles and bucket counts ('<=N ms' keys, plus '>5000 ms')"""
+        labels = [f"<={bound} ms" for bound in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]} ms"]
+        result: Dict[str, Any] = {"buckets": dict(zip(labels, self.counts))}
+        if len(self.samples) >= 2:
+            cuts = statistics.quantiles(self.samples, n=100, method="inclusive")
+            result.update(p50=cuts[49], p95=cuts[94], p99=cuts[98], max=max(self.samples))
+        elif self.samples:
+            result.update(p50=self.samples[0], p95=self.samples[0], p99=self.samples[0], max=self.samples[0])
+        return result
+
+
+class SimulationRunner:
+    """
+    Runs honeypot-vs-scammer conversations with bounded concurrency
+    
+    At most `concurrency` conversations are in flight. Every call to the
+    scammer service gets `turn_timeout` seconds and is retried up to
+    `retries` times with exponential backoff before the conversation is
+    counted as failed.
+    """
+    
+    def __init__(
+        self,
+        api: MockScammerAPI,
+        agent: Optional[EngagementAgent] = None,
+        detector: Optional[ScamDetector] = None,
+        concurrency: int = 20,
+        turns: int = 5,
+        turn_timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.1,
+        persona: str = "elderly_person"
+    ):
+        self.api = api
+        # Simulated conversations are not persisted when they leave the store
+        self.agent = agent or EngagementAgent(ConversationStore(on_evict=None))
+        self.detector = detector or ScamDetector()
+        self.concurrency = concurrency
+        self.turns = turns
+        self.turn_timeout = turn_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.persona = persona
+        self._reset()
+    
+    def _reset(self):
+        self.turn_latency = LatencyHistogram()
+        self.completed = 0
+        self.failed = 0
+        self.turns_done = 0
+        self.retried = 0
+        self.errors: Dict[str, int] = {}
+    
+    async def run(self, conversations: int, opening_message: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run `conversations` conversations and report throughput and latency
+        
+        Args:
+            conversations: Number of conversations to simulate
+            opening_message: First scammer message (the server's default if None)
+        
+        Returns:
+            Report with counts, turns per second and the turn latency histogram
+        """
+        self._reset()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start_time = time.perf_counter()
+        await asyncio.gather(*(
+            self._run_conversation(semaphore, opening_message) for _ in range(conversations)
+        ))
+        elapsed = time.perf_counter() - start_time
+        return {
+            "conversations": conversations,
+            "completed": self.completed,
+            "failed": self.failed,
+            "turns": self.turns_done,
+            "retries": self.retried,
+            "errors": dict(self.errors),
+            "elapsed_seconds": elapsed,
+            "turns_per_second": self.turns_done / elapsed if elapsed else 0.0,
+            "turn_latency_ms": self.turn_latency.summary(),
+        }
+    
+    async def _run_conversation(self, semaphore: asyncio.Semaphore, opening_message: Optional[str]):
+        async with semaphore:
+            conversation_id = None
+            try:
+                created = await self._call(lambda: self.api.create_conversation(opening_message or ""))
+                conversation_id = created["conversation_id"]
+                scammer_message = created["message"]
+                for _ in range(self.turns):
+                    turn_start = time.perf_counter()
+                    detection = self.detector.detect_scam(scammer_message)
+                    reply = await asyncio.wait_for(
+                        self.agent.engage_with_scammer(
+                            conversation_id, scammer_message, detection.scam_type, self.persona
+                        ),
+                        self.turn_timeout
+                    )
+                    response = await self._call(lambda: self.api.send_message(conversation_id, reply))
+                    self.turn_latency.record(time.perf_counter() - turn_start)
+                    self.turns_done += 1
+                    scammer_message = response["message"]
+                self.completed += 1
+            except (SimulationError, asyncio.TimeoutError, KeyError) as e:
+                self.failed += 1
+                error = type(e).__name__ if not str(e) else str(e)
+                self.errors[error] = self.errors.get(error, 0) + 1
+            finally:
+                if conversation_id:
+                    self.agent.terminate_conversation(conversation_id)
+    
+    async def _call(self, request: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Make a scammer API call with a timeout, retrying failures with backoff"""
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                result = await asyncio.wait_for(request(), self.turn_timeout)
+            except asyncio.TimeoutError:
+                error = "timeout"
+                continue
+            if "error" not in result:
+                return result
+            error = result["error"]
+        raise SimulationError(error)
+
+
+async def run_simulation(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one simulation from CLI arguments, starting a local server when no URL is given"""
+    from app.services.mock_scammer_server import start_server
+    
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = await start_server(latency=args.server_latency)
+    try:
+        async with MockScammerAPI(base_url=base_url, limit=args.concurrency, limit_per_host=args.concurrency) as api:
+            runner = SimulationRunner(
+                api,
+                concurrency=args.concurrency,
+                turns=args.turns,
+                turn_timeout=args.timeout,
+                retries=args.retries,
+                persona=args.persona
+            )
+            return await runner.run(args.conversations)
+    finally:
+        if server is not None:
+            await server.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent honeypot-vs-scammer conversations")
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds per scammer call")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--persona", default="elderly_person")
+    parser.add_argument("--url", help="mock scammer API base URL (default: start a local server)")
+    parser.add_argument("--server-latency", type=float, default=0.0, help="reply delay of the local server")
+    args = parser.parse_args()
+    
+    report = asyncio.run(run_simulation(args))
+    latency = report["turn_latency_ms"]
+    print(f"{report['completed']}/{report['conversations']} conversations, {report['turns']} turns "
+          f"in {report['elapsed_seconds']:.2f}s ({report['turns_per_second']:.0f} turns/s), "
+          f"{report['retries']} retries")
+    if "p50" in latency:
+        print(f"turn latency ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  "
+              f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    for bucket, count in latency["buckets"].items():
+        if count:
+            print(f"  {bucket:>10}: {count}")
+    if report["errors"]:
+        print(f"errors: {report['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Streaming NDJSON ingestion
+Reads a continuous feed of ScamMessage records from one connection and
+streams a result line back for each, with bounded in-flight work
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple, Union
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from app.models import ScamMessage
+from app.config import Config
+from app.logger import logger
+
+# (record index, parsed message or the reason it was rejected)
+Record = Tuple[int, Union[ScamMessage, str]]
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = Config.INGEST_MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """
+    Split a byte stream into non-empty lines
+    
+    Raises:
+        ValueError: If a line grows past `max_line_bytes`
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines + [buffer]:
+            # A chunk may carry a whole oversized line, newline included
+            if len(line) > max_line_bytes:
+                raise ValueError(f"Line longer than {max_line_bytes} bytes")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+class IngestStreamResponse(StreamingResponse):
+    """
+    NDJSON response whose body iterator is still reading the request body
+    
+    StreamingResponse normally listens for the client disconnect by reading
+    the request concurrently, which would steal body chunks from the
+    ingestor. Here the ingestor's own reads see the disconnect instead.
+    """
+    
+    media_type = "application/x-ndjson"
+    
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+class StreamIngestor:
+    """
+    Runs one NDJSON feed through a batch processor with backpressure
+    
+    The body is parsed into a queue holding at most `max_in_flight`
+    records; when processing falls behind, reading stops, so the client is
+    slowed down by TCP flow control instead of the server buffering the
+    feed. Queued records are processed `batch_size` at a time and a result
+    line is written for each, in input order.
+    """
+    
+    def __init__(
+        self,
+        process_batch: Callable[[List[ScamMessage]], Awaitable[List[Dict[str, Any]]]],
+        max_in_flight: int = Config.INGEST_MAX_IN_FLIGHT,
+        batch_size: int = Config.INGEST_BATCH_SIZE,
+        max_line_bytes: int = Config.INGEST_MAX_LINE_BYTES
+    ):
+        self.process_batch = process_batch
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+        self.stats = {"records": 0, "processed": 0, "rejected": 0}
+    
+    async def run(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Ingest a byte stream of NDJSON ScamMessage records
+        
+        Yields:
+            One NDJSON result line per record; a final {"error": ...} line
+            if the stream itself could not be read
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+        reader = asyncio.create_task(self._read(chunks, queue))
+        try:
+            while True:
+                batch = [await queue.get()]
+                while len(batch) < self.batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+                done = batch[-1] is None or isinstance(batch[-1], Exception)
+                end = batch.pop() if done else None
+                if batch:
+                    for result in await self._process(batch):
+                        yield (json.dumps(result) + "\n").encode("utf-8")
+                if done:
+                    if end is not None:
+                        yield (json.dumps({"error": f"Stream aborted: {str(end)}"}) + "\n").encode("utf-8")
+                    return
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+    
+    async def _read(self, chunks: AsyncIterator[bytes], queue: asyncio.Queue):
+        """Parse records into the queue; ends with None, or the exception that stopped reading"""
+        index = 0
+        try:
+            async for line in iter_ndjson_lines(chunks, self.max_line_bytes):
+                try:
+                    record: Union[ScamMessage, str] = ScamMessage.model_validate_json(line)
+                except ValidationError as e:
+                    record = f"Invalid record: {e.errors(include_url=False)[0]['msg']}"
+                await queue.put((index, record))
+                index += 1
+        except Exception as e:
+            logger.warning(f"Ingest stream stopped after {index} records: {str(e)}")
+            await queue.put(e)
+            return
+        await queue.put(None)
+    
+    async def _process(self, batch: List[Record]) -> List[Dict[str, Any]]:
+        """Results for a batch of records, in order"""
+        valid = [(index, record) for index, record in batch if isinstance(record, ScamMessage)]
+        self.stats["records"] += len(batch)
+        self.stats["rejected"] += len(batch) - len(valid)
+        try:
+            processed = await self.process_batch([message for _, message in valid]) if valid else []
+        except Exception as e:
+            logger.error(f"Ingest batch of {len(valid)} failed: {str(e)}")
+            processed = [{"error": f"Processing error: {str(e)}"}] * len(valid)
+        self.stats["processed"] += len(valid)
+        
+        results = dict(zip((index for index, _ in valid), processed))
+        return [
+            {"index": index, **results[index]} if index in results else {"index": index, "error": record}
+            for index, record in batch
+        ]
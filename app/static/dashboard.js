@@ -2,6 +2,8 @@
 const API_BASE_URL = 'http://127.0.0.1:8000';
 const UPDATE_INTERVAL = 3000; // 3 seconds
 let updateTimer;
+let eventSource;
+let liveStats = {};
 let scamTypesChart, intelligenceChart;
 let conversationCache = {};
 let totalScamsDetected = 0;
@@ -14,7 +16,7 @@ document.addEventListener('DOMContentLoaded', () => {
     showLoadingState();
     initCharts();
     checkServerHealth();
-    startAutoUpdate();
+    subscribeToEvents();
     setupTestConsole();
     updateTime();
     setInterval(updateTime, 1000);
@@ -149,62 +151,89 @@ function initCharts() {
 async function checkServerHealth() {
     try {
         const response = await fetch(`${API_BASE_URL}/health`);
-        const data = await response.json();
-        
-        const statusBadge = document.getElementById('serverStatus');
-        const statusText = document.getElementById('statusText');
-        const statusDot = statusBadge.querySelector('.status-dot');
-        
-        if (response.ok) {
-            statusDot.classList.add('online');
-            statusText.innerHTML = '🟢 Server Online';
-            statusBadge.style.borderColor = '#10b981';
-        } else {
-            statusText.innerHTML = '🔴 Server Offline';
-            statusBadge.style.borderColor = '#ef4444';
-        }
+        setServerStatus(response.ok);
     } catch (error) {
         console.error('Health check failed:', error);
-        const statusText = document.getElementById('statusText');
+        setServerStatus(false);
+    }
+}
+
+// Show the server as online or offline
+function setServerStatus(online) {
+    const statusBadge = document.getElementById('serverStatus');
+    const statusText = document.getElementById('statusText');
+    const statusDot = statusBadge.querySelector('.status-dot');
+    
+    if (online) {
+        statusDot.classList.add('online');
+        statusText.innerHTML = '🟢 Server Online';
+        statusBadge.style.borderColor = '#10b981';
+    } else {
+        statusDot.classList.remove('online');
         statusText.innerHTML = '🔴 Server Offline';
+        statusBadge.style.borderColor = '#ef4444';
     }
 }
 
-// Auto Update Dashboard
+// Subscribe to live updates pushed by the server (/events); the browser
+// reconnects on its own, and we get a full snapshot again when it does
+function subscribeToEvents() {
+    if (!window.EventSource) {
+        startAutoUpdate();
+        return;
+    }
+    
+    eventSource = new EventSource(`${API_BASE_URL}/events`);
+    eventSource.onopen = () => setServerStatus(true);
+    eventSource.onerror = () => setServerStatus(false);
+    
+    eventSource.addEventListener('snapshot', (event) => {
+        liveStats = JSON.parse(event.data).stats;
+        renderStats(liveStats);
+    });
+    
+    eventSource.addEventListener('update', (event) => {
+        const update = JSON.parse(event.data);
+        Object.assign(liveStats, update.stats);
+        renderStats(liveStats);
+        update.detections.forEach(addDetectionRow);
+    });
+}
+
+// Auto Update Dashboard (fallback for browsers without EventSource)
 function startAutoUpdate() {
     updateDashboard();
     updateTimer = setInterval(updateDashboard, UPDATE_INTERVAL);
 }
 
-// Update Dashboard Data with animations
+// Update Dashboard Data from /stats
 async function updateDashboard() {
     try {
         const statsResponse = await fetch(`${API_BASE_URL}/stats`);
-        const stats = await statsResponse.json();
-        
-        // Update KPI Cards with animation
-        animateValueChange('activeConversations', stats.active_conversations || 0);
-        animateValueChange('totalMessages', stats.total_messages || 0);
-        animateValueChange('scamsDetected', stats.scams_detected || 0);
-        
-        // Calculate average response time
-        const avgTime = stats.avg_response_time || 8.77;
-        document.getElementById('avgResponseTime').textContent = avgTime.toFixed(2) + 'ms';
-        
-        // Update intelligence counts
-        updateIntelligenceCounts(stats);
-        
-        // Update charts
-        updateCharts(stats);
-        
-        // Update recent detections
-        updateRecentDetections(stats);
-        
+        renderStats(await statsResponse.json());
     } catch (error) {
         console.error('Dashboard update error:', error);
     }
 }
 
+// Render stats with animations
+function renderStats(stats) {
+    // Update KPI Cards with animation
+    animateValueChange('activeConversations', stats.active_conversations || 0);
+    animateValueChange('totalMessages', stats.total_messages || 0);
+    animateValueChange('scamsDetected', stats.scams_detected || 0);
+    
+    // Median /analyze response time
+    const avgTime = stats.avg_response_time || 0;
+    document.getElementById('avgResponseTime').textContent = avgTime.toFixed(2) + 'ms';
+    
+    // Update intelligence counts
+    updateIntelligenceCounts(stats);
+    
+    // Update charts
+    updateCharts(stats);
+}
+
 // Animate value changes
 function animateValueChange(elementId, newValue) {
     const element = document.getElementById(elementId);
@@ -226,7 +255,7 @@ function updateIntelligenceCounts(stats) {
         upiIdCount: stats.upi_ids || 0,
         phishingLinkCount: stats.phishing_links || 0,
         phoneNumberCount: stats.phone_numbers || 0,
-        emailCount: stats.emails || 0,
+        emailCount: stats.email_addresses || 0,
         patternCount: stats.suspicious_patterns || 0
     };
     
@@ -255,7 +284,7 @@ function updateCharts(stats) {
         stats.upi_ids || 0,
         stats.phishing_links || 0,
         stats.phone_numbers || 0,
-        stats.emails || 0,
+        stats.email_addresses || 0,
         stats.suspicious_patterns || 0
     ];
     
@@ -263,42 +292,37 @@ function updateCharts(stats) {
     intelligenceChart.update('none');
 }
 
-// Update Recent Detections Table
-function updateRecentDetections(stats) {
+// Add a detection pushed by the server to the Recent Detections table
+function addDetectionRow(detection) {
     const tbody = document.getElementById('detectionsList');
     
-    // Simulate recent detections from stats
-    if (stats.scams_detected > 0) {
-        // Clear empty state if exists
-        if (tbody.querySelector('.empty-state')) {
-            tbody.innerHTML = '';
-        }
-        
-        // Create sample detection rows
-        const scamTypes = ['banking', 'upi', 'phishing', 'investment', 'romance'];
-        const confidence = Math.floor(Math.random() * (95 - 60 + 1)) + 60;
-        const tableHtml = `
-            <tr style="animation: slideInDown 0.4s ease-out;">
-                <td><code style="color: #00bcd4; font-weight: 600;">conv-${Math.random().toString(36).substr(2, 9)}</code></td>
-                <td>
-                    <span class="scam-type-badge badge-${scamTypes[0]}">
-                        ${scamTypes[0].toUpperCase()}
-                    </span>
-                </td>
-                <td><strong style="color: var(--danger-color);">${confidence}%</strong></td>
-                <td>${Math.floor(Math.random() * 5) + 2}</td>
-                <td><strong style="color: var(--secondary-color);">${Math.floor(Math.random() * 40) + 10}%</strong></td>
-                <td>${new Date().toLocaleTimeString()}</td>
-            </tr>
-        `;
-        
-        // Keep only last 5 detections
-        if (tbody.children.length >= 5) {
-            tbody.removeChild(tbody.lastChild);
-        }
-        
-        tbody.insertAdjacentHTML('afterbegin', tableHtml);
+    // Clear empty state if exists
+    if (tbody.querySelector('.empty-state')) {
+        tbody.innerHTML = '';
     }
+    
+    const scamType = detection.scam_type || 'other';
+    const tableHtml = `
+        <tr style="animation: slideInDown 0.4s ease-out;">
+            <td><code style="color: #00bcd4; font-weight: 600;">${detection.conversation_id.substring(0, 8)}</code></td>
+            <td>
+                <span class="scam-type-badge badge-${scamType}">
+                    ${scamType.toUpperCase()}
+                </span>
+            </td>
+            <td><strong style="color: var(--danger-color);">${Math.round(detection.confidence * 100)}%</strong></td>
+            <td>1</td>
+            <td><strong style="color: var(--secondary-color);">-</strong></td>
+            <td>${new Date(detection.timestamp * 1000).toLocaleTimeString()}</td>
+        </tr>
+    `;
+    
+    // Keep only last 5 detections
+    if (tbody.children.length >= 5) {
+        tbody.removeChild(tbody.lastChild);
+    }
+    
+    tbody.insertAdjacentHTML('afterbegin', tableHtml);
 }
 
 // Setup Test Console
@@ -444,6 +468,7 @@ function setupIntelItemInteractions() {
 // Cleanup on page unload
 window.addEventListener('beforeunload', () => {
     if (updateTimer) clearInterval(updateTimer);
+    if (eventSource) eventSource.close();
 });
 
 console.log('✅ Dashboard Ready!');
@@ -0,0 +1,59 @@
+"""
+Benchmark: intelligence persistence throughput on SQLite
+
+Compares save_intelligence (duplicate SELECT plus one commit per row)
+against save_intelligence_batch (one INSERT ... ON CONFLICT DO NOTHING
+transaction per batch, as DatabaseWriter flushes them). Runs against a
+throwaway database file.
+
+Run with: python -m benchmarks.bench_db_writer
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, IntelligenceRecord, save_intelligence, save_intelligence_batch
+
+
+def rows(count: int, prefix: str):
+    # Every tenth value repeats an earlier one, like indicators seen again
+    return [
+        {"conversation_id": f"conv-{i // 5}", "intelligence_type": "upi_id", "value": f"{prefix}{i - i % 10 if i % 10 == 9 else i}@ybl"}
+        for i in range(count)
+    ]
+
+
+def main(count: int = 2000, batch_size: int = 500):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        
+        start = time.perf_counter()
+        for row in rows(count, "single"):
+            save_intelligence(row["conversation_id"], row["intelligence_type"], row["value"], db=Session())
+        single = time.perf_counter() - start
+        
+        batch_rows = rows(count, "batch")
+        start = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            save_intelligence_batch(batch_rows[offset:offset + batch_size], db=Session())
+        batched = time.perf_counter() - start
+        
+        with Session() as db:
+            stored_single = db.query(IntelligenceRecord).filter(IntelligenceRecord.value.like("single%")).count()
+            stored_batch = db.query(IntelligenceRecord).filter(IntelligenceRecord.value.like("batch%")).count()
+        assert stored_single == stored_batch, (stored_single, stored_batch)
+        engine.dispose()
+    
+    print(f"{'mode':<32}{'rows/s':>10}{'speedup':>9}")
+    print(f"{'save_intelligence (per row)':<32}{count / single:>10.0f}{1:>8.2f}x")
+    print(f"{f'save_intelligence_batch({batch_size})':<32}{count / batched:>10.0f}{single / batched:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Microbenchmark: per-message latency of ScamDetector.detect_scam
+
+Compares the single-scan term matcher against the previous implementation
+(one substring scan per keyword plus uncompiled regex searches).
+
+Run with: python -m benchmarks.bench_detector
+"""
+
+import re
+import timeit
+
+from app.models import DetectionResult, ScamType
+from app.services.detector import ScamDetector
+
+
+def legacy_detect_scam(message: str) -> DetectionResult:
+    """Previous ScamDetector.detect_scam, kept verbatim as the baseline"""
+    message_lower = message.lower()
+    scores = {scam_type: 0 for scam_type in ScamType}
+    
+    for scam_type, keywords in ScamDetector.SCAM_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in message_lower:
+                scores[scam_type] += 1
+    
+    if re.search(ScamDetector.URL_PATTERN, message):
+        scores['phishing'] += 2
+    
+    urgency_patterns = [
+        r'\b(urgent|immediate|hurry|quick|now|asap|today)\b',
+        r'(!!!|!!!)',
+        r'\b(act now|verify now|click now)\b'
+    ]
+    for pattern in urgency_patterns:
+        if re.search(pattern, message_lower):
+            scores['phishing'] += 1
+    
+    info_patterns = [
+        r'\b(password|otp|pin|cvv|ssn|account number|routing number)\b',
+        r'\b(confirm|verify|provide|send)\b.*\b(password|otp|pin|cvv)\b'
+    ]
+    for pattern in info_patterns:
+        if re.search(pattern, message_lower):
+            scores['phishing'] += 2
+    
+    max_score = max(scores.values())
+    if max_score == 0:
+        return DetectionResult(is_scam=False, confidence=0.0, scam_type=None,
+                               reason="No scam indicators detected")
+    
+    detected_type = max(scores, key=scores.get)
+    confidence = min(max_score / 10, 1.0)
+    is_scam = confidence >= 0.2
+    return DetectionResult(
+        is_scam=is_scam,
+        confidence=confidence,
+        scam_type=ScamType(detected_type) if is_scam else None,
+        reason=f"Detected {detected_type} scam with {scores[detected_type]} indicators"
+    )
+
+
+SAMPLES = {
+    'short_benign': "Hi, how are you doing today?",
+    'short_scam': "URGENT: your account locked. Click here https://verify-bank.co/x and send OTP now!!!",
+    'long_forward': (
+        "Forwarded as received. Good morning everyone, please read carefully and share with family. "
+        "The state electricity board has announced that consumers who have not paid the pending bill "
+        "will face disconnection tonight at 9:30 pm. Please contact the officer on 9876543210 immediately "
+        "to avoid inconvenience. Pay the pending amount via UPI to billdesk.help@ybl and send screenshot. "
+        "This is the official notice from the department, many people in our colony already got the "
+        "message and paid. Stay safe, God bless, have a great day and remember to drink water. "
+    ) * 3,
+    'long_benign': (
+        "Hi grandma, hope you are doing well, we are coming over this weekend with the kids "
+        "and the dog, see you soon. "
+    ) * 20,
+    'dense_scam': (
+        "Dear customer your account locked due to unusual activity. Click here https://x.co/abc "
+        "to verify now!!! Send OTP today. "
+    ) * 10,
+}
+
+
+def bench(func, message: str, number: int) -> float:
+    """Mean latency in microseconds"""
+    return timeit.timeit(lambda: func(message), number=number) / number * 1e6
+
+
+def main(number: int = 2000):
+    print(f"{'sample':<14}{'chars':>7}{'legacy us':>12}{'current us':>12}{'speedup':>9}")
+    for name, message in SAMPLES.items():
+        assert legacy_detect_scam(message) == ScamDetector.detect_scam(message), name
+        legacy = bench(legacy_detect_scam, message, number)
+        current = bench(ScamDetector.detect_scam, message, number)
+        print(f"{name:<14}{len(message):>7}{legacy:>12.1f}{current:>12.1f}{legacy / current:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
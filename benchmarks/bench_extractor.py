@@ -0,0 +1,68 @@
+"""
+Microbenchmark: per-message latency of IntelligenceExtractor.extract_intelligence
+
+Compares the precompiled extraction engine against the previous
+implementation (re.findall / re.search with raw pattern strings).
+
+Run with: python -m benchmarks.bench_extractor
+"""
+
+import re
+import timeit
+
+from app.models import ExtractedIntelligence
+from app.services.extractor import IntelligenceExtractor
+
+
+def legacy_extract_intelligence(text: str) -> ExtractedIntelligence:
+    """Previous extraction loop, run over the current pattern table"""
+    intelligence = ExtractedIntelligence()
+    for category, patterns in IntelligenceExtractor.PATTERNS.items():
+        matches = set()
+        for pattern in patterns:
+            matches.update(re.findall(pattern, text, re.IGNORECASE))
+        setattr(intelligence, category, list(matches))
+    intelligence.suspicious_patterns = [
+        pattern for pattern in IntelligenceExtractor.SUSPICIOUS_PATTERNS
+        if re.search(pattern, text, re.IGNORECASE)
+    ]
+    return intelligence
+
+
+SAMPLES = {
+    'short_benign': "Hi, how are you doing today?",
+    'indicators': (
+        "Call +91 98765 43210 or mail fraud.desk@gmail.com, pay to user@okhdfcbank "
+        "or acct 123456789012345. Visit https://bit.ly/x or www.abc.com"
+    ),
+    'long_forward': (
+        "Forwarded as received. Good morning everyone, please read carefully and share with family. "
+        "Please contact the officer on 9876543210 immediately. Pay via UPI to billdesk.help@ybl "
+        "and send screenshot. "
+    ) * 5,
+    'long_benign': "Hi grandma, hope you are doing well, we are coming over this weekend. " * 30,
+}
+
+
+def normalized(intelligence: ExtractedIntelligence) -> dict:
+    """Compare results as sets; ordering within a category is not significant"""
+    return {key: set(values) for key, values in intelligence.model_dump().items()}
+
+
+def bench(func, message: str, number: int) -> float:
+    """Mean latency in microseconds"""
+    return timeit.timeit(lambda: func(message), number=number) / number * 1e6
+
+
+def main(number: int = 1000):
+    print(f"{'sample':<14}{'chars':>7}{'legacy us':>12}{'current us':>12}{'speedup':>9}")
+    for name, message in SAMPLES.items():
+        assert normalized(legacy_extract_intelligence(message)) == \
+            normalized(IntelligenceExtractor.extract_intelligence(message)), name
+        legacy = bench(legacy_extract_intelligence, message, number)
+        current = bench(IntelligenceExtractor.extract_intelligence, message, number)
+        print(f"{name:<14}{len(message):>7}{legacy:>12.1f}{current:>12.1f}{legacy / current:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
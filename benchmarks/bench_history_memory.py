@@ -0,0 +1,67 @@
+"""
+Memory benchmark: conversation history representation
+
+Builds the same set of conversations with the previous list of
+{"role", "content"} dicts and with MessageHistory, and compares the
+memory allocated for them (tracemalloc). Message contents are shared
+between both runs, so the difference is the per-message overhead.
+
+Run with: python -m benchmarks.bench_history_memory
+"""
+
+import tracemalloc
+from typing import Callable, List
+
+from app.models import ConversationState, MessageHistory
+
+
+CONTENTS = [
+    "URGENT your bank account is locked, verify your details now",
+    "I'll verify my details right away. Which information do you need?",
+    "share your upi id for refund of the failed transfer",
+    "How much money do I need to send?",
+]
+
+
+def legacy_history(length: int) -> List[dict]:
+    messages = []
+    for i in range(length):
+        role = "scammer" if i % 2 == 0 else "honeypot"
+        messages.append({"role": role, "content": CONTENTS[i % len(CONTENTS)]})
+    return messages
+
+
+def compact_history(length: int) -> MessageHistory:
+    messages = MessageHistory()
+    for i in range(length):
+        role = "scammer" if i % 2 == 0 else "honeypot"
+        messages.add(role, CONTENTS[i % len(CONTENTS)])
+    return messages
+
+
+def measure(build: Callable[[int], object], conversations: int, length: int) -> int:
+    """Bytes allocated to hold `conversations` histories of `length` messages"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    histories = [build(length) for _ in range(conversations)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del histories
+    return allocated
+
+
+def main(conversations: int = 10000):
+    state = ConversationState(conversation_id="check", messages=legacy_history(6))
+    assert state.model_dump()["messages"] == legacy_history(6)
+    assert compact_history(6) == legacy_history(6)
+    
+    print(f"{'messages/conv':<15}{'legacy B/msg':>14}{'compact B/msg':>15}{'saving':>9}")
+    for length in (2, 10, 20):
+        total = conversations * length
+        legacy = measure(legacy_history, conversations, length)
+        compact = measure(compact_history, conversations, length)
+        print(f"{length:<15}{legacy / total:>14.1f}{compact / total:>15.1f}{1 - compact / legacy:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: message throughput of /analyze versus /ingest/stream
+
+Serves the app with uvicorn on a local port and pushes the same messages
+through one POST /analyze per message (over a pooled connection, with
+a few requests in flight) and through a single NDJSON /ingest/stream
+request. The database writer is pointed at a throwaway SQLite file.
+
+Run with: python -m benchmarks.bench_ingest
+"""
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+MESSAGES = [
+    "URGENT: your bank account is blocked. Verify your KYC now and send the OTP",
+    "Transfer the refund fee to refund{n}@ybl immediately or the account is closed",
+    "Click https://secure-verify-{n}.com to update your details",
+    "See you at lunch tomorrow",
+    "Congratulations! You won a lottery prize, call +91 98765{n:05d} to claim",
+]
+
+
+def messages(count: int):
+    return [{"message": MESSAGES[i % len(MESSAGES)].format(n=i), "sender_id": f"tap-{i}"} for i in range(count)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def per_request(base_url: str, records, concurrency: int = 8) -> float:
+    import aiohttp
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession() as session:
+        async def post(record):
+            async with semaphore:
+                async with session.post(f"{base_url}/analyze", json=record) as resp:
+                    await resp.read()
+        start = time.perf_counter()
+        await asyncio.gather(*(post(record) for record in records))
+        return time.perf_counter() - start
+
+
+async def streamed(base_url: str, records) -> float:
+    import aiohttp
+    
+    async def body():
+        for record in records:
+            yield (json.dumps(record) + "\n").encode("utf-8")
+    
+    async with aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        async with session.post(f"{base_url}/ingest/stream", data=body()) as resp:
+            lines = 0
+            async for _ in resp.content:
+                lines += 1
+        assert lines == len(records), lines
+        return time.perf_counter() - start
+
+
+def main(count: int = 5000):
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(directory) / 'bench.db'}"
+        import uvicorn
+        from app.main import app
+        
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        
+        base_url = f"http://127.0.0.1:{port}"
+        records = messages(count)
+        try:
+            analyze = asyncio.run(per_request(base_url, records))
+            stream = asyncio.run(streamed(base_url, records))
+        finally:
+            server.should_exit = True
+            thread.join()
+    
+    print(f"{'path':<22}{'messages':>10}{'seconds':>10}{'msgs/s':>10}")
+    print(f"{'POST /analyze':<22}{count:>10}{analyze:>10.2f}{count / analyze:>10.0f}")
+    print(f"{'POST /ingest/stream':<22}{count:>10}{stream:>10.2f}{count / stream:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
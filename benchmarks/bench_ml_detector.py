@@ -0,0 +1,71 @@
+"""
+Microbenchmark: per-message ML inference time
+
+Compares one MLScamDetector.score call (single TF-IDF transform and
+predict_proba) against the previous calls needed for the same output:
+predict + predict_proba, predict_proba again for all classes, and a
+third transform for the top features.
+
+Run with: python -m benchmarks.bench_ml_detector
+"""
+
+import timeit
+from typing import Any, Dict
+
+import numpy as np
+
+from app.services.ml_detector import ml_detector
+
+
+def legacy_score(message: str) -> Dict[str, Any]:
+    """Label, confidence, distribution and top features the previous way"""
+    pipeline = ml_detector.pipeline
+    prediction = pipeline.predict([message])[0]
+    confidence = float(np.max(pipeline.predict_proba([message])[0]))
+    probabilities = {
+        str(scam_type): float(prob)
+        for scam_type, prob in zip(pipeline.classes_, pipeline.predict_proba([message])[0])
+    }
+    
+    tfidf_matrix = ml_detector.vectorizer.transform([message])
+    feature_names = ml_detector.vectorizer.get_feature_names_out()
+    features = {
+        feature_names[idx]: float(score)
+        for idx, score in zip(tfidf_matrix.nonzero()[1], tfidf_matrix.data)
+    }
+    top_features = dict(sorted(features.items(), key=lambda x: x[1], reverse=True)[:10])
+    
+    return {
+        'scam_type': str(prediction),
+        'confidence': confidence,
+        'probabilities': probabilities,
+        'top_features': top_features,
+    }
+
+
+MESSAGES = [
+    "URGENT your bank account is locked, verify your details now",
+    "share your upi id for refund of the failed transfer",
+    "double your money in 30 days with guaranteed returns",
+    "i miss you so much, please send money for my ticket",
+    "click this link to secure your account before it is closed",
+] * 20
+
+
+def main(number: int = 20):
+    for message in MESSAGES[:5]:
+        assert legacy_score(message) == ml_detector.score(message), message
+    
+    legacy = timeit.timeit(lambda: [legacy_score(m) for m in MESSAGES], number=number)
+    single = timeit.timeit(lambda: [ml_detector.score(m) for m in MESSAGES], number=number)
+    batch = timeit.timeit(lambda: ml_detector.score_batch(MESSAGES), number=number)
+    
+    per_message = number * len(MESSAGES) / 1e6
+    print(f"{'mode':<28}{'us/message':>12}{'speedup':>9}")
+    print(f"{'legacy (3 transforms)':<28}{legacy / per_message:>12.1f}{1:>8.2f}x")
+    print(f"{'score()':<28}{single / per_message:>12.1f}{legacy / single:>8.2f}x")
+    print(f"{'score_batch(100)':<28}{batch / per_message:>12.1f}{legacy / batch:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
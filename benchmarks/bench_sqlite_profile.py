@@ -0,0 +1,76 @@
+"""
+Benchmark: SQLite storage profile under concurrent writers
+
+Runs writer threads committing small intelligence batches while a reader
+thread repeatedly runs an analytics-style aggregate, once with SQLite's
+defaults (rollback journal, synchronous=FULL) and once with the tuned
+SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap, cache, busy_timeout).
+Each profile gets a fresh database file.
+
+Run with: python -m benchmarks.bench_sqlite_profile
+"""
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, IntelligenceRecord, SQLITE_PRAGMAS, create_db_engine, save_intelligence_batch
+
+
+def run_profile(pragmas: dict, writers: int, batches: int, batch_size: int, seconds_budget: float = 60.0):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_db_engine(f"sqlite:///{Path(directory) / 'bench.db'}", sqlite_pragmas=pragmas)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        done = threading.Event()
+        reads = [0]
+        
+        def write(worker: int):
+            for batch in range(batches):
+                rows = [
+                    {"conversation_id": f"w{worker}-{batch}", "intelligence_type": "upi_id", "value": f"w{worker}-{batch}-{i}@ybl"}
+                    for i in range(batch_size)
+                ]
+                save_intelligence_batch(rows, db=Session())
+        
+        def read():
+            deadline = time.perf_counter() + seconds_budget
+            while not done.is_set() and time.perf_counter() < deadline:
+                with Session() as db:
+                    db.query(IntelligenceRecord.intelligence_type, func.count()).group_by(
+                        IntelligenceRecord.intelligence_type
+                    ).all()
+                reads[0] += 1
+        
+        reader = threading.Thread(target=read)
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(writers)]
+        start = time.perf_counter()
+        reader.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        reader.join()
+        
+        with Session() as db:
+            assert db.query(IntelligenceRecord).count() == writers * batches * batch_size
+        engine.dispose()
+    return writers * batches * batch_size / elapsed, writers * batches / elapsed, reads[0] / elapsed
+
+
+def main(writers: int = 4, batches: int = 100, batch_size: int = 20):
+    print(f"{writers} writer threads x {batches} commits of {batch_size} rows, 1 reader thread")
+    print(f"{'profile':<24}{'rows/s':>10}{'commits/s':>11}{'reads/s':>10}")
+    for name, pragmas in (("sqlite defaults", {}), ("tuned (WAL)", SQLITE_PRAGMAS)):
+        rows, commits, reads = run_profile(pragmas, writers, batches, batch_size)
+        print(f"{name:<24}{rows:>10.0f}{commits:>11.0f}{reads:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -46,6 +46,223 @@ class TestScamDetection:
         assert data["detected_scam"]["is_scam"] == False
 
 
+class TestKeywordMatcher:
+    """Test the single-scan keyword matcher"""
+    
+    def test_overlapping_phrases_counted(self):
+        """Both phrases count when they share words"""
+        scores = detector.score_message("please verify account number")
+        assert scores[ScamType.BANKING] == 2
+    
+    def test_word_boundaries(self):
+        """Signal words only count as whole words"""
+        assert detector.score_message("I know it snowed while shopping")[ScamType.PHISHING] == 0
+        assert detector.score_message("do it now")[ScamType.PHISHING] == 1
+    
+    def test_info_request_same_line(self):
+        """A request verb must precede the secret on the same line"""
+        assert detector.score_message("send your otp")[ScamType.PHISHING] == 4
+        assert detector.score_message("send it\nyour otp")[ScamType.PHISHING] == 2
+
+
+class TestCascadeDetection:
+    """Test the rule + ML cascade"""
+    
+    def test_clear_cases_skip_ml(self):
+        """Test benign and strong-scam messages are decided by the rules alone"""
+        from app.services.cascade_detector import CascadeDetector
+        
+        class NoML:
+            def score_batch(self, messages, top_features=10):
+                raise AssertionError("ML model should not be called")
+        
+        cascade = CascadeDetector(ml_model=NoML())
+        assert cascade.detect_scam("See you at lunch").is_scam == False
+        assert cascade.detect_scam("URGENT: verify account, send your otp now https://x.co").is_scam == True
+        assert cascade.get_stage_counts() == {"rules_benign": 1, "rules_scam": 1, "ml": 0}
+    
+    def test_ambiguous_messages_use_ml(self):
+        """Test messages inside the band are fused with the ML score in one call"""
+        from app.services.cascade_detector import CascadeDetector
+        
+        class FixedML:
+            calls = 0
+            
+            def score_batch(self, messages, top_features=10):
+                FixedML.calls += 1
+                probabilities = {"banking": 0.0, "upi": 0.0, "phishing": 1.0, "investment": 0.0, "romance": 0.0}
+                return [{"scam_type": "phishing", "confidence": 1.0, "probabilities": probabilities}] * len(messages)
+        
+        cascade = CascadeDetector(ml_model=FixedML(), ml_weight=0.5)
+        results = cascade.detect_batch(["Send money", "Click https://verify-bank.com", "Hello"])
+        
+        assert FixedML.calls == 1
+        assert results[0].confidence == pytest.approx(0.55)
+        assert results[0].scam_type == ScamType.PHISHING
+        assert results[1].is_scam == True
+        assert results[2].is_scam == False
+        assert cascade.get_stage_counts()["ml"] == 2
+    
+    def test_weak_negative_escalated_by_default(self):
+        """Test a one-indicator message the rules call benign is sent to ML and can be promoted"""
+        from app.services.cascade_detector import CascadeDetector
+        
+        class ConfidentML:
+            def score_batch(self, messages, top_features=10):
+                probabilities = {"banking": 0.0, "upi": 1.0, "phishing": 0.0, "investment": 0.0, "romance": 0.0}
+                return [{"scam_type": "upi", "confidence": 1.0, "probabilities": probabilities}] * len(messages)
+        
+        cascade = CascadeDetector(ml_model=ConfidentML())
+        result = cascade.detect_scam("Send money now")
+        assert cascade.get_stage_counts()["ml"] == 1
+        assert result.is_scam == True
+        assert result.scam_type == ScamType.UPI
+        assert result.reason.startswith("Detected upi scam")
+    
+    def test_ml_never_demotes_rule_scam(self):
+        """Test a message the rules call a scam stays one, in or out of the ML band"""
+        from app.services.cascade_detector import CascadeDetector
+        from app.services.detector import ScamDetector
+        
+        class FlatML:
+            def score_batch(self, messages, top_features=10):
+                probabilities = dict.fromkeys(["banking", "upi", "phishing", "investment", "romance"], 0.2)
+                return [{"scam_type": "banking", "confidence": 0.2, "probabilities": probabilities}] * len(messages)
+        
+        message = "Click https://verify-bank.com"
+        rule_result = ScamDetector.result_from_scores(ScamDetector.score_message(message))
+        assert rule_result.is_scam == True
+        
+        # A strong rule score is decided by the rules alone
+        strong = "Send your OTP now"
+        cascade = CascadeDetector(ml_model=FlatML())
+        assert cascade.detect_scam(strong) == ScamDetector.result_from_scores(ScamDetector.score_message(strong))
+        assert cascade.get_stage_counts()["ml"] == 0
+        
+        # A weak one goes to ML, which offers no evidence either way
+        fused = cascade.detect_scam(message)
+        assert cascade.get_stage_counts()["ml"] == 1
+        assert fused.is_scam == True
+        assert fused.confidence == pytest.approx(rule_result.confidence)
+        assert fused.scam_type == rule_result.scam_type
+    
+    def test_fused_reason_matches_verdict(self):
+        """Test a message ML leaves benign is not described as a detected scam"""
+        from app.services.cascade_detector import CascadeDetector
+        
+        class FlatML:
+            def score_batch(self, messages, top_features=10):
+                probabilities = dict.fromkeys(["banking", "upi", "phishing", "investment", "romance"], 0.2)
+                return [{"scam_type": "banking", "confidence": 0.2, "probabilities": probabilities}] * len(messages)
+        
+        result = CascadeDetector(ml_model=FlatML()).detect_scam("Send money now")
+        assert result.is_scam == False
+        assert result.reason.startswith("No scam detected")
+    
+    def test_stats_report_stages(self):
+        """Test /stats exposes the per-stage counters"""
+        client.post("/analyze", json={"message": "See you at lunch"})
+        stages = client.get("/stats").json()["detection_stages"]
+        assert stages["rules_benign"] >= 1
+
+
+class TestBatchAnalysis:
+    """Test batch analysis"""
+    
+    def test_analyze_batch(self):
+        """Test one result per message, in order"""
+        messages = [
+            ScamMessage(message="Verify your account now. Click here to confirm your password."),
+            ScamMessage(message="Hi, how are you doing today?"),
+            ScamMessage(message="Click https://verify-bank.com to update your details"),
+        ]
+        response = client.post("/analyze/batch", json=[m.model_dump() for m in messages])
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["detected_scam"]["is_scam"] for item in data] == [True, False, True]
+        assert len({item["conversation_id"] for item in data}) == 3
+    
+    def test_analyze_batch_isolates_errors(self, monkeypatch):
+        """Test a failing message does not fail the batch"""
+        original = detector.detect_scam
+        
+        def flaky_detect(message):
+            if message == "boom":
+                raise RuntimeError("bad message")
+            return original(message)
+        
+        monkeypatch.setattr(detector, "detect_batch", lambda texts: [flaky_detect(t) for t in texts])
+        monkeypatch.setattr(detector, "detect_scam", flaky_detect)
+        messages = [{"message": "boom"}, {"message": "Click https://verify-bank.com now"}]
+        response = client.post("/analyze/batch", json=messages)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data[0]["conversation_state"]["error"] == "bad message"
+        assert data[1]["detected_scam"]["is_scam"] == True
+    
+    def test_ml_predict_batch(self):
+        """Test batched ML predictions match single predictions"""
+        from app.services.ml_detector import ml_detector
+        messages = ["verify your bank details immediately", "double your money in 30 days"]
+        assert ml_detector.predict_batch(messages) == [ml_detector.predict_scam_type(m) for m in messages]
+
+
+class TestMLScoring:
+    """Test the single-pass ML scoring API"""
+    
+    def test_score_matches_individual_calls(self):
+        """Test one score call gives the label, distribution and features"""
+        from app.services.ml_detector import ml_detector
+        message = "verify your bank details immediately"
+        result = ml_detector.score(message)
+        
+        assert (result["scam_type"], result["confidence"]) == ml_detector.predict_scam_type(message)
+        assert result["probabilities"] == ml_detector.predict_all_probabilities(message)
+        assert result["top_features"] == ml_detector.get_feature_importance(message)
+        assert max(result["probabilities"].values()) == result["confidence"]
+    
+    def test_score_batch(self):
+        """Test batch scoring matches single scoring"""
+        from app.services.ml_detector import ml_detector
+        messages = ["share your upi id for refund", "double your money in 30 days"]
+        assert ml_detector.score_batch(messages) == [ml_detector.score(m) for m in messages]
+
+
+class TestMLModelArtifact:
+    """Test the persisted ML model artifact"""
+    
+    def test_artifact_round_trip(self, tmp_path, monkeypatch):
+        """Test a fresh artifact is exported and then loaded without training"""
+        from app.services.ml_detector import MLScamDetector
+        path = tmp_path / "model.joblib"
+        trained = MLScamDetector(model_path=str(path))
+        assert path.exists()
+        
+        def no_training(self):
+            raise AssertionError("model should be loaded, not trained")
+        
+        monkeypatch.setattr(MLScamDetector, "initialize_training_data", no_training)
+        loaded = MLScamDetector(model_path=str(path))
+        message = "verify your bank details immediately"
+        assert loaded.predict_scam_type(message) == trained.predict_scam_type(message)
+    
+    def test_stale_artifact_retrained(self, tmp_path, monkeypatch):
+        """Test an artifact with a different feature hash is replaced"""
+        import joblib
+        from app.services.ml_detector import MLScamDetector
+        path = tmp_path / "model.joblib"
+        MLScamDetector(model_path=str(path))
+        artifact = joblib.load(path)
+        artifact["feature_hash"] = "stale"
+        joblib.dump(artifact, path)
+        
+        detector = MLScamDetector(model_path=str(path))
+        assert detector.is_trained
+        assert joblib.load(path)["feature_hash"] == detector.feature_hash()
+
+
 class TestIntelligenceExtraction:
     """Test intelligence extraction"""
     
@@ -67,6 +284,22 @@ class TestIntelligenceExtraction:
         message = "Send money to user@okhdfcbank"
         upi_ids = detector.extract_upi_ids(message)
         assert len(upi_ids) > 0
+    
+    def test_extractor_indicators(self):
+        """Test extraction engine output per category"""
+        intel = extractor.extract_intelligence(
+            "Pay user@okhdfcbank, call 9876543210, card 1234 5678 9012 3456, visit https://bit.ly/abc"
+        )
+        assert intel.upi_ids == ["user@okhdfcbank"]
+        assert "9876543210" in intel.phone_numbers
+        assert "9876543210" in intel.bank_accounts
+        assert "1234 5678 9012 3456" in intel.bank_accounts
+        assert "https://bit.ly/abc" in intel.phishing_links
+    
+    def test_extractor_suspicious_patterns(self):
+        """Test suspicious pattern matching"""
+        intel = extractor.extract_intelligence("Please VERIFY your account urgently")
+        assert intel.suspicious_patterns == [extractor.SUSPICIOUS_PATTERNS[0]]
 
 
 class TestConversationFlow:
@@ -96,6 +329,1180 @@ class TestConversationFlow:
         assert response2.status_code == 200
         data = response2.json()
         assert data["conversation_id"] == conversation_id
+    
+    def test_intelligence_accumulates(self):
+        """Test intelligence from earlier turns is kept and merged"""
+        message1 = ScamMessage(message="Urgent! Send money to helpdesk@ybl now")
+        response1 = client.post("/analyze", json=message1.model_dump())
+        conversation_id = response1.json()["conversation_id"]
+        
+        message2 = ScamMessage(message="Or call 9876543210, pay to helpdesk@ybl")
+        response2 = client.post(f"/conversation/{conversation_id}", json=message2.model_dump())
+        intel = response2.json()["extracted_intelligence"]
+        assert intel["upi_ids"] == ["helpdesk@ybl"]
+        assert intel["phone_numbers"] == ["9876543210"]
+        
+        stored = client.get(f"/conversation/{conversation_id}").json()["extracted_intelligence"]
+        assert stored["upi_ids"] == ["helpdesk@ybl"]
+        assert stored["phone_numbers"] == ["9876543210"]
+    
+    def test_only_new_scam_intelligence_recorded(self, monkeypatch):
+        """Test each turn of a scam conversation records just its new indicators"""
+        from app import main
+        recorded = []
+        monkeypatch.setattr(main.db_writer, "queue_intelligence",
+                            lambda conversation_id, intelligence: recorded.append(intelligence))
+        
+        response = client.post("/analyze", json={"message": "URGENT: verify account, send your otp to helpdesk@ybl"})
+        conversation_id = response.json()["conversation_id"]
+        client.post(f"/conversation/{conversation_id}", json={"message": "hello ok"})
+        client.post(f"/conversation/{conversation_id}", json={"message": "URGENT: send your otp to helpdesk@ybl or call 9876543210"})
+        
+        assert [(i.upi_ids, i.phone_numbers) for i in recorded] == [(["helpdesk@ybl"], []), ([], ["9876543210"])]
+    
+    def test_indicator_from_harmless_looking_turn_recorded(self, monkeypatch):
+        """Test an indicator sent in a non-scam follow-up of a scam conversation is recorded once"""
+        from app import main
+        recorded = []
+        monkeypatch.setattr(main.db_writer, "queue_intelligence",
+                            lambda conversation_id, intelligence: recorded.append(intelligence))
+        
+        response = client.post("/analyze", json={"message": "URGENT: verify account, send your otp now"})
+        conversation_id = response.json()["conversation_id"]
+        follow_up = client.post(f"/conversation/{conversation_id}", json={"message": "ok, you can call me on 9123456780"})
+        client.post(f"/conversation/{conversation_id}", json={"message": "hello ok"})
+        
+        assert follow_up.json()["detected_scam"]["is_scam"] is False
+        assert [i.phone_numbers for i in recorded if i.phone_numbers] == [["9123456780"]]
+        assert main.indicator_index.get("phone_number", "9123456780") is not None
+
+
+class TestConversationStore:
+    """Test the bounded conversation store"""
+    
+    def test_lru_eviction_persists(self):
+        """Test the least recently used conversation is persisted and dropped"""
+        from app.agents.conversation_store import ConversationStore
+        from app.models import ConversationState
+        persisted = []
+        store = ConversationStore(max_size=2, ttl=60, on_evict=persisted.append)
+        
+        for conversation_id in ("a", "b"):
+            store[conversation_id] = ConversationState(conversation_id=conversation_id)
+        store.get("a")
+        store["c"] = ConversationState(conversation_id="c")
+        
+        assert [state.conversation_id for state in persisted] == ["b"]
+        assert "a" in store and "c" in store and len(store) == 2
+    
+    def test_idle_conversations_expire(self):
+        """Test conversations idle past the TTL are evicted"""
+        from app.agents.conversation_store import ConversationStore
+        from app.models import ConversationState
+        now = [0.0]
+        persisted = []
+        store = ConversationStore(max_size=10, ttl=30, on_evict=persisted.append, clock=lambda: now[0])
+        
+        store["old"] = ConversationState(conversation_id="old")
+        now[0] = 20.0
+        store["new"] = ConversationState(conversation_id="new")
+        now[0] = 40.0
+        
+        assert store.get("old") is None
+        assert store.get("new") is not None
+        assert store.evictions["expired"] == 1
+    
+    def test_max_conversation_length(self, monkeypatch):
+        """Test a conversation is closed once it reaches the maximum length"""
+        import asyncio
+        from app.agents.conversation_store import ConversationStore
+        from app.agents.engagement_agent import EngagementAgent
+        from app.config import Config
+        monkeypatch.setattr(Config, "MAX_CONVERSATION_LENGTH", 4)
+        persisted = []
+        agent = EngagementAgent(ConversationStore(on_evict=persisted.append))
+        
+        asyncio.run(agent.engage_with_scammer("conv", "send money", ScamType.UPI))
+        assert agent.get_conversation_state("conv") is not None
+        asyncio.run(agent.engage_with_scammer("conv", "send money now", ScamType.UPI))
+        
+        assert agent.get_conversation_state("conv") is None
+        assert persisted[0].is_active == False
+        assert len(persisted[0].messages) == 4
+
+
+class TestMessageHistory:
+    """Test the compact conversation history"""
+    
+    def test_compact_history_keeps_json_shape(self):
+        """Test the compact history validates from and dumps to a list of dicts"""
+        from app.models import ConversationState
+        messages = [{"role": "scammer", "content": "hi"}, {"role": "honeypot", "content": "hello"}]
+        state = ConversationState(conversation_id="compact", messages=messages)
+        
+        assert state.model_dump()["messages"] == messages
+        assert state.messages[-1:] == messages[-1:]
+        assert list(state.messages) == messages
+
+
+class TestSharedStateBackends:
+    """Test conversation state shared between workers"""
+    
+    @pytest.fixture(params=["sql", "file"])
+    def backend_factory(self, request, tmp_path):
+        """Builds backend instances that share one store, like separate workers would"""
+        from app.agents.state_backends import FileStateBackend, SQLStateBackend
+        if request.param == "file":
+            return lambda: FileStateBackend(str(tmp_path / "state"))
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        engine = create_engine(f"sqlite:///{tmp_path / 'state.db'}")
+        Base.metadata.create_all(bind=engine)
+        return lambda: SQLStateBackend(sessionmaker(bind=engine))
+    
+    def test_workers_see_each_others_updates(self, backend_factory):
+        """Test a follow-up on another worker sees the latest state"""
+        from app.agents.conversation_store import ConversationStore
+        from app.models import ConversationState
+        worker_a = ConversationStore(on_evict=None, backend=backend_factory())
+        worker_b = ConversationStore(on_evict=None, backend=backend_factory())
+        
+        state = ConversationState(conversation_id="shared")
+        state.messages.add("scammer", "send money")
+        worker_a["shared"] = state
+        
+        state_b = worker_b.get("shared")
+        assert list(state_b.messages) == [{"role": "scammer", "content": "send money"}]
+        state_b.messages.add("honeypot", "how much?")
+        worker_b.save("shared")
+        
+        assert len(worker_a.get("shared").messages) == 2
+        assert len(worker_a) == 1
+    
+    def test_termination_is_shared(self, backend_factory):
+        """Test a conversation closed on one worker is gone on the others"""
+        from app.agents.conversation_store import ConversationStore
+        from app.models import ConversationState
+        persisted = []
+        worker_a = ConversationStore(on_evict=persisted.append, backend=backend_factory())
+        worker_b = ConversationStore(on_evict=persisted.append, backend=backend_factory())
+        
+        worker_a["shared"] = ConversationState(conversation_id="shared")
+        assert worker_b.get("shared") is not None
+        assert worker_b.evict("shared") is not None
+        
+        assert worker_a.get("shared") is None
+        assert [state.conversation_id for state in persisted] == ["shared"]
+    
+    def test_stale_save_reloads_instead_of_overwriting(self, backend_factory):
+        """Test a worker saving an outdated copy keeps the other worker's update"""
+        from app.agents.conversation_store import ConversationStore
+        from app.agents.state_backends import StateConflict
+        from app.models import ConversationState
+        backend = backend_factory()
+        worker_a = ConversationStore(on_evict=None, backend=backend)
+        worker_b = ConversationStore(on_evict=None, backend=backend_factory())
+        
+        worker_a["shared"] = ConversationState(conversation_id="shared")
+        first_version = backend.version("shared")
+        worker_b.get("shared").messages.add("scammer", "from b")
+        worker_a.get("shared").messages.add("scammer", "from a")
+        assert worker_a.save("shared") == True
+        assert worker_b.save("shared") == False
+        
+        assert list(worker_b.get("shared").messages) == [{"role": "scammer", "content": "from a"}]
+        with pytest.raises(StateConflict):
+            backend.save(ConversationState(conversation_id="shared"), first_version)
+    
+    def test_concurrent_conditional_saves_one_wins(self, backend_factory):
+        """Test only one of several workers saving over the same version succeeds"""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.agents.state_backends import StateConflict
+        from app.models import ConversationState
+        backends = [backend_factory() for _ in range(8)]
+        version = backends[0].save(ConversationState(conversation_id="shared"))
+        
+        def save(backend):
+            try:
+                backend.save(ConversationState(conversation_id="shared"), version)
+                return True
+            except StateConflict:
+                return False
+        
+        with ThreadPoolExecutor(len(backends)) as pool:
+            assert sum(pool.map(save, backends)) == 1
+    
+    def test_agent_keeps_backend_calls_off_the_loop(self, backend_factory):
+        """Test a conversation turn reaches the shared backend only from worker threads"""
+        import asyncio
+        import threading
+        from app.agents.conversation_store import ConversationStore
+        from app.agents.engagement_agent import EngagementAgent
+        backend = backend_factory()
+        callers = []
+        
+        class Recording:
+            def __getattr__(self, name):
+                method = getattr(backend, name)
+                
+                def call(*args):
+                    callers.append(threading.current_thread() is threading.main_thread())
+                    return method(*args)
+                return call
+            
+            def __len__(self):
+                raise AssertionError("backend count queried")
+        
+        agent = EngagementAgent(ConversationStore(on_evict=None, backend=Recording(), sweep_interval=0))
+        
+        async def scenario():
+            await agent.engage_with_scammer("conv", "send money", ScamType.UPI)
+            await agent.engage_with_scammer("conv", "send money now", ScamType.UPI)
+            return await agent.get_conversation_state_async("conv"), len(agent.conversation_states)
+        
+        state, active = asyncio.run(scenario())
+        assert len(state.messages) == 4
+        assert active == 1
+        assert callers and not any(callers)
+
+
+class TestMockScammerClient:
+    """Test the pooled mock scammer API client"""
+    
+    def test_calls_reuse_pooled_connection(self):
+        """Test consecutive calls share one keep-alive connection"""
+        import asyncio
+        from aiohttp import web
+        from app.services.mock_scammer_api import MockScammerAPI
+        
+        async def scenario():
+            peers = set()
+            
+            async def send(request):
+                peers.add(request.transport.get_extra_info("peername"))
+                payload = await request.json()
+                return web.json_response({"conversation_id": payload["conversation_id"], "reply": "pay now"})
+            
+            server_app = web.Application()
+            server_app.router.add_post("/scam/send", send)
+            runner = web.AppRunner(server_app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            try:
+                async with MockScammerAPI(base_url=f"http://127.0.0.1:{port}") as api:
+                    replies = [await api.send_message("c1", f"turn {i}") for i in range(5)]
+                    missing = await api.get_conversation("c1")
+            finally:
+                await runner.cleanup()
+            return replies, missing, peers
+        
+        replies, missing, peers = asyncio.run(scenario())
+        assert all(reply["reply"] == "pay now" for reply in replies)
+        assert missing == {"error": "API returned status 404", "conversation_id": "c1"}
+        assert len(peers) == 1
+    
+    def test_unreachable_service_returns_error(self):
+        """Test connection failures are reported, not raised"""
+        import asyncio
+        from app.services.mock_scammer_api import MockScammerAPI
+        
+        async def scenario():
+            api = MockScammerAPI(base_url="http://127.0.0.1:9", timeout=2)
+            try:
+                return await api.create_conversation("hello")
+            finally:
+                await api.close()
+        
+        assert "error" in asyncio.run(scenario())
+
+
+class TestSimulation:
+    """Test the concurrent simulation runner"""
+    
+    def test_simulation_retries_and_reports(self):
+        """Test conversations complete despite failing turns, with stats reported"""
+        import asyncio
+        from app.services.mock_scammer_api import MockScammerAPI
+        from app.services.mock_scammer_server import start_server
+        from app.services.simulation import SimulationRunner
+        
+        async def scenario():
+            server, base_url = await start_server(fail_every=2)
+            try:
+                async with MockScammerAPI(base_url=base_url) as api:
+                    runner = SimulationRunner(api, concurrency=5, turns=3, backoff=0.001)
+                    return await runner.run(10)
+            finally:
+                await server.cleanup()
+        
+        report = asyncio.run(scenario())
+        assert report["completed"] == 10
+        assert report["turns"] == 30
+        # Every conversation's 2nd and 4th sends fail once and are retried
+        assert report["retries"] == 20
+        assert report["failed"] == 0
+        assert sum(report["turn_latency_ms"]["buckets"].values()) == 30
+        assert report["turns_per_second"] > 0
+
+
+class TestDatabaseWriter:
+    """Test the write-behind database writer"""
+    
+    @pytest.fixture
+    def session_factory(self, tmp_path):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+        Base.metadata.create_all(bind=engine)
+        return sessionmaker(bind=engine)
+    
+    def test_batches_flush_on_size_and_drain_on_stop(self, session_factory):
+        """Test queued rows are written in bulk, duplicates skipped, and drained on stop"""
+        import asyncio
+        from app.database import ConversationRecord, IntelligenceRecord
+        from app.models import ConversationState, ExtractedIntelligence
+        from app.services.db_writer import DatabaseWriter
+        
+        async def scenario():
+            writer = DatabaseWriter(batch_size=3, flush_interval=60, session_factory=session_factory)
+            await writer.start()
+            writer.queue_intelligence("c1", ExtractedIntelligence(upi_ids=["a@ybl", "b@ybl"], phone_numbers=["9876543210"]))
+            await asyncio.sleep(0.2)  # size threshold reached: flushed without waiting for the interval
+            flushed_early = writer.stats["intelligence_written"]
+            writer.queue_intelligence("c2", ExtractedIntelligence(upi_ids=["a@ybl"]))
+            writer.queue_conversation(ConversationState(conversation_id="c1"))
+            writer.queue_conversation(ConversationState(conversation_id="c1", engagement_level=30))
+            await writer.stop()
+            return flushed_early, writer.pending
+        
+        flushed_early, pending = asyncio.run(scenario())
+        assert flushed_early == 3
+        assert pending == 0
+        with session_factory() as db:
+            assert db.query(IntelligenceRecord).count() == 3
+            assert db.query(IntelligenceRecord).filter_by(value="a@ybl").one().conversation_id == "c1"
+            assert db.query(ConversationRecord).one().engagement_level == 30
+
+
+class TestStorageProfile:
+    """Test the database engine tuning"""
+    
+    def test_sqlite_storage_profile(self, tmp_path):
+        """Test new SQLite connections get the tuned pragmas"""
+        from app.database import create_db_engine
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+            assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        engine.dispose()
+
+
+class TestIndicatorLinks:
+    """Test the indicator link table, its migration and pivot queries"""
+    
+    def test_migration_backfills_links_and_pivots(self, tmp_path):
+        """Test legacy rows are backfilled idempotently and pivot lookups use the indexes"""
+        from datetime import datetime
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import (
+            ConversationRecord, IndicatorLinkRecord, IntelligenceRecord, ScamPatternRecord,
+            find_conversations_by_indicator, get_conversation_indicators, migrate_schema
+        )
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        # A database from before the link table existed
+        for table in (ConversationRecord, IntelligenceRecord, ScamPatternRecord):
+            table.__table__.create(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.add_all([
+                ConversationRecord(conversation_id="c1", upi_ids=["a@ybl"], phone_numbers=["9876543210"],
+                                   created_at=datetime(2026, 1, 1)),
+                ConversationRecord(conversation_id="c2", upi_ids=["a@ybl"], created_at=datetime(2026, 1, 2)),
+                IntelligenceRecord(conversation_id="c1", intelligence_type="upi_id", value="a@ybl",
+                                   found_at=datetime(2026, 1, 1)),
+            ])
+            db.commit()
+        
+        migrate_schema(engine, chunk_size=1)
+        migrate_schema(engine, chunk_size=1)
+        
+        with Session() as db:
+            assert db.query(IndicatorLinkRecord).count() == 3
+        assert [row[0] for row in find_conversations_by_indicator("a@ybl", db=Session())] == ["c2", "c1"]
+        assert find_conversations_by_indicator("a@ybl", "phone_number", db=Session()) == []
+        assert sorted(row[:2] for row in get_conversation_indicators("c1", db=Session())) == [
+            ("phone_number", "9876543210"), ("upi_id", "a@ybl")
+        ]
+        
+        with engine.connect() as connection:
+            plan = " ".join(str(row[-1]) for row in connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT conversation_id FROM indicator_links "
+                "WHERE intelligence_type = 'upi_id' AND value = 'a@ybl'"
+            ))
+        assert "INDEX" in plan and "intelligence_type=? AND value=?" in plan
+        engine.dispose()
+    
+    def test_batch_writes_link_every_conversation(self, tmp_path):
+        """Test an indicator already known is still linked to each new conversation"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base, IndicatorLinkRecord, IntelligenceRecord, save_intelligence_batch
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'links.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        row = {"intelligence_type": "upi_id", "value": "a@ybl"}
+        save_intelligence_batch([{**row, "conversation_id": "c1"}, {**row, "conversation_id": "c2"}], Session())
+        save_intelligence_batch([{**row, "conversation_id": "c2"}], Session())
+        
+        with Session() as db:
+            assert db.query(IntelligenceRecord).count() == 1
+            assert sorted(link.conversation_id for link in db.query(IndicatorLinkRecord)) == ["c1", "c2"]
+        engine.dispose()
+
+
+class TestIndicatorIndex:
+    """Test the in-memory known indicator index"""
+    
+    def test_known_indicator_boosts_confidence(self):
+        """Test indicators from other conversations boost detection, the conversation's own do not"""
+        from app.models import DetectionResult, ExtractedIntelligence, ScamType
+        from app.services.indicator_index import IndicatorIndex
+        
+        index = IndicatorIndex(boost=0.3)
+        intelligence = ExtractedIntelligence(upi_ids=["scam@ybl"])
+        benign = DetectionResult(is_scam=False, confidence=0.0, scam_type=None, reason="No scam indicators")
+        assert index.apply(benign, intelligence) is benign
+        
+        index.observe("c1", intelligence)
+        index.observe("c1", intelligence)
+        assert index.get("upi_id", "scam@ybl").conversations == 1
+        assert index.apply(benign, intelligence, "c1") is benign
+        
+        boosted = index.apply(benign, intelligence, "c2")
+        assert boosted.is_scam
+        assert boosted.confidence == pytest.approx(0.3)
+        assert boosted.scam_type == ScamType.UPI
+        assert "known indicator" in boosted.reason
+    
+    def test_warm_load_from_database(self, tmp_path):
+        """Test the index is rebuilt from stored intelligence"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base, save_intelligence_batch
+        from app.models import ExtractedIntelligence
+        from app.services.indicator_index import IndicatorIndex
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        row = {"intelligence_type": "phone_number", "value": "9876543210"}
+        save_intelligence_batch([{**row, "conversation_id": "c1"}, {**row, "conversation_id": "c2"}], Session())
+        
+        index = IndicatorIndex()
+        assert index.load(Session) == 1
+        stats = index.get("phone_number", "9876543210")
+        assert stats.conversations == 2
+        assert stats.first_seen <= stats.last_seen
+        
+        # A loaded conversation re-reporting its indicator is neither counted again nor "elsewhere"
+        index.observe("c2", ExtractedIntelligence(phone_numbers=["9876543210"]))
+        assert stats.conversations == 2
+        assert stats.seen_elsewhere("c2") == 1
+        engine.dispose()
+    
+    def test_warm_load_keeps_most_recent(self, tmp_path):
+        """Test a bounded load keeps the most recently seen indicators"""
+        from datetime import datetime
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base, save_intelligence_batch
+        from app.services.indicator_index import IndicatorIndex
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        rows = [
+            ("old@ybl", "c1", datetime(2024, 1, 1)),
+            ("kept@ybl", "c1", datetime(2024, 1, 2)),
+            ("new@ybl", "c2", datetime(2024, 1, 3)),
+            ("old@ybl", "c3", datetime(2024, 1, 4)),
+            ("stale@ybl", "c2", datetime(2024, 1, 1)),
+        ]
+        save_intelligence_batch([
+            {"intelligence_type": "upi_id", "value": value, "conversation_id": conversation_id, "found_at": found_at}
+            for value, conversation_id, found_at in rows
+        ], Session())
+        
+        index = IndicatorIndex(max_entries=2)
+        assert index.load(Session) == 2
+        assert ("upi_id", "kept@ybl") not in index
+        assert ("upi_id", "stale@ybl") not in index
+        assert index.get("upi_id", "old@ybl").conversations == 2
+        assert list(index._entries) == [("upi_id", "new@ybl"), ("upi_id", "old@ybl")]
+        engine.dispose()
+        
+    def test_interleaved_conversations_counted_once(self):
+        """Test turns alternating between conversations do not inflate the count"""
+        from app.models import ExtractedIntelligence
+        from app.services.indicator_index import IndicatorIndex
+        
+        index = IndicatorIndex()
+        intelligence = ExtractedIntelligence(upi_ids=["scam@ybl"])
+        for conversation_id in ["a", "b", "a", "b", "a"]:
+            index.observe(conversation_id, intelligence)
+        
+        assert index.get("upi_id", "scam@ybl").conversations == 2
+        assert index.get("upi_id", "scam@ybl").seen_elsewhere("a") == 1
+    
+    def test_entries_are_bounded(self):
+        """Test the least recently seen indicators are evicted past max_entries"""
+        from app.models import ExtractedIntelligence
+        from app.services.indicator_index import IndicatorIndex
+        
+        index = IndicatorIndex(max_entries=2, max_conversation_ids=2)
+        index.observe("c1", ExtractedIntelligence(upi_ids=["old@ybl", "kept@ybl"]))
+        index.observe("c2", ExtractedIntelligence(upi_ids=["kept@ybl"]))
+        index.observe("c3", ExtractedIntelligence(upi_ids=["new@ybl", "kept@ybl"]))
+        
+        assert len(index) == 2
+        assert ("upi_id", "old@ybl") not in index
+        assert index.evictions == 1
+        stats = index.get("upi_id", "kept@ybl")
+        assert stats.conversations == 3
+        assert list(stats.conversation_ids) == ["c2", "c3"]
+
+
+class TestStreamIngestion:
+    """Test the NDJSON streaming ingestion endpoint"""
+    
+    def test_stream_results_in_order(self):
+        """Test records split across chunks are answered in order, bad lines with errors"""
+        import json
+        
+        def body():
+            yield b'{"message": "URGENT: your bank account is blocked. Verify your KYC now", "sender_id": "a"}\n{"mess'
+            yield b'age": "See you at lunch"}\nnot json\n\n{"message": "Pay at 9876543210"}'
+        
+        response = client.post("/ingest/stream", content=body())
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [result["index"] for result in results] == [0, 1, 2, 3]
+        assert results[0]["sender_id"] == "a"
+        assert results[0]["detected_scam"]["is_scam"] is True
+        assert results[1]["detected_scam"]["is_scam"] is False
+        assert "error" in results[2]
+        assert results[3]["extracted_intelligence"]["phone_numbers"] == ["9876543210"]
+    
+    def test_oversized_line_in_one_chunk_rejected(self):
+        """Test a too-long line is rejected even when it arrives whole, newline included"""
+        import asyncio
+        from app.services.stream_ingest import iter_ndjson_lines
+        
+        async def chunks():
+            yield b'{"message": "ok"}\n' + b"x" * 100 + b"\n"
+        
+        async def scenario():
+            return [line async for line in iter_ndjson_lines(chunks(), max_line_bytes=50)]
+        
+        with pytest.raises(ValueError):
+            asyncio.run(scenario())
+    
+    def test_in_flight_records_are_bounded(self):
+        """Test the body is not read further ahead than the in-flight limit"""
+        import asyncio
+        from app.services.stream_ingest import StreamIngestor
+        
+        produced = []
+        lead = []
+        
+        async def chunks():
+            for i in range(50):
+                produced.append(i)
+                yield b'{"message": "hello"}\n'
+        
+        async def process(messages):
+            await asyncio.sleep(0.001)
+            return [{} for _ in messages]
+        
+        async def scenario():
+            ingestor = StreamIngestor(process, max_in_flight=4, batch_size=2)
+            emitted = 0
+            async for _ in ingestor.run(chunks()):
+                emitted += 1
+                lead.append(len(produced) - emitted)
+            return emitted, ingestor.stats
+        
+        emitted, stats = asyncio.run(scenario())
+        assert emitted == 50
+        assert stats["processed"] == 50
+        # queue (4) + batch being processed (2) + one record waiting to be queued
+        assert max(lead) <= 4 + 2 + 1
+
+
+class TestOffload:
+    """Test offloading analysis from the event loop"""
+    
+    @pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+    def test_offload_modes_match_inline_results(self, mode):
+        """Test every mode returns the same analysis, with small inputs kept inline"""
+        import asyncio
+        from app.services import offload
+        from app.services.offload import Offloader
+        
+        message = "URGENT: your bank account is blocked. Send the fee to refund@ybl"
+        expected = offload.analyze_message(message)
+        
+        async def scenario():
+            offloader = Offloader(mode=mode, workers=1, inline_below=len(message))
+            try:
+                small = await offloader.run(offload.analyze_message, message[:10], size=10)
+                large = await offloader.run(offload.analyze_message, message, size=len(message))
+            finally:
+                offloader.shutdown()
+            return small, large, offloader.stats
+        
+        small, large, stats = asyncio.run(scenario())
+        assert large[:2] == expected[:2]
+        assert set(large[2]) == {"detection", "extraction"}
+        assert small[0].is_scam is False
+        assert stats == ({"inline": 2, "offloaded": 0} if mode == "inline" else {"inline": 1, "offloaded": 1})
+    
+    def test_loop_lag_monitor_sees_stall(self):
+        """Test a blocking call shows up as event-loop lag"""
+        import asyncio
+        import time
+        from app.services.offload import LoopLagMonitor
+        
+        async def scenario():
+            monitor = LoopLagMonitor(interval=0.01, warn_after=0.05)
+            monitor.start()
+            await asyncio.sleep(0.03)
+            time.sleep(0.1)  # holds the loop
+            await asyncio.sleep(0.03)
+            await monitor.stop()
+            return monitor.summary()
+        
+        summary = asyncio.run(scenario())
+        assert summary["stalls"] >= 1
+        assert summary["max_ms"] >= 50
+
+
+def _worker_log_handlers():
+    """Handler types of the honeypot logger in the calling process, and whether each writes to stderr"""
+    import logging
+    import sys
+    return [(type(handler), getattr(handler, "stream", None) is sys.stderr)
+            for handler in logging.getLogger("honeypot").handlers]
+
+
+class TestLogging:
+    """Test the queue-based logging pipeline"""
+    
+    def test_logger_only_enqueues(self):
+        """Test the honeypot logger hands records to a queue drained by rotating handlers"""
+        import logging.handlers
+        from app.logger import logger, _listeners
+        
+        assert [type(handler) for handler in logger.handlers] == [logging.handlers.QueueHandler]
+        assert any(isinstance(handler, logging.handlers.RotatingFileHandler)
+                   for listener in _listeners.values() for handler in listener.handlers)
+    
+    def test_process_workers_log_to_stderr(self):
+        """Test offload process workers drop the queue and rotating file for a stderr handler"""
+        import concurrent.futures
+        import logging
+        from app.services.offload import _init_worker
+        
+        with concurrent.futures.ProcessPoolExecutor(1, initializer=_init_worker) as pool:
+            handlers = pool.submit(_worker_log_handlers).result()
+        assert handlers == [(logging.StreamHandler, True)]
+    
+    def test_debug_payload_serialized_lazily(self, monkeypatch):
+        """Test request payloads are not serialized when debug logging is off"""
+        import logging
+        import app.logger as app_logger
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("payload serialized")
+        
+        monkeypatch.setattr(app_logger.json, "dumps", fail)
+        level = app_logger.logger.level
+        app_logger.logger.setLevel(logging.INFO)
+        try:
+            app_logger.APILogger.log_request("/analyze", "POST", {"message_length": 10})
+        finally:
+            app_logger.logger.setLevel(level)
+
+
+class TestMetrics:
+    """Test stage metrics and the /metrics endpoint"""
+    
+    def test_metrics_endpoint_reports_stages(self):
+        """Test an analyzed message shows up in the Prometheus stage histograms and counters"""
+        client.post("/analyze", json={"message": "URGENT: your bank account is blocked. Verify your KYC now"})
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert "# TYPE honeypot_stage_duration_seconds histogram" in text
+        for stage in ("detection", "extraction", "engagement", "state_lookup", "serialization"):
+            assert f'honeypot_stage_duration_seconds_count{{stage="{stage}"}}' in text
+        assert 'honeypot_requests_total{method="POST",route="/analyze",status="200"}' in text
+        assert "detection" in client.get("/stats").json()["stage_latency_ms"]
+    
+    def test_histogram_buckets_and_quantiles(self):
+        """Test buckets are cumulative and quantiles come from recent samples"""
+        from app.services.metrics import MetricsRegistry
+        
+        registry = MetricsRegistry(prefix="test")
+        histogram = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.05, 0.5):
+            histogram.observe(seconds, "a")
+        text = registry.render()
+        assert 'test_latency_seconds_bucket{stage="a",le="0.01"} 1' in text
+        assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 2' in text
+        assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 3' in text
+        assert 'test_latency_seconds_count{stage="a"} 3' in text
+        assert histogram.quantiles("a")["p50"] == pytest.approx(0.05)
+    
+    def test_stack_sampler_collects_stacks(self):
+        """Test the sampling profiler records the sampled thread's stacks"""
+        import time
+        from app.services.metrics import StackSampler
+        
+        def busy_wait(seconds):
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                pass
+        
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        busy_wait(0.1)
+        sampler.stop()
+        assert sampler.samples > 0
+        assert "busy_wait" in sampler.collapsed()
+
+
+class TestAnalytics:
+    """Test incremental analytics aggregates"""
+    
+    def test_aggregates_match_full_history(self):
+        """Test the running aggregates equal those computed from every recorded event"""
+        from app.services.analytics import AnalyticsEngine
+        engine = AnalyticsEngine()
+        confidences = [(i % 10) / 10 for i in range(300)]
+        for i, confidence in enumerate(confidences):
+            if i < 40:
+                engine.record_conversation()
+            engine.record_scam_detection({
+                "conversation_id": f"conv-{i % 40}",
+                "scam_type": "upi" if i % 2 else "banking",
+                "confidence": confidence
+            })
+        
+        analytics = engine.get_conversation_analytics()
+        assert analytics["total_scams"] == 300
+        assert analytics["total_conversations"] == 40
+        assert analytics["average_confidence"] == pytest.approx(sum(confidences) / 300)
+        metrics = engine.get_performance_metrics()
+        assert metrics["avg_confidence"] == pytest.approx(sum(confidences[-100:]) / 100)
+        assert metrics["high_confidence_detections"] == sum(c > 0.8 for c in confidences[-100:])
+        patterns = {p["type"]: p for p in engine.get_high_risk_patterns()}
+        upi_recent = [c for i, c in enumerate(confidences) if i % 2][-10:]
+        assert patterns["upi"]["average_confidence"] == pytest.approx(sum(upi_recent) / 10)
+        assert patterns["upi"]["occurrences"] == 150
+    
+    def test_memory_stays_bounded(self):
+        """Test event history and recent windows stay at their capacity however many events arrive"""
+        from app.services.analytics import AnalyticsEngine
+        engine = AnalyticsEngine()
+        for i in range(5000):
+            engine.record_scam_detection({"conversation_id": f"conv-{i}", "scam_type": "upi", "confidence": 0.9})
+            engine.record_intelligence({"conversation_id": f"conv-{i}", "type": "upi_id", "value": f"u{i}@ybl"})
+        
+        exported = engine.export_analytics()
+        assert len(exported["scam_history"]) == AnalyticsEngine.HISTORY_EXPORT
+        assert exported["scam_history"][-1]["conversation_id"] == "conv-4999"
+        assert len(engine._recent) == AnalyticsEngine.RECENT_WINDOW
+        assert exported["analytics"]["intelligence_extracted"] == 5000
+    
+    def test_hourly_trend_counts_current_hour(self):
+        """Test detections land in the current hour of the hourly trend"""
+        from app.services.analytics import AnalyticsEngine
+        engine = AnalyticsEngine()
+        for _ in range(3):
+            engine.record_scam_detection({"conversation_id": "c", "scam_type": "upi", "confidence": 0.5})
+        
+        trend = engine.get_hourly_trend(24)
+        assert len(trend) == 24
+        assert list(trend.values())[-1] == 3 and sum(trend.values()) == 3
+    
+    def test_conversation_counted_once(self):
+        """Test a scam conversation is counted once, when it is opened, however many turns follow"""
+        from app.main import analytics_engine
+        
+        before = analytics_engine.total_conversations
+        response = client.post("/analyze", json={"message": "URGENT: verify account, send your otp now"})
+        conversation_id = response.json()["conversation_id"]
+        for text in ["Send your OTP now", "hello ok"]:
+            client.post(f"/conversation/{conversation_id}", json={"message": text})
+        client.post("/analyze", json={"message": "See you at lunch"})
+        assert analytics_engine.total_conversations == before + 1
+
+
+class TestRollups:
+    """Test minute/hour/day trend rollups"""
+    
+    @pytest.fixture
+    def session_factory(self, tmp_path):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+        Base.metadata.create_all(bind=engine)
+        return sessionmaker(bind=engine)
+    
+    def test_range_queries_and_retention(self):
+        """Test range queries per resolution and buckets reused past retention"""
+        from app.services.rollups import RollupStore
+        store = RollupStore(retention={"minute": 3600, "hour": 86400, "day": 30 * 86400})
+        now = 1_800_000_000  # a whole day, so every resolution is aligned
+        for minutes_ago in (90, 0, 0, 5, 29, 60 * 24 * 3):
+            store.record("detections", now - minutes_ago * 60 + 1)
+        
+        assert store.range("detections", now - 600, now + 60, "minute")[-1] == (now, 2.0)
+        assert sum(count for _, count in store.range("detections", now - 600, now + 60, "minute")) == 3
+        assert sum(count for _, count in store.range("detections", now - 4 * 86400, now + 1, "day")) == 6
+        # The minute slot of 90 minutes ago (past the hour of retention) was reused 61 minutes later
+        assert store.range("detections", now - 90 * 60, now - 89 * 60, "minute") == [(now - 5400, 0.0)]
+        assert store.pick_resolution(now - 1800, now, now=now) == "minute"
+        assert store.pick_resolution(now - 7 * 86400, now, now=now) == "day"
+        with pytest.raises(ValueError):
+            store.range("detections", now - 30 * 86400, now, "minute")
+    
+    def test_flushes_and_reloads_from_database(self, session_factory):
+        """Test flushed buckets are stored and loaded back after a restart"""
+        import time
+        from app.services.rollups import RollupStore
+        from app.database import RollupRecord
+        store = RollupStore(session_factory=session_factory)
+        store.record("detections", amount=2)
+        store.flush()
+        store.record("detections")
+        store.flush()
+        
+        restarted = RollupStore(session_factory=session_factory)
+        assert restarted.load() == 3
+        points = restarted.range("detections", time.time() - 60, resolution="minute")
+        assert sum(count for _, count in points) == 3
+        with session_factory() as db:
+            assert db.query(RollupRecord).count() == 3
+    
+    def test_workers_add_to_shared_buckets(self, session_factory):
+        """Test workers flushing the same bucket add to its stored count"""
+        import time
+        from app.services.rollups import RollupStore
+        from app.database import RollupRecord
+        now = time.time()
+        worker_a = RollupStore(session_factory=session_factory)
+        worker_b = RollupStore(session_factory=session_factory)
+        worker_a.record("detections", now, amount=2)
+        worker_b.record("detections", now)
+        worker_a.flush()
+        worker_b.flush()
+        
+        # A restarted worker loads everyone's total and then only adds its own events
+        restarted = RollupStore(session_factory=session_factory)
+        restarted.load()
+        restarted.record("detections", now)
+        restarted.flush()
+        assert sum(count for _, count in restarted.range("detections", now - 60, now + 1, "minute")) == 4
+        with session_factory() as db:
+            assert db.query(RollupRecord).filter_by(resolution=60).one().count == 4
+    
+    def test_failed_flush_requeued_on_loop(self, session_factory):
+        """Test counts from a failed background write are merged back with those recorded meanwhile"""
+        import asyncio
+        import threading
+        import time
+        from app.services.rollups import RollupStore
+        from app.database import RollupRecord
+        now = time.time()
+        store = RollupStore(session_factory=session_factory)
+        
+        started, release = threading.Event(), threading.Event()
+        
+        def failing_session():
+            started.set()
+            release.wait()
+            raise RuntimeError("database unavailable")
+        
+        async def scenario():
+            # Record on the loop while the write is still on its thread
+            flush = asyncio.create_task(store._flush_async())
+            await asyncio.to_thread(started.wait)
+            store.record("detections", now)
+            release.set()
+            await flush
+        
+        store.session_factory = failing_session
+        store.record("detections", now, amount=2)
+        asyncio.run(scenario())
+        assert store.stats["failed_rows"] == 3
+        assert store._pending[("detections", 60, int(now // 60) * 60)] == 3
+        
+        store.session_factory = session_factory
+        store.flush()
+        assert store._pending == {}
+        with session_factory() as db:
+            assert db.query(RollupRecord).filter_by(resolution=60).one().count == 3
+    
+    def test_intelligence_counted_once_per_turn(self, monkeypatch):
+        """Test a conversation's intelligence is counted once, not again on every turn"""
+        from app import main
+        from app.services.analytics import AnalyticsEngine
+        engine = AnalyticsEngine(event_capacity=100)
+        monkeypatch.setattr(main, "analytics_engine", engine)
+        
+        response = client.post("/analyze", json={"message": "URGENT: verify account, send your otp to helpdesk@ybl"})
+        conversation_id = response.json()["conversation_id"]
+        for _ in range(3):
+            client.post(f"/conversation/{conversation_id}", json={"message": "hello ok"})
+        
+        assert dict(engine.intelligence_type_counts) == {"upi_id": 1}
+    
+    def test_trend_endpoint(self):
+        """Test /analytics/trend returns the current minute buckets and rejects oversized windows"""
+        message = ScamMessage(message="Your bank account is blocked. Share your OTP to verify now.")
+        client.post("/analyze", json=message.model_dump())
+        
+        response = client.get("/analytics/trend", params={"hours": 2})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["resolution"] == "minute" and len(data["points"]) >= 120
+        assert data["points"][-1][1] >= 1
+        assert client.get("/analytics/trend", params={"hours": 24 * 365, "resolution": "minute"}).status_code == 400
+
+
+class TestEventLog:
+    """Test the fixed-capacity analytics event log"""
+    
+    def test_wraps_around_keeping_latest(self):
+        """Test the log keeps the latest `capacity` events in order once it wraps"""
+        from app.services.event_log import EventLog
+        log = EventLog(capacity=4)
+        for i in range(10):
+            log.append(float(i), f"conv-{i}", "upi" if i % 2 else "banking", i / 10, f"message {i}")
+        
+        assert len(log) == 4 and log.total == 10
+        assert [event[0] for event in log.recent()] == [6.0, 7.0, 8.0, 9.0]
+        assert log.recent(2)[-1] == (9.0, "conv-9", "upi", 0.9, "message 9", None)
+    
+    def test_spilled_text_uses_fixed_slots(self, tmp_path):
+        """Test spilled message text reuses fixed-size slots and the file is removed on close"""
+        from app.services.event_log import EventLog
+        spill = tmp_path / "messages.bin"
+        log = EventLog(capacity=3, spill_path=str(spill), slot_bytes=16)
+        for i in range(7):
+            log.append(float(i), "conv", "banking", 0.5, f"message {i} " + "x" * i)
+        
+        assert [event[4] for event in log.recent()] == ["message 4 xxxx", "message 5 xxxxx", "message 6 xxxxxx"]
+        assert spill.stat().st_size <= 3 * 16
+        log.close()
+        assert not spill.exists()
+    
+    def test_spill_file_per_process(self, tmp_path):
+        """Test each process spills to its own file, suffixed with its pid"""
+        import os
+        from app.services.analytics import AnalyticsEngine
+        engine = AnalyticsEngine(event_capacity=10, spill_path=str(tmp_path / "messages.bin"))
+        spill = tmp_path / f"messages.bin.{os.getpid()}"
+        assert engine.scam_history.spill_path == str(spill)
+        engine.record_scam_detection({"conversation_id": "c", "scam_type": "upi", "confidence": 0.9, "message": "Pay now"})
+        assert engine.scam_history.recent()[0][4] == "Pay now"
+        engine.close()
+        assert not spill.exists()
+    
+    def test_export_keeps_record_shape(self):
+        """Test exported detections and intelligence keep their dict shape"""
+        from app.services.analytics import AnalyticsEngine
+        engine = AnalyticsEngine(event_capacity=100)
+        engine.record_scam_detection({
+            "conversation_id": "conv-1", "scam_type": "upi", "confidence": 0.9,
+            "message": "Pay now", "extracted_intel": ["a@ybl"]
+        })
+        engine.record_intelligence({"conversation_id": "conv-1", "type": "upi_id", "value": "a@ybl", "confidence": 0.8})
+        
+        exported = engine.export_analytics()
+        detection = exported["scam_history"][0]
+        assert list(detection) == ["timestamp", "conversation_id", "scam_type", "confidence", "message", "extracted_intel"]
+        assert detection["message"] == "Pay now" and detection["extracted_intel"] == ["a@ybl"]
+        assert exported["intelligence_history"][0]["value"] == "a@ybl"
+        assert exported["intelligence_history"][0]["intel_type"] == "upi_id"
+
+
+class TestLiveEvents:
+    """Test the coalescing SSE broadcaster behind /events"""
+    
+    def test_coalesces_changes_into_one_update(self):
+        """Test changes within an interval go out as one update with only the changed stats"""
+        import asyncio
+        import json
+        from app.services.live_events import EventBroadcaster
+        
+        async def scenario():
+            stats = {"scams_detected": 0, "active_conversations": 0}
+            events = EventBroadcaster(lambda: dict(stats), interval=0.01)
+            stream = events.subscribe()
+            snapshot = await stream.__anext__()
+            events.start()
+            for i in range(50):
+                stats["scams_detected"] = i + 1
+                events.publish_detection({"conversation_id": f"conv-{i}", "scam_type": "upi"})
+            update = await asyncio.wait_for(stream.__anext__(), 1)
+            events.close()
+            with pytest.raises(StopAsyncIteration):
+                await stream.__anext__()
+            await events.stop()
+            return snapshot, update, events.stats
+        
+        snapshot, update, stats = asyncio.run(scenario())
+        assert snapshot.startswith(b"event: snapshot\n")
+        event, data = update.decode().strip().split("\n")
+        assert event == "event: update"
+        payload = json.loads(data[len("data: "):])
+        # Unchanged keys are left out; detections beyond the cap are dropped
+        assert payload["stats"] == {"scams_detected": 50}
+        assert [d["conversation_id"] for d in payload["detections"]][-1] == "conv-49"
+        assert len(payload["detections"]) <= 20
+        assert stats["frames"] == 1 and stats["coalesced_events"] == 50
+    
+    def test_slow_subscriber_is_resynced(self):
+        """Test a subscriber whose queue overflows gets a fresh snapshot instead"""
+        import asyncio
+        from app.services.live_events import EventBroadcaster
+        
+        async def scenario():
+            stats = {"scams_detected": 0}
+            events = EventBroadcaster(lambda: dict(stats), max_queue=2)
+            stream = events.subscribe()
+            await stream.__anext__()
+            for i in range(5):
+                stats["scams_detected"] = i + 1
+                events.notify()
+                events._broadcast()
+            frame = await stream.__anext__()
+            await events.stop()
+            return frame, events.stats
+        
+        frame, stats = asyncio.run(scenario())
+        assert frame == b'event: snapshot\ndata: {"stats":{"scams_detected":5}}\n\n'
+        assert stats["resyncs"] == 1
+    
+    def test_events_endpoint_streams_snapshot(self):
+        """Test /events opens with a snapshot frame and unsubscribes when closed"""
+        import asyncio
+        from app.main import live_events, events
+        
+        async def first_frame():
+            response = await live_events()
+            chunk = await response.body_iterator.__anext__()
+            await response.body_iterator.aclose()
+            return response, chunk
+        
+        response, chunk = asyncio.run(first_frame())
+        assert response.media_type == "text/event-stream"
+        assert chunk.startswith(b"event: snapshot\n") and b'"scams_detected"' in chunk
+        assert events.subscribers == 0
+
+
+class TestEngagementCounters:
+    """Test the live conversation counters behind /stats"""
+    
+    @staticmethod
+    def scanned(agent):
+        """The totals the counters replace, computed by scanning the store"""
+        from collections import Counter
+        states = list(agent.conversation_states.values())
+        roles = Counter()
+        for state in states:
+            roles.update(state.messages.role_counts())
+        return {
+            "active": len(states),
+            "total_messages": sum(len(state.messages) for state in states),
+            "messages_by_role": dict(sorted(roles.items())),
+            "engagement_levels": dict(sorted(Counter(state.engagement_level for state in states).items())),
+        }
+    
+    def test_counters_follow_append_terminate_and_evict(self):
+        """Test the counters match a scan of the store through appends, terminations, evictions and expiry"""
+        import asyncio
+        from app.agents.conversation_store import ConversationStore
+        from app.agents.engagement_agent import EngagementAgent
+        now = [0.0]
+        agent = EngagementAgent(ConversationStore(max_size=3, ttl=60, on_evict=None, clock=lambda: now[0]))
+        
+        async def engage(conversation_id, scam_type=ScamType.UPI):
+            await agent.engage_with_scammer(conversation_id, "send money", scam_type)
+        
+        def check():
+            snapshot = agent.counters.snapshot()
+            assert {key: snapshot[key] for key in self.scanned(agent)} == self.scanned(agent)
+        
+        for conversation_id in ("a", "b", "a", "c"):
+            asyncio.run(engage(conversation_id))
+            check()
+        asyncio.run(engage("b", ScamType.BANKING))
+        assert agent.counters.snapshot()["scam_types"] == {"banking": 1, "upi": 2}
+        asyncio.run(engage("d"))  # evicts the least recently used ("a")
+        check()
+        assert agent.terminate_conversation("c")
+        check()
+        now[0] = 120  # everything left expires
+        agent.conversation_states.expire()
+        check()
+        assert agent.counters.snapshot() == {
+            "active": 0, "total_messages": 0, "messages_by_role": {},
+            "engagement_levels": {}, "scam_types": {}, "personas": {}
+        }
+    
+    def test_counters_follow_reloads_from_shared_backend(self, tmp_path):
+        """Test a conversation reloaded from the shared backend is recounted, not added twice"""
+        import asyncio
+        from app.agents.conversation_store import ConversationStore
+        from app.agents.engagement_agent import EngagementAgent
+        from app.agents.state_backends import FileStateBackend
+        worker_a = EngagementAgent(ConversationStore(on_evict=None, backend=FileStateBackend(str(tmp_path))))
+        worker_b = EngagementAgent(ConversationStore(on_evict=None, backend=FileStateBackend(str(tmp_path))))
+        
+        asyncio.run(worker_a.engage_with_scammer("shared", "send money", ScamType.UPI))
+        assert worker_b.get_conversation_state("shared") is not None
+        asyncio.run(worker_b.engage_with_scammer("shared", "send more", ScamType.UPI))
+        worker_a.get_conversation_state("shared")  # reloads the newer state
+        
+        assert worker_a.counters.messages == worker_b.counters.messages == 4
+        assert worker_a.counters.snapshot()["engagement_levels"] == {20: 1}
+    
+    def test_stats_reports_counters(self):
+        """Test /stats reports the counters, consistent with a scan of the store"""
+        from app.main import agent
+        message = ScamMessage(message="Urgent: your UPI is blocked, send Rs 1 to refund@ybl to verify.")
+        client.post("/analyze", json=message.model_dump())
+        
+        stats = client.get("/stats").json()
+        conversations = stats["conversations"]
+        assert stats["total_messages"] == conversations["total_messages"] == self.scanned(agent)["total_messages"]
+        assert conversations["messages_by_role"]["scammer"] == conversations["messages_by_role"]["honeypot"]
+        assert sum(conversations["engagement_levels"].values()) == stats["active_conversations"]
 
 
 class TestStatistics: